@@ -7,6 +7,11 @@ from views.home_view import HomeView
 from views.gallery_view import GalleryView
 from views.editor_view import EditorView
 from views.prompt_generator_view import PromptGeneratorView
+from views.export_status_bar import ExportStatusBar
+from utils.catalogue import TEMPLATES_DIR, catalogue
+from utils.catalogue_watcher import CatalogueWatcher
+from utils.decode_service import DecodeService
+from utils.export_worker import ExportQueue
 
 # Create necessary directories for template organization
 def create_template_directories():
@@ -14,7 +19,7 @@ def create_template_directories():
     categories = ["birthday", "valentine", "eid", "puja", "newyear"]
     for category in categories:
         # Create main category directory
-        category_dir = os.path.join("templates", category)
+        category_dir = os.path.join(TEMPLATES_DIR, category)
         os.makedirs(category_dir, exist_ok=True)
         
         # Create style subdirectories based on category
@@ -59,9 +64,22 @@ class GreetingCardApp(tk.Tk):
         self.current_template = None
         self.current_category = None
         
+        # Shared background image decoding for all views
+        self.decode_service = DecodeService(self)
+        self.current_frame = None
+        
+        # Card exports run one after another in the background, shown in a status bar
+        self.export_queue = ExportQueue(self)
+        self.export_bar = ExportStatusBar(self, self.export_queue, below=self.container)
+        
         # Initialize views
         self.setup_views()
         
+        # Pick up templates added to or removed from the template folders while running
+        self.catalogue_watcher = CatalogueWatcher(self, catalogue, self.decode_service)
+        self.catalogue_watcher.add_listener(self.frames["gallery"].on_catalogue_changed)
+        self.catalogue_watcher.start()
+        
         # Show home view initially
         self.show_frame("home")
     
@@ -84,6 +102,12 @@ class GreetingCardApp(tk.Tk):
     def show_frame(self, page_name):
         """Show the frame for the given page name"""
         frame = self.frames[page_name]
+        
+        # Stop decoding images for the view we are leaving
+        if self.current_frame is not None and self.current_frame is not frame:
+            self.decode_service.cancel_owner(self.current_frame)
+        self.current_frame = frame
+        
         frame.tkraise()
         # Update the frame if it has an update method
         if hasattr(frame, "update_view"):
@@ -101,7 +125,7 @@ class GreetingCardApp(tk.Tk):
 
 if __name__ == "__main__":
     # Create directories if they don't exist
-    os.makedirs("templates", exist_ok=True)
+    os.makedirs(TEMPLATES_DIR, exist_ok=True)
     os.makedirs("output", exist_ok=True)
     create_template_directories()
     
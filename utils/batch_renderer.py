@@ -0,0 +1,148 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from utils.catalogue import GENERATED_DIR, TEMPLATES_DIR
+from utils.template_designer import TemplateDesigner
+from utils.template_registry import template_registry
+import argparse
+import os
+import signal
+import tempfile
+import time
+
+def build_jobs(output_dir, variants=2, sizes=((600, 400),), categories=None, antialias=False):
+    """Build the list of render jobs for every registered template
+
+    Each variant number doubles as the render seed, so re-running a batch
+    reproduces the same files. Jobs are ordered most expensive first so
+    the pool is not left waiting on one slow render at the end.
+    """
+    jobs = []
+    for spec in template_registry.specs(categories):
+        for variant in range(1, variants + 1):
+            for width, height in sizes:
+                if not spec.supports((width, height)):
+                    continue
+                filename = f"{spec.style}_{variant}_{width}x{height}.jpg"
+                jobs.append({
+                    "category": spec.category,
+                    "style": spec.style,
+                    "variant": variant,
+                    "seed": variant,
+                    "size": (width, height),
+                    "antialias": antialias,
+                    "cost": spec.estimate((width, height)),
+                    "path": os.path.join(output_dir, spec.category, spec.style, filename),
+                })
+
+    jobs.sort(key=lambda job: job["cost"], reverse=True)
+    return jobs
+
+def _raise_timeout(signum, frame):
+    """Signal handler used to stop a render that ran past its time limit"""
+    raise TimeoutError("Render timed out")
+
+def render_job(job, timeout=None):
+    """Render one job and write it straight to disk (runs in a worker process)"""
+    start = time.time()
+
+    # Per-job time limit, where the platform supports interval timers
+    use_alarm = timeout and hasattr(signal, "setitimer")
+    if use_alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+
+    try:
+        width, height = job["size"]
+        designer = TemplateDesigner(width, height, seed=job["seed"], antialias=job.get("antialias", False))
+        img = designer.render(job["category"], job["style"])
+
+        # Write to a temporary file and move it into place atomically
+        os.makedirs(os.path.dirname(job["path"]), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(job["path"]), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                img.save(f, format="JPEG", quality=95)
+            os.replace(tmp_path, job["path"])
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+
+    return time.time() - start
+
+def render_batch(jobs, max_workers=None, timeout=120, progress=None, skip_existing=False):
+    """Render jobs across a process pool
+
+    progress, if given, is called as progress(done, total, result) after
+    every job. Returns one result dict per job with "job", "elapsed" and
+    "error" keys.
+    """
+    if skip_existing:
+        jobs = [job for job in jobs if not os.path.exists(job["path"])]
+
+    results = []
+    total = len(jobs)
+    if not total:
+        return results
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(render_job, job, timeout): job for job in jobs}
+
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = {"job": futures[future], "elapsed": None, "error": None}
+            try:
+                result["elapsed"] = future.result()
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+
+            results.append(result)
+            if progress:
+                progress(done, total, result)
+
+    return results
+
+def print_progress(done, total, result):
+    """Default progress reporter for the command line"""
+    job = result["job"]
+    width, height = job["size"]
+    label = f"{job['category']}/{job['style']} #{job['variant']} {width}x{height}"
+    if result["error"]:
+        print(f"[{done}/{total}] {label} failed: {result['error']}")
+    else:
+        print(f"[{done}/{total}] {label} {result['elapsed']:.2f}s")
+
+def _parse_size(text):
+    """Parse a WIDTHxHEIGHT size argument"""
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+def main():
+    """Command line entry point for pre-rendering the template catalogue"""
+    parser = argparse.ArgumentParser(description="Pre-render the greeting card template catalogue")
+    parser.add_argument("--output", default=os.path.join(TEMPLATES_DIR, GENERATED_DIR),
+                        help="directory to write rendered templates to")
+    parser.add_argument("--variants", type=int, default=2, help="variants per style")
+    parser.add_argument("--sizes", default="600x400",
+                        help="comma separated list of WIDTHxHEIGHT sizes")
+    parser.add_argument("--categories", default=None,
+                        help="comma separated list of categories (default: all)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds allowed per render")
+    parser.add_argument("--skip-existing", action="store_true", help="only render missing files")
+    parser.add_argument("--antialias", action="store_true", help="supersample curved emblems and motifs")
+    args = parser.parse_args()
+
+    sizes = [_parse_size(size) for size in args.sizes.split(",")]
+    categories = args.categories.split(",") if args.categories else None
+    jobs = build_jobs(args.output, args.variants, sizes, categories, args.antialias)
+
+    start = time.time()
+    results = render_batch(jobs, args.workers, args.timeout, print_progress, args.skip_existing)
+    failed = sum(1 for result in results if result["error"])
+    print(f"Rendered {len(results) - failed} of {len(results)} templates in {time.time() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+from PIL import Image, ImageDraw
+from utils.catalogue import GENERATED_DIR, catalogue
+from utils.decode_service import open_scaled
+from utils.font_service import font_service, get_font
+from utils.image_pyramid import image_pyramid
+from utils.template_designer import BASE_DPI, BASE_HEIGHT, BASE_WIDTH, TemplateDesigner
+from utils.template_registry import template_registry
+import os
+import re
+
+# Print resolution offered when exporting
+DEFAULT_EXPORT_DPI = 300
+
+# Progress steps the background counts for; it is most of a render's work
+BACKGROUND_STEPS = 4
+
+def design_for(template_path):
+    """Return (category, style, seed) if the template can be re-rendered by the designer
+
+    Batch renders under templates/generated/<category>/<style>/ are named
+    <style>_<seed>_<width>x<height>, so the designer can draw them again
+    at any size. Other templates are only available as pixels.
+    """
+    relpath = os.path.relpath(template_path, catalogue.root).replace(os.sep, "/")
+    parts = relpath.split("/")
+    if len(parts) != 4 or parts[0] != GENERATED_DIR:
+        return None
+
+    _, category, style, filename = parts
+    match = re.match(rf"^{re.escape(style)}_(\d+)_\d+x\d+$", os.path.splitext(filename)[0])
+    if not match or template_registry.get(category, style) is None:
+        return None
+    return category, style, int(match.group(1))
+
+def wrap_text(text, font, max_width):
+    """Break text into lines no wider than max_width pixels"""
+    lines = []
+    for paragraph in text.split("\n"):
+        line = ""
+        for word in paragraph.split():
+            candidate = f"{line} {word}".strip()
+            if line and font_service.text_width(candidate, font) > max_width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return "\n".join(lines)
+
+class CardScene:
+    """Resolution-independent description of a card
+
+    Holds the template the card is built on and the text and images placed
+    on it. Positions and sizes are fractions of the card's width and
+    height, so the same scene can be drawn at preview size or re-rendered
+    at print resolution. The background comes from the template's full
+    resolution pixels, or from the designer when the template was rendered
+    by it.
+
+    What the template is (its designer parameters and pixel size) is
+    looked up by resolve() on the Tk thread, and copies carry it along,
+    so the export worker never touches the catalogue or the pyramid
+    store. Pixel templates are always read from their own file.
+    """
+
+    def __init__(self, template_path):
+        self.template_path = template_path
+        self.elements = []
+        self.design = None  # (category, style, seed) for designer templates
+        self.native_size = None  # The template's own pixel size
+
+    def resolve(self):
+        """Look up the template's design and size; call on the Tk thread"""
+        self.design = design_for(self.template_path)
+        self.native_size = image_pyramid.full_size(self.template_path)
+
+    def add_text(self, text, x, y, font, size, color, wrap_width=None):
+        """Place text centred on (x, y); size and wrap_width are fractions of the card height and width"""
+        self.elements.append({
+            "type": "text", "text": text, "x": x, "y": y,
+            "font": font, "size": size, "color": color, "wrap_width": wrap_width,
+        })
+
+    def add_image(self, source, x, y, width, height):
+        """Place an image centred on (x, y), sized as fractions of the card
+
+        source is a file path or a PIL image; paths are re-read at export
+        time so the full resolution original is used.
+        """
+        self.elements.append({
+            "type": "image", "source": source, "x": x, "y": y, "width": width, "height": height,
+        })
+
+    def copy(self):
+        """Return a snapshot of the scene that later edits to this one don't affect"""
+        if self.native_size is None:
+            self.resolve()
+        scene = CardScene(self.template_path)
+        scene.design, scene.native_size = self.design, self.native_size
+        for element in self.elements:
+            element = dict(element)
+            if element["type"] == "image" and not isinstance(element["source"], str):
+                element["source"] = element["source"].copy()
+            scene.elements.append(element)
+        return scene
+
+    def source_size(self):
+        """Return the template's own pixel size"""
+        if self.native_size is None:
+            self.resolve()
+        return self.native_size
+
+    def print_size(self):
+        """Return the card's physical (width, height) in inches
+
+        Cards are the designer's 6x4 inch reference card with the
+        template's aspect ratio: the long edge is 6 inches whatever the
+        template's pixel count.
+        """
+        width, height = self.source_size()
+        long_edge = max(BASE_WIDTH, BASE_HEIGHT) / BASE_DPI
+        if width >= height:
+            return long_edge, long_edge * height / width
+        return long_edge * width / height, long_edge
+
+    def export_size(self, dpi=None):
+        """Return the pixel size of the card printed at a DPI (None keeps the template's own size)"""
+        if dpi is None:
+            return self.source_size()
+        width_inches, height_inches = self.print_size()
+        return max(1, int(round(width_inches * dpi))), max(1, int(round(height_inches * dpi)))
+
+    def render_background(self, size, dpi=None):
+        """Draw the template at exactly size (the card printed at dpi, if given)"""
+        if self.native_size is None:
+            self.resolve()
+        design = self.design
+        if design is not None:
+            # Designer templates are drawn again at the target size, so they stay sharp
+            category, style, seed = design
+            if dpi is not None:
+                width_inches, height_inches = self.print_size()
+                designer = TemplateDesigner.for_dpi(dpi, width_inches, height_inches, seed=seed, antialias=True)
+            else:
+                designer = TemplateDesigner(size[0], size[1], seed=seed, antialias=True)
+            img = designer.render(category, style, seed)
+            if img.size != tuple(size):
+                img = img.resize(size, Image.LANCZOS)
+            return img
+
+        # Decoded straight from the file; export sizes are at or above full size anyway
+        img = open_scaled(self.template_path, size, upscale=True)
+        if img.size != tuple(size):
+            img = img.resize(size, Image.LANCZOS)
+        return img.convert("RGB")
+
+    def render(self, dpi=None, size=None, progress=None):
+        """Render the card at a DPI or an explicit (width, height)
+
+        progress, if given, is called as progress(done, total) before and
+        after the background and after each element. It may raise to stop
+        the render, which is how exports are cancelled.
+        """
+        if size:
+            size, dpi = tuple(size), None
+        else:
+            size = self.export_size(dpi)
+        width, height = size
+        total = BACKGROUND_STEPS + len(self.elements)
+        if progress:
+            progress(0, total)
+        card = self.render_background(size, dpi)
+        draw = ImageDraw.Draw(card)
+        if progress:
+            progress(BACKGROUND_STEPS, total)
+
+        for done, element in enumerate(self.elements, BACKGROUND_STEPS + 1):
+            cx, cy = element["x"] * width, element["y"] * height
+
+            if element["type"] == "text":
+                font = get_font(element["font"], element["size"] * height)
+                text = element["text"]
+                if element["wrap_width"]:
+                    text = wrap_text(text, font, element["wrap_width"] * width)
+                draw.multiline_text((cx, cy), text, fill=element["color"], font=font,
+                                    anchor="mm", align="center")
+
+            elif element["type"] == "image":
+                source = element["source"]
+                if isinstance(source, str):
+                    with Image.open(source) as img:
+                        img.load()
+                        source = img
+                target = (max(1, int(round(element["width"] * width))),
+                          max(1, int(round(element["height"] * height))))
+                img = source.resize(target, Image.LANCZOS)
+                position = (int(round(cx - target[0] / 2)), int(round(cy - target[1] / 2)))
+                if img.mode == "RGBA":
+                    # Handle transparent images
+                    card.paste(img, position, img)
+                else:
+                    card.paste(img.convert("RGB"), position)
+
+            if progress:
+                progress(done, total)
+
+        return card
@@ -0,0 +1,491 @@
+from PIL import Image
+from utils.palette import extract_palette, text_color, to_hex
+from utils.template_registry import CATEGORY_LABELS, category_key
+import hashlib
+import json
+import os
+import tempfile
+import threading
+# Make numpy optional
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Folder the app lives in; data folders are found from here, not the working directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Folder the template library lives in
+TEMPLATES_DIR = os.path.join(PROJECT_ROOT, "templates")
+
+# Where the scanned index is kept between runs
+MANIFEST_PATH = os.path.join(PROJECT_ROOT, "cache", "catalogue.json")
+
+# Bump when the manifest layout changes so old manifests are rebuilt
+MANIFEST_VERSION = 3
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+# Style given to templates saved directly in templates/ or a category folder root
+DEFAULT_STYLE = "general"
+
+# Folder inside templates/ that the batch renderer writes <category>/<style>/ trees to
+GENERATED_DIR = "generated"
+
+# Images whose perceptual hashes differ in at most this many of their 64
+# bits, whose average colours are this close and that have the same size
+# are treated as the same picture
+DUPLICATE_DISTANCE = 3
+DUPLICATE_COLOR_TOLERANCE = 8
+
+# Curated names for the bundled templates, keyed by path inside templates/
+DISPLAY_NAMES = {
+    "birthday/elegant_1.jpg": "Elegant Birthday",
+    "birthday/elegant_2.jpg": "Golden Celebration",
+    "birthday/fun_1.jpg": "Party Balloons",
+    "birthday/fun_2.jpg": "Confetti Explosion",
+    "birthday/kids_1.jpg": "Kids Birthday",
+    "birthday/kids_2.jpg": "Cartoon Cake",
+    "birthday/minimal_1.jpg": "Minimal White",
+    "birthday/minimal_2.jpg": "Simple Elegance",
+    "valentine/romantic_1.jpg": "Red Roses",
+    "valentine/romantic_2.jpg": "Heart Bokeh",
+    "valentine/cute_1.jpg": "Cute Hearts",
+    "valentine/cute_2.jpg": "Love Birds",
+    "valentine/modern_1.jpg": "Modern Love",
+    "valentine/modern_2.jpg": "Geometric Hearts",
+    "valentine/vintage_1.jpg": "Vintage Romance",
+    "valentine/vintage_2.jpg": "Classic Love Letter",
+    "eid/traditional_1.jpg": "Traditional Lanterns",
+    "eid/traditional_2.jpg": "Mosque Silhouette",
+    "eid/modern_1.jpg": "Modern Geometric",
+    "eid/modern_2.jpg": "Minimalist Moon",
+    "eid/festive_1.jpg": "Festive Lights",
+    "eid/festive_2.jpg": "Celebration Gold",
+    "eid/cultural_1.jpg": "Cultural Patterns",
+    "eid/cultural_2.jpg": "Heritage Design",
+    "puja/diwali_1.jpg": "Diwali Lamps",
+    "puja/diwali_2.jpg": "Rangoli Design",
+    "puja/durga_1.jpg": "Durga Puja",
+    "puja/durga_2.jpg": "Goddess Durga",
+    "puja/ganesh_1.jpg": "Ganesh Chaturthi",
+    "puja/ganesh_2.jpg": "Lord Ganesha",
+    "puja/navratri_1.jpg": "Navratri Colors",
+    "puja/navratri_2.jpg": "Garba Celebration",
+    "newyear/fireworks_1.jpg": "Midnight Fireworks",
+    "newyear/fireworks_2.jpg": "Celebration Sky",
+    "newyear/elegant_1.jpg": "Elegant Countdown",
+    "newyear/elegant_2.jpg": "Golden New Year",
+    "newyear/party_1.jpg": "Party Confetti",
+    "newyear/party_2.jpg": "Champagne Toast",
+    "newyear/minimal_1.jpg": "Minimal Calendar",
+    "newyear/minimal_2.jpg": "Clean Slate",
+}
+
+def category_label(category):
+    """Return the display name of a category key"""
+    return CATEGORY_LABELS.get(category, category.replace("_", " ").title())
+
+def style_label(style):
+    """Return the display name of a style key"""
+    return style.replace("_", " ").title()
+
+def describe(relpath):
+    """Work out (category, style, name) from a path inside templates/
+
+    Understands the layouts in use: <category>/<style>/<file>,
+    <category>/<style>_<n>.jpg, <category>/<style>_<category>.png and
+    <category>_<n>.jpg directly in templates/. Batch renders under
+    generated/<category>/<style>/ are read like <category>/<style>/.
+    """
+    parts = relpath.split("/")
+    if parts[0] == GENERATED_DIR and len(parts) > 2:
+        parts = parts[1:]
+    stem = os.path.splitext(parts[-1])[0]
+    words = stem.split("_")
+
+    if len(parts) == 1:
+        # templates/<category>_<n>.jpg
+        category = category_key(words[0])
+        style = DEFAULT_STYLE
+    elif len(parts) == 2:
+        category = category_key(parts[0])
+        style = words[0].lower() if len(words) > 1 else DEFAULT_STYLE
+    else:
+        category = category_key(parts[0])
+        style = parts[1].lower()
+
+    name = DISPLAY_NAMES.get(relpath)
+    if name is None:
+        # Fall back to the file name, e.g. "luxe_birthday" -> "Luxe Birthday", "newyear_2" -> "New Year 2"
+        titles = [word.capitalize() for word in words
+                  if not word.isdigit() and category_key(word) != category]
+        titles.append(category_label(category))
+        if words[-1].isdigit():
+            titles.append(words[-1])
+        name = " ".join(titles)
+    return category, style, name
+
+def perceptual_hash(img):
+    """Return the 64-bit difference hash (dHash) of an image as an int
+
+    The image is shrunk to 9x8 grey pixels and each bit records whether a
+    pixel is brighter than its right-hand neighbour, so re-encoded or
+    resized copies of a picture get the same or a very close hash. It only
+    sees brightness, so recoloured copies of a layout hash alike too.
+    """
+    # Let the JPEG decoder skip straight to a small image
+    img.draft("L", (64, 64))
+    small = img.convert("L").resize((9, 8), Image.BOX)
+
+    if NUMPY_AVAILABLE:
+        pixels = np.asarray(small, dtype=np.int16)
+        bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+        return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left, right = pixels[row * 9 + col], pixels[row * 9 + col + 1]
+            value = (value << 1) | (right > left)
+    return value
+
+def hash_distance(a, b):
+    """Return the number of bits two perceptual hashes differ in"""
+    return bin(a ^ b).count("1")
+
+def file_sha1(path):
+    """Return the SHA-1 of a file's contents"""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class Catalogue:
+    """Index of the template library
+
+    Built by one os.scandir walk of templates/ and saved as a compact JSON
+    manifest. Rescans only re-read files whose mtime or size changed, and
+    lookups by category and style are answered from the index. Copies of
+    the same picture are collapsed onto one asset file. Each entry also
+    keeps the picture's palette and a text colour that reads well on it.
+    """
+
+    def __init__(self, root=TEMPLATES_DIR, manifest_path=MANIFEST_PATH):
+        self.root = root
+        self.manifest_path = manifest_path
+        self.entries = {}  # path inside root -> entry dict
+        self._index = None  # (category, style) and (category, None) -> entries
+        self._by_path = None  # absolute file path -> entry
+        self._aliases = {}  # preview path inside root -> paths inside root that show that picture
+        self._loaded = False
+        self._lock = threading.RLock()  # Guards building the lookup index
+        self.generation = 0  # Goes up whenever the entries change
+
+    def load(self):
+        """Read the saved manifest, if there is a usable one"""
+        self._loaded = True
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("root") != self.root:
+            return False
+        self.entries = manifest.get("entries", {})
+        self._index = None
+        self.generation += 1
+        return True
+
+    def save(self):
+        """Write the manifest atomically"""
+        directory = os.path.dirname(self.manifest_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        manifest = {"version": MANIFEST_VERSION, "root": self.root, "entries": self.entries}
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, separators=(",", ":"))
+            os.replace(tmp_path, self.manifest_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _walk(self, directory, prefix=""):
+        """Yield (relpath, DirEntry) for every image file under directory"""
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+
+        for entry in entries:
+            relpath = prefix + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                yield from self._walk(entry.path, relpath + "/")
+            elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                yield relpath, entry
+
+    def _index_file(self, relpath, path, stat):
+        """Build the index entry for one file"""
+        category, style, name = describe(relpath)
+        try:
+            with Image.open(path) as img:
+                width, height = img.size
+                img.draft("RGB", (64, 64))
+                small = img.convert("RGB")
+            phash = format(perceptual_hash(small), "016x")
+            color = to_hex(small.resize((1, 1), Image.BOX).getpixel((0, 0)))
+            palette = [[hex_color, round(weight, 3)] for hex_color, weight in extract_palette(small)]
+        except (OSError, ValueError):
+            width, height, phash, color, palette = 0, 0, None, None, []
+
+        return {
+            "path": path,
+            "category": category,
+            "style": style,
+            "name": name,
+            "width": width,
+            "height": height,
+            "mtime": stat.st_mtime_ns,
+            "bytes": stat.st_size,
+            "sha1": file_sha1(path),
+            "phash": phash,
+            "color": color,
+            "palette": palette,
+            "text_color": text_color(palette),
+        }
+
+    def refresh(self):
+        """Rescan the library, re-reading only new and changed files
+
+        Returns the set of paths inside root that were added, changed or
+        removed.
+        """
+        return self.rescan("")
+
+    def rescan(self, reldir):
+        """Rescan one folder inside root (and its subfolders)
+
+        "" rescans the whole library. Returns the set of paths inside root
+        that were added, changed or removed.
+        """
+        if not self._loaded:
+            self.load()
+
+        prefix = reldir.strip("/") + "/" if reldir.strip("/") else ""
+        directory = os.path.join(self.root, *prefix.split("/"))
+
+        changed = set()
+        seen = set()
+        for relpath, dir_entry in self._walk(directory, prefix):
+            seen.add(relpath)
+            if self._update_entry(relpath, dir_entry.path, dir_entry.stat()):
+                changed.add(relpath)
+
+        for relpath in list(self.entries):
+            if relpath.startswith(prefix) and relpath not in seen:
+                del self.entries[relpath]
+                changed.add(relpath)
+
+        self._changed(changed)
+        return changed
+
+    def update(self, relpaths):
+        """Re-check individual files inside root, e.g. ones a watcher reported
+
+        Returns the set of paths that were added, changed or removed.
+        """
+        if not self._loaded:
+            self.load()
+
+        changed = set()
+        for relpath in relpaths:
+            path = os.path.join(self.root, *relpath.split("/"))
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stat = None
+
+            if stat is not None and os.path.isfile(path) and relpath.lower().endswith(IMAGE_EXTENSIONS):
+                if self._update_entry(relpath, path, stat):
+                    changed.add(relpath)
+            elif self.entries.pop(relpath, None) is not None:
+                changed.add(relpath)
+
+        self._changed(changed)
+        return changed
+
+    def _update_entry(self, relpath, path, stat):
+        """Re-index a file if its mtime or size changed; return True if it did"""
+        entry = self.entries.get(relpath)
+        if entry and entry["mtime"] == stat.st_mtime_ns and entry["bytes"] == stat.st_size:
+            return False
+        self.entries[relpath] = self._index_file(relpath, path, stat)
+        return True
+
+    def _changed(self, changed):
+        """Save the manifest and drop the lookup index after a change"""
+        if changed:
+            self._index = None
+            self.generation += 1
+            self.save()
+
+    def _build_index(self):
+        """Group the entries by category and style for lookups"""
+        index = {}
+        by_path = {}
+        for relpath in sorted(self.entries):
+            entry = self.entries[relpath]
+            index.setdefault((entry["category"], entry["style"]), []).append(entry)
+            index.setdefault((entry["category"], None), []).append(entry)
+            by_path[os.path.abspath(entry["path"])] = entry
+        self._dedupe()
+        # Published together, so a lookup never sees one without the other
+        self._index, self._by_path = index, by_path
+        return index, by_path
+
+    def _dedupe(self):
+        """Group the entries that show the same picture
+
+        Byte-identical files collapse onto the first of them in path
+        order, whose path is kept as the entry's "asset". Files with the
+        same size whose perceptual hashes are within DUPLICATE_DISTANCE
+        only share a thumbnail: the first file of the group is kept as the
+        entry's "preview". Near duplicates can differ in detail, so
+        anything that shows a template larger than a thumbnail opens the
+        entry's own path.
+        """
+        self._aliases = {}
+        by_sha1 = {}
+        previews = {}  # relpath -> relpath of its preview
+        # Two 64-bit hashes within 3 bits of each other agree on at least
+        # one of their four 16-bit quarters, so only those are compared
+        buckets = {}
+
+        for relpath in sorted(self.entries):
+            entry = self.entries[relpath]
+            asset = by_sha1.get(entry["sha1"])
+            preview = previews.get(asset)
+
+            if preview is None and entry.get("phash"):
+                phash = int(entry["phash"], 16)
+                quarters = [(i, (phash >> (16 * i)) & 0xFFFF) for i in range(4)]
+                for quarter in quarters:
+                    for other in buckets.get(quarter, ()):
+                        candidate = self.entries[other]
+                        if self._same_picture(entry, candidate, phash):
+                            preview = other
+                            break
+                    if preview is not None:
+                        break
+                if preview is None:
+                    for quarter in quarters:
+                        buckets.setdefault(quarter, []).append(relpath)
+
+            if asset is None:
+                asset = relpath
+                by_sha1[entry["sha1"]] = relpath
+            if preview is None:
+                preview = relpath
+            entry["asset"] = self.entries[asset]["path"]
+            entry["preview"] = self.entries[preview]["path"]
+            previews[relpath] = preview
+            self._aliases.setdefault(preview, []).append(relpath)
+
+    def ensure_loaded(self):
+        """Build the index the first time it is needed and return (index, by_path)"""
+        with self._lock:
+            if not self._loaded:
+                self.refresh()
+            index, by_path = self._index, self._by_path
+            if index is None:
+                index, by_path = self._build_index()
+            return index, by_path
+
+    def find(self, category=None, style=None):
+        """Return the entries of a category and optionally a style, in path order"""
+        index, _ = self.ensure_loaded()
+        if category is None:
+            return [self.entries[relpath] for relpath in sorted(self.entries)]
+        style = style.lower() if style else None
+        return list(index.get((category_key(category), style), []))
+
+    def get(self, path):
+        """Return the entry for a file path, or None"""
+        _, by_path = self.ensure_loaded()
+        return by_path.get(os.path.abspath(path))
+
+    @staticmethod
+    def _same_picture(entry, candidate, phash):
+        """Return True if two entries with close hash quarters show the same picture"""
+        if (candidate["width"], candidate["height"]) != (entry["width"], entry["height"]):
+            return False
+        if hash_distance(phash, int(candidate["phash"], 16)) > DUPLICATE_DISTANCE:
+            return False
+        # dHash ignores colour, so recoloured copies of one design are told apart here
+        a, b = entry["color"], candidate["color"]
+        return all(abs(int(a[i:i + 2], 16) - int(b[i:i + 2], 16)) <= DUPLICATE_COLOR_TOLERANCE
+                   for i in (1, 3, 5))
+
+    def asset_path(self, relpath):
+        """Return the file holding the same bytes as a path inside root"""
+        self.ensure_loaded()
+        entry = self.entries.get(relpath)
+        return entry["asset"] if entry else None
+
+    def preview_path(self, relpath):
+        """Return the file whose thumbnail a path inside root shares"""
+        self.ensure_loaded()
+        entry = self.entries.get(relpath)
+        return entry["preview"] if entry else None
+
+    def duplicates(self):
+        """Return {preview relpath: [alias relpaths]} for pictures stored more than once, exactly or nearly"""
+        self.ensure_loaded()
+        return {asset: relpaths[1:] for asset, relpaths in self._aliases.items() if len(relpaths) > 1}
+
+    def link_duplicates(self):
+        """Replace byte-identical copies with hard links to one file
+
+        Only exact copies are linked; near duplicates stay separate files.
+        Returns the number of bytes freed on disk.
+        """
+        freed = 0
+        for asset, aliases in self.duplicates().items():
+            source = self.entries[asset]
+            for relpath in aliases:
+                entry = self.entries[relpath]
+                if entry["sha1"] != source["sha1"]:
+                    continue
+                try:
+                    if os.path.samefile(entry["path"], source["path"]):
+                        continue
+                    tmp_path = entry["path"] + ".link.tmp"
+                    os.link(source["path"], tmp_path)
+                    os.replace(tmp_path, entry["path"])
+                except OSError:
+                    continue  # e.g. a filesystem without hard links
+                freed += entry["bytes"]
+        if freed:
+            self.refresh()
+        return freed
+
+    def categories(self):
+        """List the category keys that have templates"""
+        index, _ = self.ensure_loaded()
+        return sorted(set(category for category, _ in index))
+
+    def styles(self, category):
+        """List the style keys used in a category"""
+        index, _ = self.ensure_loaded()
+        category = category_key(category)
+        return sorted(style for cat, style in index if cat == category and style is not None)
+
+# Shared index used by the views
+catalogue = Catalogue()
@@ -0,0 +1,273 @@
+from utils.catalogue import IMAGE_EXTENSIONS
+from utils.image_pyramid import image_pyramid
+from utils.thumbnail_cache import THUMBNAIL_SIZE, thumbnail_cache
+import ctypes
+import ctypes.util
+import os
+import struct
+
+# How often the Tk thread checks for changes (milliseconds)
+INOTIFY_INTERVAL = 500
+POLL_INTERVAL = 2000
+
+# When polling, files edited in place don't touch their folder's mtime,
+# so every this many polls the whole library is re-stat'ed as well
+FULL_SCAN_EVERY = 15
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# struct inotify_event { int wd; uint32_t mask, cookie, len; char name[]; }
+EVENT_HEADER = struct.Struct("iIII")
+
+def _join(reldir, name):
+    """Join a path inside the library the way catalogue keys are written"""
+    return reldir + "/" + name if reldir else name
+
+class InotifySource:
+    """Reports library changes using Linux inotify through ctypes
+
+    Every folder gets a watch. Reading the non-blocking descriptor is a
+    single system call, so checking costs next to nothing when nothing
+    has changed. Raises OSError where inotify isn't available.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        try:
+            self._add_watch = libc.inotify_add_watch
+            init = libc.inotify_init1
+        except AttributeError:
+            raise OSError("inotify is not available")
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+
+        self.fd = init(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}  # watch descriptor -> folder inside root
+        if not self._watch_tree(""):
+            os.close(self.fd)
+            raise OSError(f"cannot watch {root}")
+
+    def _watch_tree(self, reldir):
+        """Watch a folder and everything below it; return False if it can't be watched"""
+        path = os.path.join(self.root, *reldir.split("/")) if reldir else self.root
+        wd = self._add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            return False
+        self.dirs[wd] = reldir
+
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            return True
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                self._watch_tree(_join(reldir, entry.name))
+        return True
+
+    def changes(self):
+        """Return (files, folders) inside root that changed since the last call"""
+        files, folders = set(), set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    # Events were lost, so look at everything again
+                    folders.add("")
+                    continue
+                if mask & IN_IGNORED:
+                    self.dirs.pop(wd, None)
+                    continue
+
+                reldir = self.dirs.get(wd)
+                if reldir is None or not name:
+                    continue
+                relpath = _join(reldir, name)
+
+                if mask & IN_ISDIR:
+                    # A folder appeared or went away: watch it and rescan it as a whole
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        self._watch_tree(relpath)
+                    folders.add(relpath)
+                elif not mask & IN_CREATE and name.lower().endswith(IMAGE_EXTENSIONS):
+                    # New files are picked up when they are closed after writing
+                    files.add(relpath)
+        return files, folders
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingSource:
+    """Reports library changes by comparing folder modification times
+
+    Adding, removing or renaming a file changes its folder's mtime, so a
+    check only stats the folders, not the files in them.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.dirs = {}  # folder inside root -> mtime_ns
+        self.polls = 0
+        self._scan_tree("")
+
+    def _scan_tree(self, reldir):
+        """Record the mtimes of a folder and everything below it"""
+        path = os.path.join(self.root, *reldir.split("/")) if reldir else self.root
+        try:
+            self.dirs[reldir] = os.stat(path).st_mtime_ns
+            entries = list(os.scandir(path))
+        except OSError:
+            return
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                self._scan_tree(_join(reldir, entry.name))
+
+    def changes(self):
+        """Return (files, folders) inside root that changed since the last call"""
+        self.polls += 1
+        if self.polls % FULL_SCAN_EVERY == 0:
+            self.dirs.clear()
+            self._scan_tree("")
+            return set(), {""}
+
+        folders = set()
+        for reldir, mtime in list(self.dirs.items()):
+            path = os.path.join(self.root, *reldir.split("/")) if reldir else self.root
+            try:
+                current = os.stat(path).st_mtime_ns
+            except OSError:
+                current = None
+            if current != mtime:
+                folders.add(reldir)
+
+        if "" not in self.dirs and os.path.isdir(self.root):
+            folders.add("")  # The library folder was created
+
+        for reldir in folders:
+            # Forget the old subfolders and record what is there now
+            for known in [d for d in self.dirs if d == reldir or d.startswith(reldir + "/") or not reldir]:
+                del self.dirs[known]
+            self._scan_tree(reldir)
+        return set(), folders
+
+    def close(self):
+        pass
+
+class CatalogueWatcher:
+    """Keeps the catalogue in step with the template folders while the app runs
+
+    Changes are picked up with inotify where the system has it and by
+    polling folder mtimes otherwise, checked from the Tk main loop with
+    after(). Changed files are re-indexed one by one, their stale
+    thumbnails and pyramids are dropped and new ones made in the background, and the
+    listeners are told which paths changed.
+    """
+
+    def __init__(self, root, catalogue, decode_service=None):
+        self.root = root
+        self.catalogue = catalogue
+        self.decode_service = decode_service
+        self.listeners = []
+        self.source = None
+        self.interval = POLL_INTERVAL
+        self._job = None
+
+    def add_listener(self, callback):
+        """Call callback(changed_paths) after the catalogue changes"""
+        self.listeners.append(callback)
+
+    def start(self):
+        """Start watching the catalogue's folder"""
+        if self.source is not None:
+            return
+        self.catalogue.ensure_loaded()
+        try:
+            self.source = InotifySource(self.catalogue.root)
+            self.interval = INOTIFY_INTERVAL
+        except OSError:
+            self.source = PollingSource(self.catalogue.root)
+            self.interval = POLL_INTERVAL
+        self._job = self.root.after(self.interval, self._poll)
+
+    def stop(self):
+        """Stop watching"""
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+        if self.source is not None:
+            self.source.close()
+            self.source = None
+
+    def _poll(self):
+        """Apply whatever changed since the last check"""
+        self._job = None
+        files, folders = self.source.changes()
+        if files or folders:
+            self.apply(files, folders)
+        self._job = self.root.after(self.interval, self._poll)
+
+    def apply(self, files, folders):
+        """Update the catalogue for changed files and folders and notify listeners"""
+        # Only the outermost changed folders need rescanning
+        folders = sorted(folders, key=len)
+        outer = []
+        for reldir in folders:
+            if not any(reldir == top or not top or reldir.startswith(top + "/") for top in outer):
+                outer.append(reldir)
+
+        before = dict(self.catalogue.entries)
+        changed = set()
+        for reldir in outer:
+            changed |= self.catalogue.rescan(reldir)
+        changed |= self.catalogue.update(files - changed)
+        if not changed:
+            return changed
+
+        self.update_thumbnails(changed, before)
+        for callback in self.listeners:
+            callback(changed)
+        return changed
+
+    def update_thumbnails(self, changed, before):
+        """Drop thumbnails and pyramids of replaced files and make the new ones in the background"""
+        assets = set()
+        for relpath in changed:
+            old = before.get(relpath)
+            if old is not None:
+                if old.get("preview", old["path"]) == old["path"]:
+                    # Only files that were their own preview had a thumbnail of their own
+                    thumbnail_cache.discard(old["path"], old["mtime"], old["bytes"], THUMBNAIL_SIZE)
+                image_pyramid.discard(old["path"], old["mtime"], old["bytes"])
+
+            asset = self.catalogue.preview_path(relpath)
+            if asset is not None and asset not in assets and self.decode_service is not None:
+                assets.add(asset)
+                self.decode_service.submit(
+                    self, lambda path=asset: thumbnail_cache.get_image(path, THUMBNAIL_SIZE),
+                    lambda img: None, lambda error: None
+                )
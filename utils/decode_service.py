@@ -0,0 +1,128 @@
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+import itertools
+import queue
+import threading
+import traceback
+
+# How often the Tk thread checks for finished decodes (milliseconds)
+POLL_INTERVAL = 15
+
+def open_scaled(path, size, upscale=False):
+    """Decode an image and resize it to fit within size, keeping its aspect ratio"""
+    with Image.open(path) as img:
+        # Let the JPEG decoder work at reduced scale when we only need a small image
+        img.draft("RGB", size)
+        img.load()
+        img = img.copy()
+
+    ratio = min(size[0] / img.width, size[1] / img.height)
+    if ratio < 1 or (upscale and ratio > 1):
+        new_size = (max(1, int(img.width * ratio)), max(1, int(img.height * ratio)))
+        img = img.resize(new_size, Image.LANCZOS)
+    return img
+
+class DecodeService:
+    """Decodes images on worker threads and hands them back on the Tk thread
+
+    load functions run on a thread pool. Their results are put on a queue
+    that the Tk main loop polls with after(), so callbacks (and any
+    PhotoImage they create) always run on the Tk thread. Every request
+    belongs to an owner, usually a view, and all of an owner's requests
+    can be cancelled when the user navigates away.
+
+    Up to max_workers loads run at once, so anything they share must be
+    safe to use from several threads; the thumbnail and pyramid stores
+    and the font service lock their own state.
+    """
+
+    def __init__(self, root, max_workers=4, poll_interval=POLL_INTERVAL):
+        self.root = root
+        self.poll_interval = poll_interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="decode")
+        self._results = queue.Queue()
+        self._requests = {}  # request id -> (owner, future, callback, error_callback)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._poll_job = None
+
+    def submit(self, owner, load, callback, error_callback=None):
+        """Run load() on a worker and call callback(result) on the Tk thread
+
+        Returns a request id that can be passed to cancel().
+        """
+        request_id = next(self._ids)
+        with self._lock:
+            future = self._executor.submit(self._run, request_id, load)
+            self._requests[request_id] = (owner, future, callback, error_callback)
+
+        if self._poll_job is None:
+            self._poll_job = self.root.after(self.poll_interval, self._poll)
+        return request_id
+
+    def submit_image(self, owner, path, size, callback, error_callback=None, upscale=False):
+        """Decode path scaled to fit size and call callback(image) on the Tk thread"""
+        return self.submit(owner, lambda: open_scaled(path, size, upscale), callback, error_callback)
+
+    def _run(self, request_id, load):
+        """Worker side of a request"""
+        with self._lock:
+            if request_id not in self._requests:
+                return  # Cancelled before it started
+
+        try:
+            self._results.put((request_id, load(), None))
+        except Exception as e:
+            self._results.put((request_id, None, e))
+
+    def _poll(self):
+        """Deliver finished requests on the Tk thread"""
+        self._poll_job = None
+        while True:
+            try:
+                request_id, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            with self._lock:
+                request = self._requests.pop(request_id, None)
+            if request is None:
+                continue  # Cancelled while it was running
+
+            _, _, callback, error_callback = request
+            try:
+                if error is None:
+                    callback(result)
+                elif error_callback:
+                    error_callback(error)
+            except Exception as e:
+                # One failing view mustn't stop the others' results being delivered
+                print(f"Decode callback error: {str(e)}")
+                traceback.print_exc()
+
+        with self._lock:
+            busy = bool(self._requests)
+        if busy:
+            self._poll_job = self.root.after(self.poll_interval, self._poll)
+
+    def cancel(self, request_id):
+        """Cancel one request; its callback will not be called"""
+        with self._lock:
+            request = self._requests.pop(request_id, None)
+        if request is not None:
+            request[1].cancel()
+
+    def cancel_owner(self, owner):
+        """Cancel every pending request of an owner"""
+        with self._lock:
+            ids = [request_id for request_id, request in self._requests.items() if request[0] is owner]
+        for request_id in ids:
+            self.cancel(request_id)
+
+    def shutdown(self):
+        """Stop the worker threads, dropping anything still queued"""
+        with self._lock:
+            for _, future, _, _ in self._requests.values():
+                future.cancel()
+            self._requests.clear()
+        self._executor.shutdown(wait=False)
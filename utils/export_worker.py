@@ -0,0 +1,213 @@
+from PIL import Image
+import itertools
+import os
+import queue
+import tempfile
+import threading
+
+# How often the Tk thread checks on running exports (milliseconds)
+POLL_INTERVAL = 50
+
+# Share of an export's progress bar given to rendering; encoding gets the rest
+RENDER_SHARE = 0.8
+
+# Encoder options per output format
+SAVE_OPTIONS = {
+    "PNG": {"optimize": True},
+    "JPEG": {"quality": 95, "subsampling": 0},
+}
+
+# Export job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+class ExportCancelled(Exception):
+    """Raised inside the worker to stop an export the user cancelled"""
+
+def write_card(img, path, dpi=None):
+    """Encode img for path's format into a temporary file next to it and return its path
+
+    The caller moves the file into place, so a failed or cancelled export
+    never leaves a half-written card behind.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    image_format = Image.registered_extensions().get(extension, "PNG")
+    options = dict(SAVE_OPTIONS.get(image_format, {}))
+    if dpi:
+        options["dpi"] = (dpi, dpi)
+    if image_format == "JPEG" and img.mode != "RGB":
+        img = img.convert("RGB")
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            img.save(f, format=image_format, **options)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    return tmp_path
+
+class ExportJob:
+    """One export and its state as last seen by the Tk thread"""
+
+    def __init__(self, job_id, scene, path, dpi, label, on_done, on_error):
+        self.id = job_id
+        self.scene = scene
+        self.path = path
+        self.dpi = dpi
+        self.label = label or os.path.basename(path)
+        self.on_done = on_done
+        self.on_error = on_error
+        self.state = QUEUED
+        self.progress = 0.0
+        self.message = "Queued"
+        self.size = None  # Pixel size of the saved card
+        self.error = None
+        self._cancelled = threading.Event()
+
+    @property
+    def finished(self):
+        return self.state in (DONE, FAILED, CANCELLED)
+
+class ExportQueue:
+    """Renders and saves cards on a worker thread, one after another
+
+    submit() snapshots the scene on the Tk thread and queues it, so the
+    user can keep editing, or queue more exports, while earlier ones are
+    composited and encoded. The worker reports progress through a queue
+    that the Tk main loop polls with after(), and every change to a job
+    is passed to the listeners and the job's callbacks on the Tk thread.
+    A cancelled job stops at its next progress step and leaves no file;
+    if the cancel comes too late to stop the file being written, the job
+    is reported as saved after all.
+    """
+
+    def __init__(self, root, poll_interval=POLL_INTERVAL):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.jobs = {}  # job id -> ExportJob, for jobs that haven't finished
+        self.listeners = []
+        self._pending = queue.Queue()
+        self._events = queue.Queue()
+        self._ids = itertools.count(1)
+        self._thread = None
+        self._poll_job = None
+
+    def add_listener(self, callback):
+        """Call callback(job) whenever an export is queued, makes progress or finishes"""
+        self.listeners.append(callback)
+
+    def submit(self, scene, path, dpi=None, label=None, on_done=None, on_error=None):
+        """Queue an export of scene to path and return its job id
+
+        on_done(job) is called once the file is in place, on_error(job)
+        if rendering or saving failed. Neither is called for cancelled jobs.
+        """
+        job = ExportJob(next(self._ids), scene.copy(), path, dpi, label, on_done, on_error)
+        self.jobs[job.id] = job
+        self._pending.put(job)
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._work, name="export", daemon=True)
+            self._thread.start()
+        if self._poll_job is None:
+            self._poll_job = self.root.after(self.poll_interval, self._poll)
+        self._notify(job)
+        return job.id
+
+    def active(self):
+        """List the unfinished jobs, oldest first"""
+        return sorted(self.jobs.values(), key=lambda job: job.id)
+
+    def cancel(self, job_id):
+        """Cancel one export; queued jobs are dropped, running ones stop at their next step"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        job._cancelled.set()
+        if job.state == QUEUED:
+            self._finish(job, CANCELLED, "Cancelled")
+
+    def cancel_all(self):
+        """Cancel every unfinished export"""
+        for job in self.active():
+            self.cancel(job.id)
+
+    def _work(self):
+        """Worker thread: run queued jobs in order"""
+        while True:
+            job = self._pending.get()
+            if not job._cancelled.is_set():
+                self._run(job)
+            job.scene = None  # Let the snapshot's images go
+
+    def _run(self, job):
+        """Render and save one job, reporting back through the event queue"""
+        def progress(done, total):
+            if job._cancelled.is_set():
+                raise ExportCancelled()
+            self._events.put((job, RUNNING, RENDER_SHARE * done / total, "Rendering", None))
+
+        try:
+            self._events.put((job, RUNNING, 0.0, "Rendering", None))
+            img = job.scene.render(job.dpi, progress=progress)
+
+            self._events.put((job, RUNNING, RENDER_SHARE, "Saving", None))
+            tmp_path = write_card(img, job.path, job.dpi)
+            # Last chance to back out; once the file is replaced it is reported as saved
+            if job._cancelled.is_set():
+                os.remove(tmp_path)
+                raise ExportCancelled()
+            os.replace(tmp_path, job.path)
+            self._events.put((job, DONE, 1.0, "Saved", img.size))
+        except ExportCancelled:
+            self._events.put((job, CANCELLED, job.progress, "Cancelled", None))
+        except Exception as e:
+            self._events.put((job, FAILED, job.progress, str(e), e))
+
+    def _poll(self):
+        """Apply worker reports on the Tk thread"""
+        self._poll_job = None
+        while True:
+            try:
+                job, state, fraction, message, detail = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if job.finished:
+                if job.state == CANCELLED and state == DONE:
+                    # Cancelled after the worker had already taken it, and the
+                    # file got written anyway: say so rather than hide it
+                    job.size, job.progress = detail, fraction
+                    self._finish(job, DONE, "Saved")
+                continue  # Otherwise it was cancelled while it was queued
+
+            if state == RUNNING:
+                job.state, job.progress, job.message = state, fraction, message
+                self._notify(job)
+            else:
+                if state == DONE:
+                    job.size = detail
+                elif state == FAILED:
+                    job.error = detail
+                job.progress = fraction
+                self._finish(job, state, message)
+
+        if self.jobs:
+            self._poll_job = self.root.after(self.poll_interval, self._poll)
+
+    def _finish(self, job, state, message):
+        """Mark a job finished and tell everyone about it"""
+        job.state, job.message = state, message
+        self.jobs.pop(job.id, None)
+        self._notify(job)
+        if state == DONE and job.on_done:
+            job.on_done(job)
+        elif state == FAILED and job.on_error:
+            job.on_error(job)
+
+    def _notify(self, job):
+        for callback in self.listeners:
+            callback(job)
@@ -0,0 +1,220 @@
+from collections import OrderedDict
+from PIL import ImageFont
+import os
+import re
+import sys
+import threading
+
+# Font files the service can load
+FONT_EXTENSIONS = (".ttf", ".otf", ".ttc")
+
+# Loaded fonts kept, one per (file, size)
+DEFAULT_MAX_FONTS = 64
+
+# Measured text runs kept
+DEFAULT_MAX_METRICS = 4096
+
+# Families tried, in order, when the one asked for isn't installed
+FALLBACK_FAMILIES = {
+    "arial": ("arial", "helvetica", "liberation sans", "arimo", "dejavu sans"),
+    "helvetica": ("helvetica", "arial", "liberation sans", "dejavu sans"),
+    "verdana": ("verdana", "dejavu sans", "liberation sans"),
+    "times new roman": ("times new roman", "times", "liberation serif", "tinos", "dejavu serif"),
+    "courier": ("courier new", "courier", "liberation mono", "cousine", "dejavu sans mono"),
+    "courier new": ("courier new", "courier", "liberation mono", "cousine", "dejavu sans mono"),
+}
+DEFAULT_FALLBACKS = ("arial", "liberation sans", "dejavu sans")
+
+# Font styles preferred when a family has several files
+REGULAR_STYLES = ("regular", "book", "roman", "normal", "medium")
+
+def font_dirs():
+    """List the folders fonts are looked for in on this system"""
+    home = os.path.expanduser("~")
+    if sys.platform.startswith("win"):
+        windir = os.environ.get("WINDIR", r"C:\Windows")
+        return [os.path.join(windir, "Fonts"),
+                os.path.join(os.environ.get("LOCALAPPDATA", home), "Microsoft", "Windows", "Fonts")]
+    if sys.platform == "darwin":
+        return ["/System/Library/Fonts", "/Library/Fonts", os.path.join(home, "Library", "Fonts")]
+    return ["/usr/share/fonts", "/usr/local/share/fonts",
+            os.path.join(home, ".fonts"), os.path.join(home, ".local", "share", "fonts")]
+
+def normalize(name):
+    """Reduce a family name or file name to lowercase letters and digits ("DejaVu Sans" -> "dejavusans")"""
+    if name.lower().endswith(FONT_EXTENSIONS):
+        name = os.path.splitext(os.path.basename(name))[0]
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+class FontService:
+    """Shared font loading and text measuring
+
+    Names such as "Arial", "arial.ttf" or a path are resolved to a font
+    file once, by file name first and then by the family names inside the
+    installed fonts, with common stand-ins when a family isn't installed
+    (Liberation or DejaVu for Arial on Linux, say). Loaded fonts are kept
+    per (file, size) in an LRU, and so are the measurements of text runs,
+    so laying out the same text again doesn't touch FreeType. Safe to use
+    from the export worker and the Tk thread at once.
+    """
+
+    def __init__(self, dirs=None, max_fonts=DEFAULT_MAX_FONTS, max_metrics=DEFAULT_MAX_METRICS):
+        self.dirs = dirs if dirs is not None else font_dirs()
+        self.max_fonts = max_fonts
+        self.max_metrics = max_metrics
+        self._lock = threading.RLock()
+        self._files = None  # normalized file name -> path
+        self._families = None  # normalized family name -> path
+        self._resolved = {}  # name asked for -> path or None
+        self._fonts = OrderedDict()  # (path, size) -> font
+        self._metrics = OrderedDict()  # (font key, text) -> bbox
+
+    def files(self):
+        """Map normalized file names to font files, scanning the font folders once"""
+        with self._lock:
+            if self._files is None:
+                files = {}
+                for directory in self.dirs:
+                    for folder, _, names in os.walk(directory):
+                        for name in sorted(names):
+                            if name.lower().endswith(FONT_EXTENSIONS):
+                                files.setdefault(normalize(name), os.path.join(folder, name))
+                self._files = files
+            return self._files
+
+    def families(self):
+        """Map normalized family names to font files, preferring each family's regular style
+
+        Reads the name table of every installed font, so it is only done
+        the first time a name doesn't match a file name.
+        """
+        with self._lock:
+            if self._families is None:
+                families = {}
+                for path in self.files().values():
+                    try:
+                        family, style = ImageFont.truetype(path, 12).getname()
+                    except (OSError, ValueError):
+                        continue
+                    if not family:
+                        continue
+                    key, style = normalize(family), (style or "").lower()
+                    current = families.get(key)
+                    if current is None or (style in REGULAR_STYLES and current[1] not in REGULAR_STYLES):
+                        families[key] = (path, style)
+                self._families = {key: path for key, (path, _) in families.items()}
+            return self._families
+
+    def _find(self, name):
+        """Look a font name up among the installed fonts"""
+        key = normalize(name)
+        if key in self.files():
+            return self.files()[key]
+        return self.families().get(key)
+
+    def resolve(self, name):
+        """Return the font file for a family name, file name or path, or None"""
+        with self._lock:
+            if name in self._resolved:
+                return self._resolved[name]
+
+            if os.path.isfile(name):
+                path = name
+            else:
+                path = self._find(name)
+                if path is None:
+                    family = os.path.splitext(os.path.basename(name))[0].lower()
+                    for fallback in FALLBACK_FAMILIES.get(family, DEFAULT_FALLBACKS):
+                        path = self._find(fallback)
+                        if path is not None:
+                            break
+            self._resolved[name] = path
+            return path
+
+    def get_font(self, name, size):
+        """Return a font for a name at a pixel size, or PIL's default font if none can be found"""
+        size = max(1, int(round(size)))
+        path = self.resolve(name)
+        key = (path, size)
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is not None:
+                self._fonts.move_to_end(key)
+                return font
+
+            font = None
+            if path is not None:
+                try:
+                    font = ImageFont.truetype(path, size)
+                except OSError:
+                    font = None
+            if font is None:
+                try:
+                    font = ImageFont.load_default(size)
+                except TypeError:
+                    font = ImageFont.load_default()  # Pillow without a scalable default font
+
+            self._fonts[key] = font
+            while len(self._fonts) > self.max_fonts:
+                self._fonts.popitem(last=False)
+            return font
+
+    def _font_key(self, font):
+        """Identify a font for the metrics cache, or return None if it can't be
+
+        Fonts not loaded from a file (PIL's default font, say) have nothing
+        stable to key on; an id() could be reused by another font once this
+        one is gone, so they are measured every time.
+        """
+        path = getattr(font, "path", None)
+        if not isinstance(path, str):
+            return None
+        return path, getattr(font, "size", None)
+
+    def text_bbox(self, text, font):
+        """Return the (left, top, right, bottom) box of a line of text drawn at (0, 0)"""
+        font_key = self._font_key(font)
+        if font_key is None:
+            return font.getbbox(text)
+        key = (font_key, text)
+        with self._lock:
+            bbox = self._metrics.get(key)
+            if bbox is not None:
+                self._metrics.move_to_end(key)
+                return bbox
+
+            bbox = font.getbbox(text)
+            self._metrics[key] = bbox
+            while len(self._metrics) > self.max_metrics:
+                self._metrics.popitem(last=False)
+            return bbox
+
+    def text_size(self, text, font):
+        """Return the (width, height) of a line of text"""
+        left, top, right, bottom = self.text_bbox(text, font)
+        return right - left, bottom - top
+
+    def text_width(self, text, font):
+        """Return the width a line of text takes up, for wrapping"""
+        left, _, right, _ = self.text_bbox(text, font)
+        return right - left
+
+    def clear(self):
+        """Forget loaded fonts and measurements, e.g. after fonts were installed"""
+        with self._lock:
+            self._files = None
+            self._families = None
+            self._resolved.clear()
+            self._fonts.clear()
+            self._metrics.clear()
+
+# Shared service used by the views, the exporter and the designer
+font_service = FontService()
+
+def get_font(name, size):
+    """Return a font for a name at a pixel size using the shared service"""
+    return font_service.get_font(name, size)
+
+def text_size(text, font):
+    """Return the (width, height) of a line of text using the shared service"""
+    return font_service.text_size(text, font)
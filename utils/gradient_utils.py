@@ -0,0 +1,138 @@
+from PIL import Image, ImageChops
+import math
+# Make numpy optional
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+GRADIENT_KINDS = ("vertical", "horizontal", "diagonal", "radial")
+
+# Radial ramp for the PIL fallback, made on first use
+_radial_ramps = []
+
+def normalize_stops(stops):
+    """Turn a list of colors or (position, color) pairs into sorted (position, rgb) pairs"""
+    if not stops:
+        raise ValueError("A gradient needs at least one color stop")
+
+    # Plain colors are spread evenly between 0 and 1
+    if not all(len(stop) == 2 and isinstance(stop[1], (tuple, list)) for stop in stops):
+        count = len(stops)
+        if count == 1:
+            return [(0.0, tuple(stops[0][:3])), (1.0, tuple(stops[0][:3]))]
+        return [(i / (count - 1), tuple(color[:3])) for i, color in enumerate(stops)]
+
+    normalized = sorted((float(position), tuple(color[:3])) for position, color in stops)
+    if len(normalized) == 1:
+        normalized.append((1.0, normalized[0][1]))
+    return normalized
+
+def create_gradient(width, height, stops, kind="vertical"):
+    """Create an RGB gradient image in one pass instead of line by line
+
+    stops is either a list of colors (spread evenly) or a list of
+    (position, color) pairs with positions between 0 and 1.
+    """
+    if kind not in GRADIENT_KINDS:
+        raise ValueError(f"Unknown gradient kind: {kind}")
+
+    stops = normalize_stops(stops)
+
+    if NUMPY_AVAILABLE:
+        return _create_gradient_numpy(width, height, stops, kind)
+    return _create_gradient_pil(width, height, stops, kind)
+
+def _create_gradient_numpy(width, height, stops, kind):
+    """Build the gradient with NumPy arrays"""
+    positions = [position for position, _ in stops]
+
+    if kind in ("vertical", "horizontal"):
+        # Only one strip needs interpolating
+        length = height if kind == "vertical" else width
+        t = np.arange(length, dtype=np.float64) / length
+        strip = np.empty((length, 3), dtype=np.uint8)
+        for channel in range(3):
+            values = [color[channel] for _, color in stops]
+            strip[:, channel] = np.interp(t, positions, values)
+
+        # Stretching a one pixel strip is a single C-level resize
+        if kind == "vertical":
+            strip_image = Image.fromarray(strip[:, None, :], "RGB")
+        else:
+            strip_image = Image.fromarray(strip[None, :, :], "RGB")
+        return strip_image.resize((width, height), Image.NEAREST)
+
+    # Diagonal and radial gradients need a full position field
+    ys = np.arange(height, dtype=np.float32)[:, None]
+    xs = np.arange(width, dtype=np.float32)[None, :]
+    if kind == "diagonal":
+        t = (xs / width + ys / height) / 2
+    else:
+        # Elliptical distance from the center, 1.0 at the corners
+        nx = (xs - width / 2) / (width / 2)
+        ny = (ys - height / 2) / (height / 2)
+        t = np.minimum(np.sqrt((nx * nx + ny * ny) / 2), 1.0)
+
+    # Interpolate the stops once into a 256 entry palette and let PIL expand it
+    levels = np.linspace(0.0, 1.0, 256)
+    palette = np.empty((256, 3), dtype=np.uint8)
+    for channel in range(3):
+        values = [color[channel] for _, color in stops]
+        palette[:, channel] = np.interp(levels, positions, values)
+    indices = Image.fromarray((t * 255 + 0.5).astype(np.uint8), "P")
+    indices.putpalette(palette.tobytes())
+    return indices.convert("RGB")
+
+def _create_gradient_pil(width, height, stops, kind):
+    """Build the gradient from PIL's built-in ramps and per-channel lookup tables"""
+    if kind == "vertical":
+        ramp = Image.linear_gradient("L").resize((width, height), Image.BILINEAR)
+    elif kind == "horizontal":
+        ramp = Image.linear_gradient("L").rotate(90).resize((width, height), Image.BILINEAR)
+    elif kind == "diagonal":
+        vertical = Image.linear_gradient("L").resize((width, height), Image.BILINEAR)
+        horizontal = Image.linear_gradient("L").rotate(90).resize((width, height), Image.BILINEAR)
+        ramp = ImageChops.add(vertical, horizontal, scale=2.0)
+    else:
+        ramp = _radial_ramp().resize((width, height), Image.BILINEAR)
+
+    # Map ramp values (0-255) to colors through a lookup table per channel
+    channels = []
+    for channel in range(3):
+        lut = [_interpolate_channel(stops, value / 255, channel) for value in range(256)]
+        channels.append(ramp.point(lut))
+    return Image.merge("RGB", channels)
+
+def _radial_ramp():
+    """Return a 256x256 ramp of elliptical distance from the center, 255 at the corners
+
+    Uses the same normalisation as the NumPy path, so both reach the last
+    stop in the corners; PIL's own radial_gradient is scaled differently
+    between versions.
+    """
+    if not _radial_ramps:
+        values = []
+        for y in range(256):
+            ny = (y - 128) / 128
+            for x in range(256):
+                nx = (x - 128) / 128
+                t = min(math.sqrt((nx * nx + ny * ny) / 2), 1.0)
+                values.append(int(t * 255 + 0.5))
+        ramp = Image.new("L", (256, 256))
+        ramp.putdata(values)
+        _radial_ramps.append(ramp)
+    return _radial_ramps[0]
+
+def _interpolate_channel(stops, t, channel):
+    """Interpolate a single channel value at position t"""
+    if t <= stops[0][0]:
+        return stops[0][1][channel]
+    for (pos1, color1), (pos2, color2) in zip(stops, stops[1:]):
+        if t <= pos2:
+            if pos2 == pos1:
+                return color2[channel]
+            ratio = (t - pos1) / (pos2 - pos1)
+            return int(color1[channel] + (color2[channel] - color1[channel]) * ratio)
+    return stops[-1][1][channel]
@@ -0,0 +1,209 @@
+from collections import namedtuple
+from utils.scene_graph import ImageNode, TextNode
+import hashlib
+
+# Undo steps kept per card
+DEFAULT_MAX_STEPS = 100
+
+# Immutable records of one node at one point in time. Images are referred
+# to by their key in the ImageStore rather than held directly.
+TextState = namedtuple("TextState", "id x y z text font size color wrap_width")
+ImageState = namedtuple("ImageState", "id x y z image source_image source_path path scale")
+
+class ImageStore:
+    """Content-addressed store of the images referred to by history snapshots
+
+    Each distinct picture is kept once under the SHA-1 of its pixels, no
+    matter how many snapshots refer to it. Hashing is done once per image
+    object, which relies on the scene graph's rule that images are never
+    changed in place: an edit puts a new image on the node instead.
+    """
+
+    def __init__(self):
+        self._images = {}  # key -> image
+        self._keys = {}  # id(image) -> (image, key)
+
+    def put(self, img):
+        """Store an image and return its key"""
+        known = self._keys.get(id(img))
+        if known is not None and known[0] is img:
+            return known[1]
+
+        digest = hashlib.sha1(f"{img.mode}|{img.size}|".encode("ascii"))
+        digest.update(img.tobytes())
+        key = digest.hexdigest()
+        self._images.setdefault(key, img)
+        self._keys[id(img)] = (img, key)
+        return key
+
+    def get(self, key):
+        return self._images[key]
+
+    def retain(self, keys):
+        """Drop every image whose key isn't in keys"""
+        for key in [key for key in self._images if key not in keys]:
+            del self._images[key]
+        self._keys = {ident: (img, key) for ident, (img, key) in self._keys.items() if key in keys}
+
+    def total_bytes(self):
+        """Return roughly how much memory the stored pixels take"""
+        return sum(len(img.getbands()) * img.width * img.height for img in self._images.values())
+
+    def __len__(self):
+        return len(self._images)
+
+class History:
+    """Undo and redo for a scene graph, built on immutable snapshots
+
+    A snapshot is a tuple of per-node records. A record is only created
+    for a node that changed since the last snapshot, so consecutive
+    snapshots share every untouched record and a step costs a tuple of
+    references plus the records of the nodes that changed. Images are
+    referred to by hash, so an enhanced image and the one it replaced are
+    each stored once however deep the history goes.
+    """
+
+    def __init__(self, scene_graph, max_steps=DEFAULT_MAX_STEPS):
+        self.scene_graph = scene_graph
+        self.max_steps = max_steps
+        self.images = ImageStore()
+        self.undo_stack = []  # (label, snapshot) pairs, oldest first
+        self.redo_stack = []
+        self.current = ()
+        self._states = {}  # node id -> last record made for it
+
+    def _state(self, node):
+        """Return the record of a node, reusing the previous one if nothing changed"""
+        if isinstance(node, TextNode):
+            state = TextState(node.id, node.x, node.y, node.z, node.text, node.font,
+                              node.size, node.color, node.wrap_width)
+        else:
+            source_image = None if isinstance(node.source, str) else self.images.put(node.source)
+            source_path = node.source if isinstance(node.source, str) else None
+            state = ImageState(node.id, node.x, node.y, node.z, self.images.put(node.image),
+                               source_image, source_path, node.path, node.scale)
+
+        previous = self._states.get(node.id)
+        if previous == state:
+            return previous
+        self._states[node.id] = state
+        return state
+
+    def capture(self):
+        """Return a snapshot of the scene graph as it is now"""
+        return tuple(self._state(node) for node in self.scene_graph.ordered())
+
+    def reset(self):
+        """Forget the history and start again from the scene graph's current state"""
+        self.undo_stack = []
+        self.redo_stack = []
+        self._states = {}
+        self.current = self.capture()
+        self._prune()
+
+    def commit(self, label):
+        """Record the scene graph's current state as an undoable step
+
+        Returns False if nothing changed since the last step.
+        """
+        snapshot = self.capture()
+        if snapshot == self.current:
+            return False
+
+        self.undo_stack.append((label, self.current))
+        self.current = snapshot
+        self.redo_stack = []
+        if len(self.undo_stack) > self.max_steps:
+            del self.undo_stack[:len(self.undo_stack) - self.max_steps]
+        self._prune()
+        return True
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def undo(self, pending_label="Edit"):
+        """Go back one step; returns its label, or None if there is nothing to undo
+
+        Changes made since the last commit are committed first, under
+        pending_label, so they are the step that gets undone.
+        """
+        self.commit(pending_label)
+        if not self.undo_stack:
+            return None
+        label, snapshot = self.undo_stack.pop()
+        self.redo_stack.append((label, self.current))
+        self._restore(snapshot)
+        return label
+
+    def redo(self, pending_label="Edit"):
+        """Redo the last undone step; returns its label, or None if there is nothing to redo
+
+        Changes made since the last commit are committed first, under
+        pending_label, which starts a new branch and so leaves nothing to redo.
+        """
+        self.commit(pending_label)
+        if not self.redo_stack:
+            return None
+        label, snapshot = self.redo_stack.pop()
+        self.undo_stack.append((label, self.current))
+        self._restore(snapshot)
+        return label
+
+    def _restore(self, snapshot):
+        """Make the scene graph match a snapshot, touching only the nodes that differ
+
+        Only called with everything committed, so a node whose last record
+        is the one wanted really is in that state.
+        """
+        graph = self.scene_graph
+        wanted = {state.id: state for state in snapshot}
+        for node_id in [node_id for node_id in graph.nodes if node_id not in wanted]:
+            graph.remove(node_id)
+
+        for state in snapshot:
+            node = graph.get(state.id)
+            if node is not None and self._states.get(state.id) is state:
+                continue  # Unchanged since it was last recorded
+
+            if isinstance(state, TextState):
+                props = {"x": state.x, "y": state.y, "text": state.text, "font": state.font,
+                         "size": state.size, "color": state.color, "wrap_width": state.wrap_width}
+                if node is None:
+                    node = TextNode(state.text, state.x, state.y, state.font, state.size,
+                                    state.color, state.wrap_width)
+            else:
+                image = self.images.get(state.image)
+                source = self.images.get(state.source_image) if state.source_image else state.source_path
+                props = {"x": state.x, "y": state.y, "image": image, "source": source,
+                         "path": state.path, "scale": state.scale}
+                if node is None:
+                    node = ImageNode(image, state.x, state.y, source, state.path, state.scale)
+
+            if node.id is None:
+                graph.add(node, node_id=state.id, z=state.z)
+            else:
+                # Only pass on what differs, so unchanged images keep their canvas copies
+                for name in list(props):
+                    value, current = props[name], getattr(node, name)
+                    if current is value or (name not in ("image", "source") and current == value):
+                        del props[name]
+                if props:
+                    graph.update(node.id, **props)
+                graph.set_z(node.id, state.z)
+            self._states[state.id] = state
+
+        self.current = snapshot
+
+    def _prune(self):
+        """Let go of images no snapshot refers to any more"""
+        keys = set()
+        for snapshot in [self.current] + [s for _, s in self.undo_stack] + [s for _, s in self.redo_stack]:
+            for state in snapshot:
+                if isinstance(state, ImageState):
+                    keys.add(state.image)
+                    if state.source_image:
+                        keys.add(state.source_image)
+        self.images.retain(keys)
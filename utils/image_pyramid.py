@@ -0,0 +1,224 @@
+from collections import OrderedDict
+from PIL import Image
+from utils.decode_service import open_scaled
+import hashlib
+import os
+import tempfile
+import threading
+
+# Where the pyramid levels are kept between runs, under the project root
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PYRAMID_DIR = os.path.join(PROJECT_ROOT, "cache", "pyramids")
+
+# Levels kept per image, as divisors of the full size; full size is the original file
+LEVELS = (2, 4, 8)
+
+# Size budget for the pyramids on disk
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+class ImagePyramid:
+    """Persistent reduced copies of template images for previews
+
+    Templates are kept at 1/2, 1/4 and 1/8 size, each level made by
+    box-filtering the one above it, and stored as binary PPM files, which
+    PIL reads without any decompression. A request for a given size reads
+    the smallest level that is at least that big and resizes it the rest
+    of the way, which is a much cheaper resize than starting from the
+    original. Requests that need full size or more are served from the
+    original file, which is never copied.
+
+    Levels are made lazily, the first time a size that needs them is
+    asked for: a 1/4 level is reduced from the 1/2 one, which is decoded
+    from the original only if it isn't stored yet.
+
+    Pyramids are keyed by the source file's path, modification time and
+    size, like the thumbnail cache. Images with transparency have no
+    pyramid and are decoded directly. The store keeps a running total of
+    its size and the order its levels were used in, so staying within
+    the budget never rescans the directory. Safe to use from the decode
+    workers and the Tk thread at once.
+    """
+
+    def __init__(self, cache_dir=PYRAMID_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._sizes = {}  # key -> full (width, height)
+        self._levels = None  # level path -> bytes on disk, least recently used first
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+
+    def key(self, path):
+        """Build the cache key for the pyramid of path"""
+        stat = os.stat(path)
+        return self.key_for(path, stat.st_mtime_ns, stat.st_size)
+
+    def key_for(self, path, mtime_ns, nbytes):
+        """Build the cache key for a given version of path"""
+        payload = f"{os.path.abspath(path)}|{mtime_ns}|{nbytes}"
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def level_path(self, key, divisor):
+        """Return the file path of one level of a pyramid"""
+        return os.path.join(self.cache_dir, key[:2], f"{key}_{divisor}.ppm")
+
+    def full_size(self, path):
+        """Return the (width, height) of path at full size"""
+        key = self.key(path)
+        size = self._sizes.get(key)
+        if size is None:
+            with Image.open(path) as img:
+                size = img.size  # Only the header is read
+            self._sizes[key] = size
+        return size
+
+    def choose_level(self, full_size, size):
+        """Return the divisor of the smallest level that still covers size (1 for the original)"""
+        width, height = full_size
+        ratio = min(size[0] / width, size[1] / height)
+        chosen = 1
+        for divisor in LEVELS:
+            if 1 / divisor >= ratio:
+                chosen = divisor
+        return chosen
+
+    def get_level(self, path, divisor, key=None):
+        """Return one level of path's pyramid, making it and the levels above it if needed
+
+        Returns None if the image has transparency and so has no pyramid.
+        """
+        key = key or self.key(path)
+        if divisor == 1:
+            with Image.open(path) as img:
+                if "A" in img.getbands() or "transparency" in img.info:
+                    return None
+                return img.convert("RGB")
+
+        level_path = self.level_path(key, divisor)
+        try:
+            img = Image.open(level_path)
+            img.load()
+            self._touch(level_path)
+            return img
+        except (OSError, ValueError):
+            pass
+
+        above = self.get_level(path, divisor // 2, key)
+        if above is None:
+            return None
+        # Each level is a box-filtered half of the one above it
+        img = above.reduce(2)
+        self._store(level_path, img)
+        return img
+
+    def get_image(self, path, size, upscale=False):
+        """Return path resized to fit within size, starting from the nearest level"""
+        try:
+            full_size = self.full_size(path)
+            divisor = self.choose_level(full_size, size)
+            img = self.get_level(path, divisor) if divisor > 1 else None
+        except (OSError, ValueError):
+            img = None
+        if img is None:
+            # Full size or no pyramid for this image, so decode the original directly
+            return open_scaled(path, size, upscale)
+
+        # Work the fit out from the full size so every level gives the same size
+        width, height = full_size
+        ratio = min(size[0] / width, size[1] / height)
+        if ratio < 1 or (upscale and ratio > 1):
+            width, height = max(1, int(width * ratio)), max(1, int(height * ratio))
+        if img.size != (width, height):
+            img = img.resize((width, height), Image.LANCZOS)
+        return img
+
+    def _store(self, level_path, img):
+        """Write one level atomically and keep the store within its budget"""
+        directory = os.path.dirname(level_path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                img.save(f, format="PPM")
+            os.replace(tmp_path, level_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        nbytes = os.path.getsize(level_path)
+        with self._lock:
+            levels = self._index()
+            self._total_bytes += nbytes - levels.pop(level_path, 0)
+            levels[level_path] = nbytes
+        self.evict()
+
+    def _touch(self, level_path):
+        """Mark a level as just used"""
+        with self._lock:
+            levels = self._index()
+            if level_path in levels:
+                levels.move_to_end(level_path)
+
+    def discard(self, path, mtime_ns, nbytes):
+        """Remove the pyramid of an old version of path, e.g. after it was edited"""
+        key = self.key_for(path, mtime_ns, nbytes)
+        self._sizes.pop(key, None)
+        for divisor in LEVELS:
+            level_path = self.level_path(key, divisor)
+            try:
+                os.remove(level_path)
+            except OSError:
+                continue
+            with self._lock:
+                self._total_bytes -= self._index().pop(level_path, 0)
+
+    def _index(self):
+        """Return the stored levels, scanning the directory the first time only"""
+        if self._levels is not None:
+            return self._levels
+
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for bucket in os.scandir(self.cache_dir):
+                if not bucket.is_dir():
+                    continue
+                for entry in os.scandir(bucket.path):
+                    if entry.name.endswith(".ppm"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, entry.path, stat.st_size))
+        self._levels = OrderedDict((path, size) for _, path, size in sorted(entries))
+        self._total_bytes = sum(self._levels.values())
+        return self._levels
+
+    def total_bytes(self):
+        """Return the current size of the store on disk"""
+        with self._lock:
+            self._index()
+            return self._total_bytes
+
+    def evict(self):
+        """Delete the least recently used levels until the store fits its budget"""
+        with self._lock:
+            levels = self._index()
+            while self._total_bytes > self.max_bytes and levels:
+                path, size = levels.popitem(last=False)
+                self._total_bytes -= size
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def clear(self):
+        """Remove every stored pyramid"""
+        with self._lock:
+            for path in self._index():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._levels = OrderedDict()
+            self._total_bytes = 0
+            self._sizes.clear()
+
+# Shared store used by the views
+image_pyramid = ImagePyramid()
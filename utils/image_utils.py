@@ -1,4 +1,5 @@
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
+from utils.font_service import get_font, text_size
 import os
 
 def create_placeholder_image(width, height, color, text=""):
@@ -7,13 +8,10 @@ def create_placeholder_image(width, height, color, text=""):
     
     if text:
         draw = ImageDraw.Draw(img)
-        try:
-            font = ImageFont.truetype("arial.ttf", 36)
-        except:
-            font = ImageFont.load_default()
+        font = get_font("arial.ttf", 36)
         
         # Draw text in the center
-        text_width, text_height = draw.textsize(text, font=font)
+        text_width, text_height = text_size(text, font)
         position = ((width - text_width) // 2, (height - text_height) // 2)
         draw.text(position, text, fill=(255, 255, 255), font=font)
     
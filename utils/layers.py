@@ -0,0 +1,217 @@
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+import math
+
+def split_color(color):
+    """Split a color into an (r, g, b) tuple and an alpha value"""
+    if isinstance(color, str):
+        color = ImageColor.getrgb(color)
+    if len(color) == 4:
+        return tuple(color[:3]), color[3]
+    return tuple(color), 255
+
+def is_translucent(options):
+    """Return True if any ink of a primitive has alpha below 255"""
+    for part in ("fill", "outline"):
+        color = options.get(part)
+        if color is not None and split_color(color)[1] < 255:
+            return True
+    return False
+
+def draw_primitive(draw, kind, points, options, fill=None, outline=None):
+    """Draw one recorded primitive on an ImageDraw with the given inks"""
+    if kind in ("rectangle", "ellipse", "polygon"):
+        getattr(draw, kind)(points, fill=fill, outline=outline, width=options["width"])
+    elif kind == "arc":
+        draw.arc(points, options["start"], options["end"], fill=fill, width=options["width"])
+    elif kind == "line":
+        draw.line(points, fill=fill, width=options["width"], joint=options.get("joint"))
+    elif kind == "point":
+        draw.point(points, fill=fill)
+    elif kind == "text":
+        draw.text(points[0], options["text"], fill=fill, font=options["font"],
+                  anchor=options["anchor"], **options["extra"])
+    else:
+        raise ValueError(f"Unknown primitive: {kind}")
+
+def paste_sprite(target, sprite, position):
+    """Blend an RGBA sprite onto target with its top-left corner at position"""
+    x, y = position
+    box = clamp_bbox((x, y, x + sprite.width - 1, y + sprite.height - 1), target.size)
+    if box is None:
+        return
+    if (box[2] - box[0], box[3] - box[1]) != sprite.size:
+        sprite = sprite.crop((box[0] - x, box[1] - y, box[2] - x, box[3] - y))
+
+    if target.mode == "RGBA":
+        target.alpha_composite(sprite, dest=box[:2])
+    else:
+        # Pasting through the sprite's own alpha is source-over on an opaque image
+        target.paste(sprite, box[:2], sprite)
+
+def points_bbox(points, pad):
+    """Return the bounding box of a point list grown by pad pixels"""
+    xs = [x for x, _ in points]
+    ys = [y for _, y in points]
+    return (min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad)
+
+def clamp_bbox(bbox, size):
+    """Round a bounding box outwards to whole pixels and clip it to an image size"""
+    x0, y0, x1, y1 = bbox
+    x0 = max(0, int(math.floor(x0)))
+    y0 = max(0, int(math.floor(y0)))
+    x1 = min(size[0], int(math.ceil(x1)) + 1)
+    y1 = min(size[1], int(math.ceil(y1)) + 1)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return (x0, y0, x1, y1)
+
+def supersample_op(kind, points, options, bbox, factor):
+    """Map a recorded primitive onto a canvas factor times larger"""
+    # Pixel centres of the small canvas sit in the middle of each factor x factor block
+    shift = (factor - 1) / 2
+    points = [(x * factor + shift, y * factor + shift) for x, y in points]
+    bbox = tuple(value * factor + shift for value in bbox)
+    bbox = (bbox[0] - shift, bbox[1] - shift, bbox[2] + shift, bbox[3] + shift)
+    options = dict(options)
+
+    if kind in ("rectangle", "ellipse", "arc") and len(points) == 2:
+        # Bounding boxes include their last pixel, so they grow to whole blocks
+        (x0, y0), (x1, y1) = points
+        points = [(x0 - shift, y0 - shift), (x1 + shift, y1 + shift)]
+    elif kind == "point":
+        # A point stays one small pixel, so it becomes a full block up here
+        kind = "rectangle"
+        points = [(x - shift, y - shift, x + shift, y + shift) for x, y in points]
+        points = [corner for x0, y0, x1, y1 in points for corner in ((x0, y0), (x1, y1))]
+        options.update(outline=None, width=0)
+        if len(points) > 2:
+            return [(kind, points[i:i + 2], options, bbox) for i in range(0, len(points), 2)]
+    elif kind == "sprite":
+        sprite = options["sprite"]
+        options["sprite"] = sprite.resize((sprite.width * factor, sprite.height * factor), Image.NEAREST)
+        points = [(int(round(x - shift)), int(round(y - shift))) for x, y in points]
+    elif kind == "text":
+        font = options["font"]
+        if isinstance(font, ImageFont.FreeTypeFont):
+            options["font"] = font.font_variant(size=font.size * factor)
+    if "width" in options and options["width"]:
+        options["width"] = options["width"] * factor
+
+    return [(kind, points, options, bbox)]
+
+class Layer:
+    """A display list of primitives that is composited as one RGBA layer
+
+    Primitives are recorded in pixel coordinates together with their
+    bounding box. When the layer is composited only the union of those
+    boxes is allocated, painted and blended onto the target image.
+    """
+
+    def __init__(self, supersample=1):
+        self.ops = []
+        self.bbox = None
+        self.supersample = supersample
+
+    def add(self, kind, points, options, bbox):
+        """Record a primitive"""
+        self.ops.append((kind, points, options, bbox))
+        if self.bbox is None:
+            self.bbox = bbox
+        else:
+            self.bbox = (min(self.bbox[0], bbox[0]), min(self.bbox[1], bbox[1]),
+                         max(self.bbox[2], bbox[2]), max(self.bbox[3], bbox[3]))
+
+    def _tile_ops(self, box):
+        """Yield the recorded primitives in the coordinates of a tile covering box"""
+        ox, oy = box[0], box[1]
+        for kind, points, options, bbox in self.ops:
+            points = [(x - ox, y - oy) for x, y in points]
+            bbox = (bbox[0] - ox, bbox[1] - oy, bbox[2] - ox, bbox[3] - oy)
+            if self.supersample > 1:
+                yield from supersample_op(kind, points, options, bbox, self.supersample)
+            else:
+                yield kind, points, options, bbox
+
+    def render(self, box):
+        """Paint every primitive into a transparent RGBA tile covering box
+
+        With supersample above 1 the tile is painted that many times larger
+        and box-filtered back down, which antialiases every edge.
+        """
+        factor = self.supersample
+        tile = Image.new("RGBA", ((box[2] - box[0]) * factor, (box[3] - box[1]) * factor), (0, 0, 0, 0))
+        tile_draw = ImageDraw.Draw(tile)
+
+        for kind, points, options, bbox in self._tile_ops(box):
+            if kind == "sprite":
+                paste_sprite(tile, options["sprite"], points[0])
+                continue
+
+            op_box = clamp_bbox(bbox, tile.size)
+            if op_box is None:
+                continue
+
+            for part in ("fill", "outline"):
+                color = options.get(part)
+                if color is None:
+                    continue
+                rgb, alpha = split_color(color)
+
+                if alpha == 255 and kind != "text":
+                    # Opaque, hard-edged shapes can be written straight into the tile
+                    draw_primitive(tile_draw, kind, points, options, **{part: rgb + (255,)})
+                    continue
+
+                # Translucent or antialiased ink: draw its coverage as a mask and
+                # blend a solid color through it so the layer keeps straight alpha
+                sx, sy = op_box[0], op_box[1]
+                size = (op_box[2] - sx, op_box[3] - sy)
+                local = [(x - sx, y - sy) for x, y in points]
+                mask = Image.new("L", size, 0)
+                draw_primitive(ImageDraw.Draw(mask), kind, local, options, **{part: alpha})
+                ink = Image.new("RGBA", size, rgb + (0,))
+                ink.putalpha(mask)
+                tile.alpha_composite(ink, dest=(sx, sy))
+
+        if factor > 1:
+            # Average in premultiplied form so transparent pixels don't darken edges
+            tile = tile.convert("RGBa").reduce(factor).convert("RGBA")
+        return tile
+
+    def composite_onto(self, img):
+        """Blend the layer onto img, touching only the layer's bounding box"""
+        if not self.ops:
+            return
+        box = clamp_bbox(self.bbox, img.size)
+        if box is None:
+            return
+
+        if img.mode == "RGB" and self.supersample == 1:
+            # Over an opaque image, compositing the layer is the same as blending
+            # each primitive in order, which ImageDraw does natively for RGBA inks
+            region = img.crop(box)
+            region_draw = ImageDraw.Draw(region, "RGBA")
+            ox, oy = box[0], box[1]
+            for kind, points, options, _ in self.ops:
+                local = [(x - ox, y - oy) for x, y in points]
+                if kind == "sprite":
+                    paste_sprite(region, options["sprite"], local[0])
+                elif kind == "text" and is_translucent(options):
+                    # ImageDraw ignores the alpha of text ink, so paste it through a mask
+                    rgb, alpha = split_color(options["fill"])
+                    mask = Image.new("L", region.size, 0)
+                    draw_primitive(ImageDraw.Draw(mask), kind, local, options, fill=alpha)
+                    region.paste(rgb, (0, 0) + region.size, mask)
+                else:
+                    draw_primitive(region_draw, kind, local, options,
+                                   options.get("fill"), options.get("outline"))
+            img.paste(region, box[:2])
+            return
+
+        tile = self.render(box)
+        if img.mode == "RGBA":
+            img.alpha_composite(tile, dest=box[:2])
+        else:
+            region = img.crop(box).convert("RGBA")
+            region.alpha_composite(tile)
+            img.paste(region.convert(img.mode), box[:2])
@@ -0,0 +1,170 @@
+from PIL import Image
+import colorsys
+# Make numpy optional
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Number of colours extracted per image
+PALETTE_SIZE = 5
+
+# Images are shrunk to fit this square before their colours are clustered
+SAMPLE_SIZE = 64
+
+# Upper bound on k-means refinement passes
+KMEANS_ITERATIONS = 12
+
+# Clusters closer than this (RGB distance) are merged into one palette colour
+MERGE_DISTANCE = 24
+
+# WCAG contrast ratio that text needs against its background
+MIN_CONTRAST = 4.5
+
+# Reference colours for naming a colour, as (name, RGB)
+COLOR_NAMES = (
+    ("red", (220, 40, 40)),
+    ("orange", (245, 140, 30)),
+    ("yellow", (240, 220, 50)),
+    ("green", (60, 170, 70)),
+    ("teal", (30, 160, 160)),
+    ("blue", (40, 90, 220)),
+    ("purple", (130, 60, 190)),
+    ("pink", (240, 120, 180)),
+    ("brown", (130, 80, 40)),
+    ("black", (20, 20, 20)),
+    ("grey", (128, 128, 128)),
+    ("white", (245, 245, 245)),
+)
+
+def to_hex(color):
+    """Turn an (r, g, b) colour into "#rrggbb\""""
+    return "#%02x%02x%02x" % tuple(int(round(c)) for c in color[:3])
+
+def from_hex(color):
+    """Turn "#rrggbb" into an (r, g, b) tuple"""
+    return tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+
+def color_name(color):
+    """Return the name of the closest reference colour to a "#rrggbb" or RGB colour"""
+    if isinstance(color, str):
+        color = from_hex(color)
+    r, g, b = color
+
+    # Greys are told apart by lightness alone, before hue gets a say
+    _, lightness, saturation = colorsys.rgb_to_hls(r / 255, g / 255, b / 255)
+    if saturation < 0.15 or lightness < 0.08 or lightness > 0.95:
+        if lightness < 0.2:
+            return "black"
+        return "white" if lightness > 0.85 else "grey"
+
+    best_name, best_distance = None, None
+    for name, (nr, ng, nb) in COLOR_NAMES:
+        # Weighted RGB distance, a cheap stand-in for perceptual difference
+        distance = 2 * (r - nr) ** 2 + 4 * (g - ng) ** 2 + 3 * (b - nb) ** 2
+        if best_distance is None or distance < best_distance:
+            best_name, best_distance = name, distance
+    return best_name
+
+def relative_luminance(color):
+    """Return the WCAG relative luminance of a "#rrggbb" or RGB colour"""
+    if isinstance(color, str):
+        color = from_hex(color)
+    channels = []
+    for c in color:
+        c = c / 255
+        channels.append(c / 12.92 if c <= 0.03928 else ((c + 0.055) / 1.055) ** 2.4)
+    r, g, b = channels
+    return 0.2126 * r + 0.7152 * g + 0.0722 * b
+
+def contrast_ratio(a, b):
+    """Return the WCAG contrast ratio between two colours (1 to 21)"""
+    la, lb = relative_luminance(a), relative_luminance(b)
+    return (max(la, lb) + 0.05) / (min(la, lb) + 0.05)
+
+def _sample(img):
+    """Shrink an image to at most SAMPLE_SIZE square for colour analysis"""
+    small = img.convert("RGB")
+    if max(small.size) > SAMPLE_SIZE:
+        small = small.copy()
+        small.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE), Image.BOX)
+    return small
+
+def _median_cut(img, colors):
+    """Return [(rgb, count)] from PIL's median cut quantizer"""
+    quantized = img.quantize(colors, method=Image.MEDIANCUT)
+    palette = quantized.getpalette()
+    return [(tuple(palette[index * 3:index * 3 + 3]), count)
+            for count, index in quantized.getcolors(colors)]
+
+def _kmeans(img, colors):
+    """Return [(rgb, count)] from k-means on the image's pixels
+
+    The clusters start from the median cut colours, so the result is
+    deterministic and usually settles in a few passes.
+    """
+    pixels = np.asarray(img, dtype=np.float32).reshape(-1, 3)
+    centres = np.array([rgb for rgb, _ in _median_cut(img, colors)], dtype=np.float32)
+
+    for _ in range(KMEANS_ITERATIONS):
+        # Squared distance from every pixel to every centre, all at once
+        distances = ((pixels[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2)
+        labels = distances.argmin(axis=1)
+        counts = np.bincount(labels, minlength=len(centres))
+        sums = np.zeros_like(centres)
+        np.add.at(sums, labels, pixels)
+
+        used = counts > 0
+        updated = sums[used] / counts[used][:, None]
+        if used.all() and np.abs(updated - centres).max() < 0.5:
+            break
+        centres = updated
+
+    distances = ((pixels[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2)
+    counts = np.bincount(distances.argmin(axis=1), minlength=len(centres))
+    return [(tuple(centre), int(count)) for centre, count in zip(centres, counts) if count]
+
+def extract_palette(img, colors=PALETTE_SIZE):
+    """Return the main colours of an image as [("#rrggbb", weight)], largest first
+
+    Weights are the share of the image each colour covers and add up to 1.
+    Uses k-means with numpy and PIL's median cut without it.
+    """
+    small = _sample(img)
+    if NUMPY_AVAILABLE:
+        clusters = _kmeans(small, colors)
+    else:
+        clusters = _median_cut(small, colors)
+
+    # Fold shades that barely differ into the larger cluster next to them
+    merged = []
+    for rgb, count in sorted(clusters, key=lambda cluster: cluster[1], reverse=True):
+        for kept in merged:
+            if sum((a - b) ** 2 for a, b in zip(kept[0], rgb)) < MERGE_DISTANCE ** 2:
+                total = kept[1] + count
+                kept[0] = [(a * kept[1] + b * count) / total for a, b in zip(kept[0], rgb)]
+                kept[1] = total
+                break
+        else:
+            merged.append([list(rgb), count])
+
+    total = sum(count for _, count in merged) or 1
+    palette = [(to_hex(rgb), count / total) for rgb, count in merged]
+    return sorted(palette, key=lambda item: item[1], reverse=True)
+
+def text_color(palette):
+    """Pick a readable text colour for an image with the given palette
+
+    Prefers one of the image's own colours that contrasts enough with its
+    dominant colour, and falls back to black or white.
+    """
+    if not palette:
+        return "#000000"
+    background = palette[0][0]
+    for color, _ in palette[1:]:
+        if contrast_ratio(color, background) >= MIN_CONTRAST:
+            return color
+    if contrast_ratio("#000000", background) >= contrast_ratio("#ffffff", background):
+        return "#000000"
+    return "#ffffff"
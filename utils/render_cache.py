@@ -0,0 +1,192 @@
+from PIL import Image
+import ast
+import hashlib
+import json
+import os
+import tempfile
+
+# Where rendered templates are kept between runs, under the project root
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(PROJECT_ROOT, "cache", "renders")
+
+# Size budget for the whole cache before least recently used renders are evicted
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Module whose code, with the utils modules it imports, decides what a template render looks like
+DESIGNER_MODULE = "template_designer.py"
+
+_version_cache = {}
+_designer_modules = []
+
+def source_version(*paths):
+    """Return a short hash of the given source files"""
+    key = tuple(paths)
+    if key not in _version_cache:
+        digest = hashlib.sha256()
+        for path in paths:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        _version_cache[key] = digest.hexdigest()[:16]
+    return _version_cache[key]
+
+def utils_imports(path):
+    """List the utils modules a source file imports, as file names"""
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module == "utils" and node.level == 0:
+            modules = ["utils." + alias.name for alias in node.names]  # from utils import x
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            modules = [node.module]
+        elif isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        else:
+            continue
+        for module in modules:
+            parts = module.split(".")
+            if len(parts) > 1 and parts[0] == "utils":
+                names.add(parts[1] + ".py")
+    return sorted(names)
+
+def designer_modules():
+    """List the designer module and every utils module it imports, directly or not"""
+    if _designer_modules:
+        return list(_designer_modules)
+    utils_dir = os.path.dirname(os.path.abspath(__file__))
+    found = []
+    pending = [DESIGNER_MODULE]
+    while pending:
+        name = pending.pop()
+        if name in found or not os.path.isfile(os.path.join(utils_dir, name)):
+            continue
+        found.append(name)
+        pending.extend(utils_imports(os.path.join(utils_dir, name)))
+    _designer_modules[:] = sorted(found)
+    return list(_designer_modules)
+
+def designer_version():
+    """Return a hash of the designer code, which changes whenever the renderer does"""
+    utils_dir = os.path.dirname(os.path.abspath(__file__))
+    return source_version(*[os.path.join(utils_dir, name) for name in designer_modules()])
+
+class RenderCache:
+    """Content-addressed on-disk cache of rendered templates
+
+    Renders are keyed by (category, style, size, seed, supersampling
+    factor, renderer version), written atomically and evicted least recently used first once the
+    cache grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._total_bytes = None
+
+    def key(self, category, style, size, seed=None, version=None, supersample=1):
+        """Build the cache key for one render; supersample is the designer's antialiasing factor"""
+        if version is None:
+            version = designer_version()
+        width, height = size
+        payload = json.dumps([category, style, width, height, seed, supersample, version])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key):
+        """Return the file path for a cache key"""
+        return os.path.join(self.cache_dir, key[:2], key + ".png")
+
+    def get(self, category, style, size, seed=None, version=None, supersample=1):
+        """Return the cached render, or None if it has not been rendered yet"""
+        path = self.path_for(self.key(category, style, size, seed, version, supersample))
+        try:
+            img = Image.open(path)
+            img.load()
+        except (OSError, ValueError):
+            return None
+
+        # Touch the file so eviction sees it as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return img
+
+    def put(self, category, style, size, img, seed=None, version=None, supersample=1):
+        """Store a render, replacing any previous file atomically"""
+        path = self.path_for(self.key(category, style, size, seed, version, supersample))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first so readers never see half a PNG
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                img.save(f, format="PNG", compress_level=1)
+            previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        if self._total_bytes is not None:
+            self._total_bytes += os.path.getsize(path) - previous_size
+        self.evict()
+        return path
+
+    def get_or_render(self, category, style, size, render, seed=None, version=None, supersample=1):
+        """Return the cached render, calling render() and storing the result on a miss"""
+        img = self.get(category, style, size, seed, version, supersample)
+        if img is None:
+            img = render()
+            self.put(category, style, size, img, seed, version, supersample)
+        return img
+
+    def _entries(self):
+        """List (mtime, size, path) for every cached render"""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+
+        for bucket in os.scandir(self.cache_dir):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith(".png"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def total_bytes(self):
+        """Return the current size of the cache on disk"""
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in self._entries())
+        return self._total_bytes
+
+    def evict(self):
+        """Delete least recently used renders until the cache fits its budget"""
+        if self.total_bytes() <= self.max_bytes:
+            return
+
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._total_bytes = total
+
+    def clear(self):
+        """Remove every cached render"""
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._total_bytes = 0
+
+# Shared cache used by the views
+render_cache = RenderCache()
@@ -0,0 +1,188 @@
+from PIL import Image, ImageDraw, ImageFont
+from utils.font_service import font_service
+from utils.layers import Layer, draw_primitive, is_translucent, paste_sprite, points_bbox
+import contextlib
+import math
+
+class ScaledDraw:
+    """Drawing proxy that maps layout units onto pixels
+
+    Templates are laid out in units of a reference card (600x400). This
+    wraps an ImageDraw and multiplies every coordinate, line width and
+    font size by a uniform scale factor, so the same layout code renders
+    a small preview or a print-size image.
+
+    Colors with an alpha channel are blended for real: primitives drawn
+    inside layer() are collected into one RGBA layer and composited over
+    the area they touched, and a translucent primitive drawn outside a
+    layer gets a layer of its own. A layer can also be supersampled to
+    antialias its edges; supersample is the factor motifs are drawn at.
+    """
+
+    def __init__(self, img, scale=1.0, mode=None, supersample=1):
+        self.image = img
+        self.scale = scale
+        self.supersample = supersample
+        self.draw = ImageDraw.Draw(img, mode)
+        self._fonts = {}
+        self._layer = None
+
+    # Coordinate helpers
+    def px(self, value):
+        """Convert a layout length to pixels"""
+        return value * self.scale
+
+    def _xy(self, xy):
+        """Scale a point sequence given as [(x, y), ...] or [x0, y0, x1, y1]"""
+        scale = self.scale
+        points = list(xy)
+        if points and isinstance(points[0], (tuple, list)):
+            return [(x * scale, y * scale) for x, y in points]
+        return [(points[i] * scale, points[i + 1] * scale) for i in range(0, len(points), 2)]
+
+    def _width(self, width):
+        """Scale a stroke width, keeping hairlines at least one pixel"""
+        return max(1, int(round(max(width, 1) * self.scale)))
+
+    def font(self, font):
+        """Return a variant of font sized for the current scale"""
+        if self.scale == 1 or not isinstance(font, ImageFont.FreeTypeFont):
+            return font
+
+        key = (font.path, font.size)
+        if key not in self._fonts:
+            size = max(1, int(round(font.size * self.scale)))
+            if isinstance(font.path, str):
+                # Fonts loaded from a file are shared with every other render
+                self._fonts[key] = font_service.get_font(font.path, size)
+            else:
+                self._fonts[key] = font.font_variant(size=size)
+        return self._fonts[key]
+
+    # Layers
+    @contextlib.contextmanager
+    def layer(self, supersample=1):
+        """Collect everything drawn inside the block into one composited layer
+
+        With supersample above 1 the layer is drawn that many times larger
+        over its bounding box only and scaled back down, antialiasing it.
+        """
+        if self._layer is not None:
+            # Nested layers simply join the enclosing one
+            yield self
+            return
+
+        self._layer = Layer(supersample)
+        try:
+            yield self
+        finally:
+            layer, self._layer = self._layer, None
+        layer.composite_onto(self.image)
+
+    def _emit(self, kind, points, options, bbox=None):
+        """Draw a scaled primitive directly, or record it for compositing"""
+        if self._layer is None and not is_translucent(options):
+            draw_primitive(self.draw, kind, points, options,
+                           options.get("fill"), options.get("outline"))
+            return
+
+        if bbox is None:
+            bbox = points_bbox(points, options.get("width", 0) / 2 + 1)
+        if self._layer is not None:
+            self._layer.add(kind, points, options, bbox)
+        else:
+            layer = Layer()
+            layer.add(kind, points, options, bbox)
+            layer.composite_onto(self.image)
+
+    # Primitives
+    def rectangle(self, xy, fill=None, outline=None, width=1):
+        """Draw a rectangle"""
+        self._emit("rectangle", self._xy(xy),
+                   {"fill": fill, "outline": outline, "width": self._width(width)})
+
+    def ellipse(self, xy, fill=None, outline=None, width=1):
+        """Draw an ellipse"""
+        self._emit("ellipse", self._xy(xy),
+                   {"fill": fill, "outline": outline, "width": self._width(width)})
+
+    def arc(self, xy, start, end, fill=None, width=1):
+        """Draw an arc"""
+        self._emit("arc", self._xy(xy),
+                   {"fill": fill, "start": start, "end": end, "width": self._width(width)})
+
+    def line(self, xy, fill=None, width=0, joint=None):
+        """Draw a line or polyline"""
+        self._emit("line", self._xy(xy),
+                   {"fill": fill, "width": self._width(width), "joint": joint})
+
+    def polygon(self, xy, fill=None, outline=None, width=1):
+        """Draw a polygon"""
+        self._emit("polygon", self._xy(xy),
+                   {"fill": fill, "outline": outline, "width": self._width(width)})
+
+    def point(self, xy, fill=None):
+        """Draw single points (these stay one pixel in size)"""
+        self._emit("point", self._xy(xy), {"fill": fill})
+
+    # Sprites
+    def sprite_extent(self, reach):
+        """Return the pixel size of a sprite covering reach layout units around its centre"""
+        half = int(math.ceil(self.px(reach))) + 2
+        return (half * 2, half * 2)
+
+    def rasterize(self, paint, reach):
+        """Render paint(draw, x, y) around (x, y) into a transparent sprite
+
+        reach is how far the drawing may extend from its centre in layout
+        units. Returns the sprite cropped to its content and the pixel
+        offset of the centre inside it.
+        """
+        size = self.sprite_extent(reach)
+        half = size[0] // 2
+        sprite = Image.new("RGBA", size, (0, 0, 0, 0))
+        sprite_draw = ScaledDraw(sprite, self.scale, supersample=self.supersample)
+        with sprite_draw.layer(self.supersample):
+            paint(sprite_draw, half / self.scale, half / self.scale)
+
+        bbox = sprite.getbbox()
+        if bbox is None:
+            return sprite.crop((0, 0, 1, 1)), (half, half)
+        return sprite.crop(bbox), (half - bbox[0], half - bbox[1])
+
+    def stamp(self, sprite, xy, origin):
+        """Blend a sprite so that its origin lands on the layout point xy"""
+        x, y = self._point(xy)
+        position = (int(round(x)) - origin[0], int(round(y)) - origin[1])
+        if self._layer is None:
+            paste_sprite(self.image, sprite, position)
+            return
+
+        bbox = (position[0], position[1],
+                position[0] + sprite.width - 1, position[1] + sprite.height - 1)
+        self._layer.add("sprite", [position], {"sprite": sprite}, bbox)
+
+    def _point(self, xy):
+        """Scale a single (x, y) point"""
+        if self.scale == 1:
+            return xy
+        x, y = xy
+        return (x * self.scale, y * self.scale)
+
+    def text(self, xy, text, fill=None, font=None, anchor=None, **kwargs):
+        """Draw text with a font scaled to the output size"""
+        xy = self._point(xy)
+        font = self.font(font) if font else None
+        options = {"fill": fill, "text": text, "font": font, "anchor": anchor, "extra": kwargs}
+        bbox = None
+        if self._layer is not None or is_translucent(options):
+            bbox = self.draw.textbbox(xy, text, font=font, anchor=anchor, **kwargs)
+        self._emit("text", [xy], options, bbox)
+
+    def textbbox(self, xy, text, font=None, anchor=None, **kwargs):
+        """Measure text and return its bounding box in whole layout units"""
+        bbox = self.draw.textbbox(self._point(xy), text,
+                                  font=self.font(font) if font else None, anchor=anchor, **kwargs)
+        if self.scale == 1:
+            return bbox
+        return tuple(int(round(value / self.scale)) for value in bbox)
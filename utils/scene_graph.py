@@ -0,0 +1,185 @@
+import itertools
+
+class SceneNode:
+    """One element of a card, positioned by the canvas coordinates of its centre"""
+
+    kind = None
+
+    def __init__(self, x, y):
+        self.id = None  # Assigned by the scene graph
+        self.item = None  # Canvas item drawing this node, once there is one
+        self.x = x
+        self.y = y
+        self.z = 0  # Stacking order; higher is drawn on top
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.id} at ({self.x:.0f}, {self.y:.0f})>"
+
+class TextNode(SceneNode):
+    """Text centred on its position; size is the Tk font size in points"""
+
+    kind = "text"
+
+    def __init__(self, text, x, y, font, size, color, wrap_width=None):
+        super().__init__(x, y)
+        self.text = text
+        self.font = font
+        self.size = size
+        self.color = color
+        self.wrap_width = wrap_width  # Canvas pixels, or None for no wrapping
+
+class ImageNode(SceneNode):
+    """An image centred on its position
+
+    image is the copy shown on the canvas, drawn at scale times its size.
+    source is what exports are rendered from: the file it came from or a
+    full resolution image. photo caches the Tk image for the canvas and is
+    dropped whenever the picture or its scale changes.
+
+    image and source are never changed in place, since the undo history
+    keeps them by identity; an edit sets a new image with update().
+    Callers hand the graph images that nothing else holds on to.
+    """
+
+    kind = "image"
+
+    def __init__(self, image, x, y, source=None, path=None, scale=1.0):
+        super().__init__(x, y)
+        self.image = image
+        self.source = source if source is not None else image
+        self.path = path  # File the image was loaded from, if any
+        self.scale = scale
+        self.photo = None
+
+    @property
+    def display_size(self):
+        """Size the image takes up on the canvas"""
+        width, height = self.image.size
+        return max(1, int(round(width * self.scale))), max(1, int(round(height * self.scale)))
+
+class SceneGraph:
+    """The text and images on a card, indexed by node id and by canvas item
+
+    The editor's canvas, property panel and exporter all read from here.
+    Lookups by node or canvas item are dict lookups, so selecting or
+    editing an element costs the same on a card with hundreds of them.
+    Changes mark nodes dirty; the view then redraws only those nodes and
+    deletes the canvas items of removed ones.
+    """
+
+    def __init__(self):
+        self.nodes = {}  # node id -> node
+        self._items = {}  # canvas item id -> node id
+        self._ids = itertools.count(1)
+        self._z = itertools.count(1)
+        self._dirty = set()  # ids of nodes whose canvas items are out of date
+        self._removed = []  # canvas items of removed nodes
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __iter__(self):
+        return iter(self.ordered())
+
+    def add(self, node, node_id=None, z=None):
+        """Add a node on top of the others and return it
+
+        node_id and z put back a node that was removed, e.g. by undo.
+        """
+        node.id = node_id if node_id is not None else next(self._ids)
+        node.z = z if z is not None else next(self._z)
+        self.nodes[node.id] = node
+        self._dirty.add(node.id)
+        return node
+
+    def add_text(self, text, x, y, font, size, color, wrap_width=None):
+        return self.add(TextNode(text, x, y, font, size, color, wrap_width))
+
+    def add_image(self, image, x, y, source=None, path=None, scale=1.0):
+        return self.add(ImageNode(image, x, y, source, path, scale))
+
+    def get(self, node_id):
+        """Return the node with an id, or None"""
+        return self.nodes.get(node_id)
+
+    def node_for_item(self, item):
+        """Return the node a canvas item draws, or None"""
+        node_id = self._items.get(item)
+        return self.nodes.get(node_id) if node_id is not None else None
+
+    def bind_item(self, node, item):
+        """Record the canvas item that draws node"""
+        if node.item is not None:
+            self._items.pop(node.item, None)
+        node.item = item
+        self._items[item] = node.id
+
+    def update(self, node_id, **props):
+        """Change properties of a node, e.g. update(3, text="Hi", color="#ff0000")"""
+        node = self.nodes[node_id]
+        for name, value in props.items():
+            if not hasattr(node, name) or name in ("id", "item", "z", "kind"):
+                raise AttributeError(f"{type(node).__name__} has no property {name}")
+            setattr(node, name, value)
+        if isinstance(node, ImageNode) and ("image" in props or "scale" in props):
+            node.photo = None
+        self._dirty.add(node_id)
+        return node
+
+    def move(self, node_id, dx, dy, redraw=True):
+        """Move a node; pass redraw=False when its canvas item was already moved"""
+        node = self.nodes[node_id]
+        node.x += dx
+        node.y += dy
+        if redraw:
+            self._dirty.add(node_id)
+        return node
+
+    def raise_node(self, node_id):
+        """Put a node above every other node"""
+        node = self.nodes[node_id]
+        node.z = next(self._z)
+        return node
+
+    def set_z(self, node_id, z):
+        """Move a node to a given place in the stacking order"""
+        node = self.nodes[node_id]
+        node.z = z
+        return node
+
+    def remove(self, node_id):
+        """Take a node off the card"""
+        node = self.nodes.pop(node_id, None)
+        if node is None:
+            return None
+        self._dirty.discard(node_id)
+        if node.item is not None:
+            self._items.pop(node.item, None)
+            self._removed.append(node.item)
+            node.item = None
+        return node
+
+    def clear(self):
+        """Remove every node; their canvas items are expected to be gone already"""
+        self.nodes.clear()
+        self._items.clear()
+        self._dirty.clear()
+        self._removed = []
+
+    def ordered(self, kind=None):
+        """List the nodes bottom to top, optionally only those of one kind"""
+        nodes = self.nodes.values()
+        if kind is not None:
+            nodes = [node for node in nodes if node.kind == kind]
+        return sorted(nodes, key=lambda node: node.z)
+
+    def take_dirty(self):
+        """Return the nodes needing a redraw, bottom to top, and mark them clean"""
+        nodes = [self.nodes[node_id] for node_id in self._dirty if node_id in self.nodes]
+        self._dirty.clear()
+        return sorted(nodes, key=lambda node: node.z)
+
+    def take_removed(self):
+        """Return the canvas items of nodes removed since the last call"""
+        items, self._removed = self._removed, []
+        return items
@@ -0,0 +1,172 @@
+from utils.catalogue import GENERATED_DIR, DISPLAY_NAMES, catalogue, category_label, style_label
+from utils.palette import color_name
+import re
+
+# Facets a query can filter on; values within a facet are ORed, facets are ANDed
+FACETS = ("category", "style", "color", "aspect", "tag")
+
+# Width/height ratios within this much of 1 count as square
+SQUARE_TOLERANCE = 0.05
+
+# Palette colours covering less of a template than this don't count for the colour filter
+MIN_COLOR_WEIGHT = 0.15
+
+def aspect_name(width, height):
+    """Return "landscape", "portrait" or "square" for a pixel size"""
+    if not width or not height:
+        return None
+    ratio = width / height
+    if abs(ratio - 1) <= SQUARE_TOLERANCE:
+        return "square"
+    return "landscape" if ratio > 1 else "portrait"
+
+def tokenize(text):
+    """Split text into lowercase search words"""
+    return [word for word in re.split(r"[^a-z0-9]+", text.lower()) if word]
+
+def entry_tags(relpath, entry):
+    """Return the tags of a catalogue entry"""
+    tags = [entry["path"].rsplit(".", 1)[-1].lower()]
+    if relpath in DISPLAY_NAMES:
+        tags.append("curated")
+    if relpath.startswith(GENERATED_DIR + "/"):
+        tags.append("generated")
+    return tags + list(entry.get("tags", ()))
+
+class SearchIndex:
+    """Inverted index over the catalogue for the gallery's search and filters
+
+    Every facet value and every word of a template's name, style, category
+    and tags maps to the set of catalogue paths that have it. A query
+    intersects the sets of the facets it uses, smallest first, so it never
+    looks at templates that can't match. The index follows the catalogue
+    by re-indexing only the entries that were replaced since it last
+    looked.
+    """
+
+    def __init__(self, catalogue=catalogue):
+        self.catalogue = catalogue
+        self.postings = {facet: {} for facet in FACETS + ("word",)}
+        self._docs = {}  # relpath -> (entry, [(facet, value), ...])
+        self._order = {}  # relpath -> position in path order
+        self._generation = None
+
+    def sync(self):
+        """Bring the index up to date with the catalogue"""
+        self.catalogue.ensure_loaded()
+        if self._generation == self.catalogue.generation:
+            return
+
+        entries = self.catalogue.entries
+        for relpath in list(self._docs):
+            if relpath not in entries:
+                self._remove(relpath)
+        for relpath, entry in entries.items():
+            doc = self._docs.get(relpath)
+            if doc is None or doc[0] is not entry:
+                self._remove(relpath)
+                self._add(relpath, entry)
+
+        self._order = {relpath: position for position, relpath in enumerate(sorted(entries))}
+        self._generation = self.catalogue.generation
+
+    def _terms(self, relpath, entry):
+        """List the (facet, value) pairs a catalogue entry is filed under"""
+        terms = [("category", entry["category"]), ("style", entry["style"])]
+        # A template is filed under every colour that covers a fair part of it
+        colors = [color for color, weight in entry.get("palette") or () if weight >= MIN_COLOR_WEIGHT]
+        if not colors and entry.get("color"):
+            colors = [entry["color"]]
+        terms.extend(("color", name) for name in set(color_name(color) for color in colors))
+        aspect = aspect_name(entry["width"], entry["height"])
+        if aspect:
+            terms.append(("aspect", aspect))
+
+        tags = entry_tags(relpath, entry)
+        terms.extend(("tag", tag) for tag in tags)
+
+        text = " ".join([entry["name"], style_label(entry["style"]), category_label(entry["category"])] + tags)
+        terms.extend(("word", word) for word in set(tokenize(text)))
+        return terms
+
+    def _add(self, relpath, entry):
+        terms = self._terms(relpath, entry)
+        for facet, value in terms:
+            self.postings[facet].setdefault(value, set()).add(relpath)
+        self._docs[relpath] = (entry, terms)
+
+    def _remove(self, relpath):
+        doc = self._docs.pop(relpath, None)
+        if doc is None:
+            return
+        for facet, value in doc[1]:
+            paths = self.postings[facet].get(value)
+            if paths is not None:
+                paths.discard(relpath)
+                if not paths:
+                    del self.postings[facet][value]
+
+    def values(self, facet, **filters):
+        """List the values of a facet, optionally only among templates matching filters"""
+        self.sync()
+        matches = self._match(None, filters)
+        if matches is None:
+            return sorted(self.postings[facet])
+        return sorted(value for value, paths in self.postings[facet].items()
+                      if not paths.isdisjoint(matches))
+
+    def search(self, text="", **filters):
+        """Return the catalogue entries matching text and facet filters, in path order
+
+        Each filter is a facet name from FACETS with one value or a list of
+        values, e.g. search("gold", category="birthday", color=["yellow", "orange"]).
+        Every word of text must prefix-match a word of the template.
+        """
+        return [self.entry(relpath) for relpath in self.search_paths(text, **filters)]
+
+    def search_paths(self, text="", **filters):
+        """Like search(), but return only the catalogue paths of the matches
+
+        Callers that show results a page at a time look the entries up
+        with entry() as they need them.
+        """
+        self.sync()
+        matches = self._match(text, filters)
+        if matches is None:
+            matches = self._docs
+        return sorted(matches, key=self._order.get)
+
+    def entry(self, relpath):
+        """Return the catalogue entry indexed under a path from search_paths()"""
+        return self._docs[relpath][0]
+
+    def _match(self, text, filters):
+        """Return the set of matching paths, or None if nothing narrows the search"""
+        groups = []
+        for facet, values in filters.items():
+            if facet not in FACETS:
+                raise ValueError(f"Unknown search facet: {facet}")
+            if values is None:
+                continue
+            if isinstance(values, str):
+                values = [values]
+            postings = self.postings[facet]
+            groups.append(set().union(*(postings.get(value, ()) for value in values)))
+
+        for word in tokenize(text or ""):
+            # Prefix matches, so "gol" finds "golden"
+            groups.append(set().union(*(paths for term, paths in self.postings["word"].items()
+                                        if term.startswith(word))))
+
+        if not groups:
+            return None
+        groups.sort(key=len)
+        matches = set(groups[0])
+        for group in groups[1:]:
+            if not matches:
+                break
+            matches &= group
+        return matches
+
+# Shared index used by the gallery
+search_index = SearchIndex()
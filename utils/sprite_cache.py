@@ -0,0 +1,75 @@
+from collections import OrderedDict
+import threading
+
+# Memory budget for all cached sprites
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Motifs larger than this are drawn directly instead of being cached
+DEFAULT_MAX_SPRITE_BYTES = 1024 * 1024
+
+class SpriteCache:
+    """In-memory LRU cache of rasterized motifs
+
+    Sprites are RGBA images keyed by whatever decides their pixels (motif,
+    size, color, scale...). The cache is bounded by the bytes the sprites
+    take up, and the least recently stamped ones are dropped first. Safe
+    to share between the Tk thread and the export worker; a sprite is
+    rendered outside the lock, so two threads missing on the same key at
+    once may both draw it.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_sprite_bytes=DEFAULT_MAX_SPRITE_BYTES):
+        self.max_bytes = max_bytes
+        self.max_sprite_bytes = max_sprite_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._sprites = OrderedDict()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def sprite_bytes(size):
+        """Return the memory an RGBA sprite of the given pixel size takes"""
+        return size[0] * size[1] * 4
+
+    def fits(self, size):
+        """Return True if a sprite of this pixel size may be cached"""
+        return self.sprite_bytes(size) <= self.max_sprite_bytes
+
+    def get(self, key, render):
+        """Return (sprite, origin) for key, calling render() on a miss"""
+        with self._lock:
+            entry = self._sprites.get(key)
+            if entry is not None:
+                self._sprites.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        entry = render()
+        with self._lock:
+            if key in self._sprites:
+                return self._sprites[key]  # Another thread got there first
+            self._sprites[key] = entry
+            self.total_bytes += self.sprite_bytes(entry[0].size)
+            self.evict()
+        return entry
+
+    def evict(self):
+        """Drop least recently used sprites until the cache fits its budget"""
+        with self._lock:
+            while self.total_bytes > self.max_bytes and len(self._sprites) > 1:
+                _, (sprite, _) = self._sprites.popitem(last=False)
+                self.total_bytes -= self.sprite_bytes(sprite.size)
+
+    def clear(self):
+        """Remove every cached sprite"""
+        with self._lock:
+            self._sprites.clear()
+            self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._sprites)
+
+# Shared cache used by every designer in the process
+sprite_cache = SpriteCache()
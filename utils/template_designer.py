@@ -1,86 +1,156 @@
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
+from PIL import Image, ImageDraw
+import functools
 import random
 import math
 import os
+from utils.font_service import get_font
+from utils.gradient_utils import create_gradient
+from utils.scaled_draw import ScaledDraw
+from utils.sprite_cache import sprite_cache
+from utils.template_registry import CATEGORY_LABELS, category_key, template, template_registry
+from utils.texture_utils import apply_texture
+
+# Layout is written for this reference card size (6x4 inches at 100 DPI)
+BASE_WIDTH = 600
+BASE_HEIGHT = 400
+BASE_DPI = 100
+
+# Supersampling factor used when antialiasing is switched on
+ANTIALIAS_FACTOR = 4
+
+def layered(method):
+    """Run a decoration helper on its own layer so its translucent colors blend"""
+    @functools.wraps(method)
+    def wrapper(self, draw, *args, **kwargs):
+        with draw.layer():
+            return method(self, draw, *args, **kwargs)
+    return wrapper
+
+def antialiased(method):
+    """Run a helper on a layer that is supersampled when the designer antialiases"""
+    @functools.wraps(method)
+    def wrapper(self, draw, *args, **kwargs):
+        with draw.layer(self.supersample):
+            return method(self, draw, *args, **kwargs)
+    return wrapper
+
+def motif(reach):
+    """Draw a repeated motif helper as a cached sprite
+
+    The helper must draw the same pixels for the same (size, color), and
+    reach(size) gives how far it extends from (x, y) in layout units.
+    Each motif is rasterized once per size, color and scale and then
+    stamped; motifs too large to cache are drawn directly.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, draw, x, y, size, color):
+            extent = reach(size)
+            if not sprite_cache.fits(draw.sprite_extent(extent)):
+                return method(self, draw, x, y, size, color)
+
+            key = (method.__name__, size, tuple(color), draw.scale, draw.supersample)
+            sprite, origin = sprite_cache.get(key, lambda: draw.rasterize(
+                lambda sprite_draw, cx, cy: method(self, sprite_draw, cx, cy, size, color), extent))
+            draw.stamp(sprite, (x, y), origin)
+        return wrapper
+    return decorator
 
 class TemplateDesigner:
-    """Class to create aesthetically pleasing greeting card templates"""
-    
-    def __init__(self, width=600, height=400):
-        self.width = width
-        self.height = height
-    
-    def create_birthday_template(self, style):
+    """Class to create aesthetically pleasing greeting card templates
+
+    Every create_*_template method takes an optional seed (an int or a
+    random.Random); with the same seed and size a render is identical.
+    With antialias on (True or a supersampling factor) curved emblems and
+    motifs are drawn supersampled over their own area and scaled down.
+    """
+    
+    def __init__(self, width=600, height=400, seed=None, antialias=False):
+        # Random source for every decoration; a fixed seed makes renders reproducible
+        self.rng = self._make_rng(seed)
+        
+        # Supersampling factor for antialiased layers (1 means off)
+        if antialias is True:
+            antialias = ANTIALIAS_FACTOR
+        self.supersample = max(1, int(antialias or 1))
+        
+        # Output size in pixels
+        self.pixel_width = width
+        self.pixel_height = height
+        
+        # All drawing code works in layout units of the reference card.
+        # One uniform scale maps them to pixels, so any output size keeps
+        # the same layout and the wider axis simply gets more room.
+        self.scale = min(width / BASE_WIDTH, height / BASE_HEIGHT)
+        self.width = int(round(width / self.scale))
+        self.height = int(round(height / self.scale))
+    
+    @classmethod
+    def for_dpi(cls, dpi, width_inches=BASE_WIDTH / BASE_DPI, height_inches=BASE_HEIGHT / BASE_DPI,
+                seed=None, antialias=False):
+        """Create a designer that renders a card of the given print size and DPI"""
+        return cls(int(round(width_inches * dpi)), int(round(height_inches * dpi)),
+                   seed=seed, antialias=antialias)
+    
+    @staticmethod
+    def _make_rng(seed):
+        """Turn a seed or an existing random.Random into a random.Random"""
+        if isinstance(seed, random.Random):
+            return seed
+        return random.Random(seed)
+    
+    def _reseed(self, seed):
+        """Switch to a new random source when a template is asked for with a seed"""
+        if seed is not None:
+            self.rng = self._make_rng(seed)
+    
+    def _new_image(self, color):
+        """Create a blank output image at full pixel size"""
+        return Image.new('RGB', (self.pixel_width, self.pixel_height), color=color)
+    
+    def _draw(self, img):
+        """Create a drawing context that works in layout units"""
+        return ScaledDraw(img, self.scale, supersample=self.supersample)
+    
+    def render(self, category, style, seed=None):
+        """Render the registered template for (category, style)
+
+        Styles without a registered renderer get the default template.
+        """
+        self._reseed(seed)
+        spec = template_registry.get(category, style)
+        if spec is None:
+            label = CATEGORY_LABELS.get(category_key(category), category)
+            return self._create_default_template(label)
+        return getattr(self, spec.method)()
+    
+    def create_birthday_template(self, style, seed=None):
         """Create a birthday themed template"""
-        if style == "elegant":
-            return self._create_elegant_birthday()
-        elif style == "fun":
-            return self._create_fun_birthday()
-        elif style == "kids":
-            return self._create_kids_birthday()
-        elif style == "minimal":
-            return self._create_minimal_birthday()
-        else:
-            return self._create_default_template("Birthday")
-    
-    def create_valentine_template(self, style):
+        return self.render("birthday", style, seed)
+    
+    def create_valentine_template(self, style, seed=None):
         """Create a valentine themed template"""
-        if style == "romantic":
-            return self._create_romantic_valentine()
-        elif style == "cute":
-            return self._create_cute_valentine()
-        elif style == "modern":
-            return self._create_modern_valentine()
-        elif style == "vintage":
-            return self._create_vintage_valentine()
-        else:
-            return self._create_default_template("Valentine")
-    
-    def create_eid_template(self, style):
+        return self.render("valentine", style, seed)
+    
+    def create_eid_template(self, style, seed=None):
         """Create an Eid themed template"""
-        if style == "traditional":
-            return self._create_traditional_eid()
-        elif style == "modern":
-            return self._create_modern_eid()
-        elif style == "festive":
-            return self._create_festive_eid()
-        elif style == "cultural":
-            return self._create_cultural_eid()
-        else:
-            return self._create_default_template("Eid")
-    
-    def create_puja_template(self, style):
+        return self.render("eid", style, seed)
+    
+    def create_puja_template(self, style, seed=None):
         """Create a Puja themed template"""
-        if style == "diwali":
-            return self._create_diwali_template()
-        elif style == "durga":
-            return self._create_durga_template()
-        elif style == "ganesh":
-            return self._create_ganesh_template()
-        elif style == "navratri":
-            return self._create_navratri_template()
-        else:
-            return self._create_default_template("Puja")
-    
-    def create_newyear_template(self, style):
+        return self.render("puja", style, seed)
+    
+    def create_newyear_template(self, style, seed=None):
         """Create a New Year themed template"""
-        if style == "fireworks":
-            return self._create_fireworks_newyear()
-        elif style == "elegant":
-            return self._create_elegant_newyear()
-        elif style == "party":
-            return self._create_party_newyear()
-        elif style == "minimal":
-            return self._create_minimal_newyear()
-        else:
-            return self._create_default_template("New Year")
+        return self.render("newyear", style, seed)
     
     # Birthday Templates
+    @template("birthday", "elegant", cost=15, assets=("arial.ttf",))
     def _create_elegant_birthday(self):
         """Create an elegant birthday template with professional aesthetics"""
         # Create soft gradient background
         img = self._create_gradient_background((255, 250, 240), (255, 240, 220))
-        draw = ImageDraw.Draw(img)
+        draw = self._draw(img)
         
         # Add decorative border with golden color
         border_width = 15
@@ -147,10 +217,7 @@ class TemplateDesigner:
         draw.polygon(right_fold, fill=banner_color)
         
         # Add text to banner
-        try:
-            font = ImageFont.truetype("arial.ttf", 24)
-        except:
-            font = ImageFont.load_default()
+        font = get_font("arial.ttf", 24)
         
         banner_text = "Happy Birthday"
         # Get text size for centering
@@ -176,9 +243,9 @@ class TemplateDesigner:
         # Add decorative elements
         # Golden stars
         for _ in range(10):
-            x = random.randint(border_width*2, self.width-border_width*2)
-            y = random.randint(banner_y+banner_height+20, self.height-border_width*2)
-            size = random.randint(5, 15)
+            x = self.rng.randint(border_width*2, self.width-border_width*2)
+            y = self.rng.randint(banner_y+banner_height+20, self.height-border_width*2)
+            size = self.rng.randint(5, 15)
             self._draw_star(draw, x, y, size, gold_color)
         
         # Add cake with a realistic design
@@ -189,10 +256,10 @@ class TemplateDesigner:
         
         # Add subtle confetti
         for _ in range(50):
-            x = random.randint(border_width*2, self.width-border_width*2)
-            y = random.randint(border_width*2, self.height-border_width*2)
-            size = random.randint(2, 5)
-            opacity = random.randint(30, 100)
+            x = self.rng.randint(border_width*2, self.width-border_width*2)
+            y = self.rng.randint(border_width*2, self.height-border_width*2)
+            size = self.rng.randint(2, 5)
+            opacity = self.rng.randint(30, 100)
             draw.ellipse(
                 [(x-size, y-size), (x+size, y+size)],
                 fill=(gold_color[0], gold_color[1], gold_color[2], opacity)
@@ -203,18 +270,19 @@ class TemplateDesigner:
         
         return img
     
+    @template("birthday", "fun", cost=35, assets=("arial.ttf",))
     def _create_fun_birthday(self):
         """Create a fun birthday template with modern, vibrant aesthetics"""
         # Create base image with bright color gradient
         img = self._create_gradient_background((255, 105, 180), (255, 180, 220))
-        draw = ImageDraw.Draw(img)
+        draw = self._draw(img)
         
         # Add a circular pattern background 
         for i in range(20):
-            x = random.randint(0, self.width)
-            y = random.randint(0, self.height)
-            size = random.randint(20, 100)
-            opacity = random.randint(20, 60)
+            x = self.rng.randint(0, self.width)
+            y = self.rng.randint(0, self.height)
+            size = self.rng.randint(20, 100)
+            opacity = self.rng.randint(20, 60)
             circle_color = (255, 255, 255, opacity)
             draw.ellipse(
                 [(x-size, y-size), (x+size, y+size)],
@@ -252,17 +320,17 @@ class TemplateDesigner:
         
         # Add confetti
         for _ in range(150):
-            x = random.randint(0, self.width)
-            y = random.randint(0, self.height)
-            size = random.randint(2, 8)
+            x = self.rng.randint(0, self.width)
+            y = self.rng.randint(0, self.height)
+            size = self.rng.randint(2, 8)
             
             # Random bright colors
-            r = random.randint(200, 255)
-            g = random.randint(200, 255)
-            b = random.randint(200, 255)
+            r = self.rng.randint(200, 255)
+            g = self.rng.randint(200, 255)
+            b = self.rng.randint(200, 255)
             
             # Randomly choose between circle, square, or triangle
-            shape_type = random.choice(["circle", "square", "triangle"])
+            shape_type = self.rng.choice(["circle", "square", "triangle"])
             
             if shape_type == "circle":
                 draw.ellipse([(x, y), (x+size, y+size)], fill=(r, g, b, 180))
@@ -283,11 +351,12 @@ class TemplateDesigner:
         
         return img
     
+    @template("birthday", "kids", cost=5, assets=("arial.ttf",))
     def _create_kids_birthday(self):
         """Create a kids birthday template with cartoon elements"""
         # Create base image with bright color
-        img = Image.new('RGB', (self.width, self.height), color=(64, 224, 208))
-        draw = ImageDraw.Draw(img)
+        img = self._new_image((64, 224, 208))
+        draw = self._draw(img)
         
         # Add polka dots
         self._add_polka_dots(draw, 30, (255, 255, 255, 100))
@@ -303,11 +372,12 @@ class TemplateDesigner:
         
         return img
     
+    @template("birthday", "minimal", cost=5, assets=("arial.ttf",))
     def _create_minimal_birthday(self):
         """Create a minimal birthday template"""
         # Create base image with light color
-        img = Image.new('RGB', (self.width, self.height), color=(240, 240, 240))
-        draw = ImageDraw.Draw(img)
+        img = self._new_image((240, 240, 240))
+        draw = self._draw(img)
         
         # Add subtle geometric shapes
         self._add_geometric_elements(draw, 10, (200, 200, 200, 50))
@@ -324,11 +394,12 @@ class TemplateDesigner:
         return img
     
     # Valentine Templates
+    @template("valentine", "romantic", cost=20, assets=("arial.ttf",))
     def _create_romantic_valentine(self):
         """Create a romantic valentine template with roses and hearts"""
         # Create base image with gradient
         img = self._create_gradient_background((220, 20, 60), (255, 200, 200))
-        draw = ImageDraw.Draw(img)
+        draw = self._draw(img)
         
         # Add heart pattern
         self._add_heart_pattern(draw, 20, (255, 255, 255, 50))
@@ -344,11 +415,12 @@ class TemplateDesigner:
         
         return img
     
+    @template("valentine", "cute", cost=30, assets=("arial.ttf",))
     def _create_cute_valentine(self):
         """Create a cute valentine template with cartoon hearts"""
         # Create base image
-        img = Image.new('RGB', (self.width, self.height), color=(255, 182, 193))
-        draw = ImageDraw.Draw(img)
+        img = self._new_image((255, 182, 193))
+        draw = self._draw(img)
         
         # Add cute hearts
         self._add_cute_hearts(draw, 25)
@@ -361,11 +433,12 @@ class TemplateDesigner:
         
         return img
     
+    @template("valentine", "modern", cost=5, assets=("arial.ttf",))
     def _create_modern_valentine(self):
         """Create a modern valentine template with geometric hearts"""
         # Create base image
-        img = Image.new('RGB', (self.width, self.height), color=(219, 112, 147))
-        draw = ImageDraw.Draw(img)
+        img = self._new_image((219, 112, 147))
+        draw = self._draw(img)
         
         # Add geometric pattern
         self._add_geometric_pattern(draw)
@@ -381,14 +454,15 @@ class TemplateDesigner:
         
         return img
     
+    @template("valentine", "vintage", cost=20, assets=("arial.ttf",))
     def _create_vintage_valentine(self):
         """Create a vintage valentine template"""
         # Create base image with vintage color
-        img = Image.new('RGB', (self.width, self.height), color=(188, 143, 143))
+        img = self._new_image((188, 143, 143))
         
         # Add texture
         img = self._add_vintage_texture(img)
-        draw = ImageDraw.Draw(img)
+        draw = self._draw(img)
         
         # Add vintage frame
         self._add_vintage_frame(draw)
@@ -402,31 +476,19 @@ class TemplateDesigner:
         return img
     
     # Helper methods for creating template elements
-    def _create_gradient_background(self, color1, color2, direction="vertical"):
-        """Create a gradient background"""
-        if direction == "vertical":
-            # Create a vertical gradient
-            gradient = Image.new('RGB', (self.width, self.height), color=color1)
-            draw = ImageDraw.Draw(gradient)
-            
-            for y in range(self.height):
-                r = int(color1[0] + (color2[0] - color1[0]) * y / self.height)
-                g = int(color1[1] + (color2[1] - color1[1]) * y / self.height)
-                b = int(color1[2] + (color2[2] - color1[2]) * y / self.height)
-                draw.line([(0, y), (self.width, y)], fill=(r, g, b))
-        else:
-            # Create a horizontal gradient
-            gradient = Image.new('RGB', (self.width, self.height), color=color1)
-            draw = ImageDraw.Draw(gradient)
-            
-            for x in range(self.width):
-                r = int(color1[0] + (color2[0] - color1[0]) * x / self.width)
-                g = int(color1[1] + (color2[1] - color1[1]) * x / self.width)
-                b = int(color1[2] + (color2[2] - color1[2]) * x / self.width)
-                draw.line([(x, 0), (x, self.height)], fill=(r, g, b))
-        
-        return gradient
+    def _create_gradient_background(self, color1, color2, direction="vertical", stops=None):
+        """Create a gradient background
+
+        direction can be "vertical", "horizontal", "diagonal" or "radial".
+        stops is an optional list of (position, color) pairs for multi-stop
+        gradients and replaces color1/color2 when given.
+        """
+        if stops is None:
+            stops = [(0.0, color1), (1.0, color2)]
+
+        return create_gradient(self.pixel_width, self.pixel_height, stops, direction)
     
+    @layered
     def _add_corner_decorations(self, draw, color):
         """Add decorative corners to the template"""
         corner_size = 40
@@ -444,18 +506,19 @@ class TemplateDesigner:
             draw.line([(x+20, y), (x, y-20)], fill=color, width=2)
             draw.line([(x+20, y), (x, y+20)], fill=color, width=2)
     
+    @layered
     def _add_confetti(self, draw, count):
         """Add confetti to the template"""
         for _ in range(count):
-            x = random.randint(0, self.width)
-            y = random.randint(0, self.height)
-            size = random.randint(3, 10)
-            r = random.randint(150, 255)
-            g = random.randint(150, 255)
-            b = random.randint(150, 255)
+            x = self.rng.randint(0, self.width)
+            y = self.rng.randint(0, self.height)
+            size = self.rng.randint(3, 10)
+            r = self.rng.randint(150, 255)
+            g = self.rng.randint(150, 255)
+            b = self.rng.randint(150, 255)
             
             # Randomly choose between circle, square, or triangle
-            shape_type = random.choice(["circle", "square", "triangle"])
+            shape_type = self.rng.choice(["circle", "square", "triangle"])
             
             if shape_type == "circle":
                 draw.ellipse([(x, y), (x+size, y+size)], fill=(r, g, b))
@@ -464,24 +527,26 @@ class TemplateDesigner:
             else:  # triangle
                 draw.polygon([(x, y), (x+size, y+size), (x-size, y+size)], fill=(r, g, b))
     
+    @layered
     def _add_balloons(self, draw, count):
         """Add balloon shapes to the template"""
         for _ in range(count):
-            x = random.randint(50, self.width-50)
-            y = random.randint(50, self.height-50)
-            size = random.randint(20, 40)
-            r = random.randint(150, 255)
-            g = random.randint(150, 255)
-            b = random.randint(150, 255)
+            x = self.rng.randint(50, self.width-50)
+            y = self.rng.randint(50, self.height-50)
+            size = self.rng.randint(20, 40)
+            r = self.rng.randint(150, 255)
+            g = self.rng.randint(150, 255)
+            b = self.rng.randint(150, 255)
             
             # Draw balloon
             draw.ellipse([(x-size, y-size*1.2), (x+size, y+size*0.8)], fill=(r, g, b))
             
             # Draw string
-            string_length = random.randint(30, 60)
-            draw.line([(x, y+size*0.8), (x+random.randint(-10, 10), y+size*0.8+string_length)], 
+            string_length = self.rng.randint(30, 60)
+            draw.line([(x, y+size*0.8), (x+self.rng.randint(-10, 10), y+size*0.8+string_length)], 
                      fill=(255, 255, 255), width=1)
     
+    @layered
     def _add_cake_silhouette(self, draw, color):
         """Add a cake silhouette to the template"""
         # Base coordinates for the cake
@@ -523,6 +588,7 @@ class TemplateDesigner:
                 fill=(255, 200, 0, 200)
             )
     
+    @layered
     def _add_text_area(self, draw, opacity=80):
         """Add a semi-transparent text area to the template"""
         text_box_height = 100
@@ -534,12 +600,10 @@ class TemplateDesigner:
             fill=(255, 255, 255, opacity)
         )
     
+    @layered
     def _add_watermark_text(self, draw, text):
         """Add watermark text to the template"""
-        try:
-            font = ImageFont.truetype("arial.ttf", 16)
-        except:
-            font = ImageFont.load_default()
+        font = get_font("arial.ttf", 16)
         
         # Get text size
         text_width, text_height = 100, 20  # Default fallback size
@@ -559,14 +623,16 @@ class TemplateDesigner:
         position = (self.width - text_width - 10, self.height - text_height - 10)
         draw.text(position, text, fill=(255, 255, 255, 128), font=font)
     
+    @layered
     def _add_polka_dots(self, draw, count, color):
         """Add polka dots pattern"""
         for _ in range(count):
-            x = random.randint(0, self.width)
-            y = random.randint(0, self.height)
-            size = random.randint(10, 30)
+            x = self.rng.randint(0, self.width)
+            y = self.rng.randint(0, self.height)
+            size = self.rng.randint(10, 30)
             draw.ellipse([(x-size//2, y-size//2), (x+size//2, y+size//2)], fill=color)
     
+    @layered
     def _add_cartoon_cake(self, draw):
         """Add a colorful cartoon cake"""
         # Base coordinates for the cake
@@ -633,6 +699,7 @@ class TemplateDesigner:
                 fill=(255, 200, 0)
             )
     
+    @layered
     def _add_minimal_cake(self, draw, color):
         """Add a minimal cake icon"""
         # Base coordinates
@@ -663,14 +730,18 @@ class TemplateDesigner:
             fill=color
         )
     
+    @layered
     def _add_heart_pattern(self, draw, count, color):
         """Add a pattern of hearts"""
         for _ in range(count):
-            x = random.randint(0, self.width)
-            y = random.randint(0, self.height)
-            size = random.randint(10, 30)
+            x = self.rng.randint(0, self.width)
+            y = self.rng.randint(0, self.height)
+            size = self.rng.randint(10, 30)
             self._draw_heart(draw, x, y, size, color)
     
+    # Not a motif: a heart is 32 times its size across, wider than the card
+    # for most sizes used, so its sprite is mostly off-card pixels and
+    # stamping it costs more than drawing the polygon into the layer
     def _draw_heart(self, draw, x, y, size, color):
         """Draw a heart shape"""
         # Create heart shape using bezier curves
@@ -684,6 +755,7 @@ class TemplateDesigner:
         
         draw.polygon(points, fill=color)
     
+    @layered
     def _add_rose_silhouette(self, draw):
         """Add a rose silhouette"""
         # Base coordinates
@@ -713,21 +785,22 @@ class TemplateDesigner:
         ]
         draw.polygon(leaf_points, fill=(0, 100, 0, 150))
     
+    @layered
     def _add_cute_hearts(self, draw, count):
         """Add cute cartoon hearts"""
         heart_colors = [(255, 0, 0, 200), (255, 100, 100, 200), (255, 150, 150, 200)]
         
         for _ in range(count):
-            x = random.randint(0, self.width)
-            y = random.randint(0, self.height)
-            size = random.randint(15, 40)
-            color = random.choice(heart_colors)
+            x = self.rng.randint(0, self.width)
+            y = self.rng.randint(0, self.height)
+            size = self.rng.randint(15, 40)
+            color = self.rng.choice(heart_colors)
             
             # Draw heart
             self._draw_heart(draw, x, y, size, color)
             
             # Add cute face to some hearts
-            if random.random() > 0.7:
+            if self.rng.random() > 0.7:
                 # Eyes
                 eye_size = size // 8
                 draw.ellipse(
@@ -747,6 +820,7 @@ class TemplateDesigner:
                     0, 180, fill=(0, 0, 0), width=2
                 )
     
+    @layered
     def _add_geometric_pattern(self, draw):
         """Add a geometric pattern"""
         # Create a grid of shapes
@@ -759,6 +833,32 @@ class TemplateDesigner:
                         fill=(255, 255, 255, 30)
                     )
     
+    @layered
+    def _add_geometric_elements(self, draw, count, color):
+        """Add scattered outlines of simple geometric shapes"""
+        for _ in range(count):
+            x = self.rng.randint(0, self.width)
+            y = self.rng.randint(0, self.height)
+            size = self.rng.randint(20, 60)
+            shape = self.rng.choice(["circle", "square", "triangle"])
+            
+            if shape == "circle":
+                draw.ellipse(
+                    [(x - size//2, y - size//2), (x + size//2, y + size//2)],
+                    outline=color, width=2
+                )
+            elif shape == "square":
+                draw.rectangle(
+                    [(x - size//2, y - size//2), (x + size//2, y + size//2)],
+                    outline=color, width=2
+                )
+            else:
+                draw.polygon(
+                    [(x, y - size//2), (x + size//2, y + size//2), (x - size//2, y + size//2)],
+                    outline=color, width=2
+                )
+    
+    @layered
     def _add_geometric_heart(self, draw):
         """Add a geometric heart"""
         # Base coordinates
@@ -787,28 +887,10 @@ class TemplateDesigner:
     
     def _add_vintage_texture(self, img):
         """Add a vintage texture to the image"""
-        # Create a noise texture
-        noise = Image.new('L', (self.width, self.height))
-        noise_draw = ImageDraw.Draw(noise)
-        
-        # Add random noise
-        for x in range(0, self.width, 2):
-            for y in range(0, self.height, 2):
-                noise_value = random.randint(200, 255)
-                noise_draw.point((x, y), fill=noise_value)
-        
-        # Blur the noise
-        noise = noise.filter(ImageFilter.GaussianBlur(1))
-        
-        # Apply the noise as a texture
-        img = Image.blend(img, noise.convert('RGB'), 0.1)
-        
-        # Reduce saturation
-        enhancer = ImageEnhance.Color(img)
-        img = enhancer.enhance(0.8)
-        
-        return img
+        # Blend in a soft speckle texture and reduce saturation
+        return apply_texture(img, "noise", amount=0.1, saturation=0.8, rng=self.rng)
     
+    @layered
     def _add_vintage_frame(self, draw):
         """Add a vintage decorative frame"""
         # Outer border
@@ -846,8 +928,8 @@ class TemplateDesigner:
     def _create_default_template(self, category):
         """Create a default template for any category"""
         # Create base image
-        img = Image.new('RGB', (self.width, self.height), color=(100, 100, 100))
-        draw = ImageDraw.Draw(img)
+        img = self._new_image((100, 100, 100))
+        draw = self._draw(img)
         
         # Add simple decoration
         border_width = 20
@@ -868,11 +950,12 @@ class TemplateDesigner:
     # Additional helper methods for other categories can be added here
     # For example, methods for Eid, Puja, and New Year templates
     
+    @template("eid", "traditional", cost=15, assets=("arial.ttf",))
     def _create_traditional_eid(self):
         """Create a traditional Eid template with professional aesthetics"""
         # Create base image with gradient from dark green to lighter green
         img = self._create_gradient_background((0, 60, 30), (0, 100, 50))
-        draw = ImageDraw.Draw(img)
+        draw = self._draw(img)
         
         # Add Islamic pattern background
         pattern_color = (255, 255, 255, 30)  # Subtle white
@@ -926,7 +1009,7 @@ class TemplateDesigner:
         for i in range(5):
             x_pos = self.width / 6 * (i + 1)
             y_pos = self.height // 4 * 3
-            size = random.randint(15, 25)
+            size = self.rng.randint(15, 25)
             self._add_lantern(draw, x_pos, y_pos, size, gold_color)
         
         # Add watermark
@@ -934,6 +1017,7 @@ class TemplateDesigner:
         
         return img
     
+    @layered
     def _add_islamic_pattern(self, draw, color):
         """Add Islamic geometric pattern"""
         cell_size = 50
@@ -962,6 +1046,7 @@ class TemplateDesigner:
                     # Alternate points to create star pattern
                     draw.polygon(points, fill=color)
     
+    @layered
     def _add_islamic_corner_decoration(self, draw, x, y, size, color):
         """Add Islamic corner decoration pattern"""
         # Main arch
@@ -983,6 +1068,7 @@ class TemplateDesigner:
             draw.ellipse([(dot_x-dot_size, dot_y-dot_size), (dot_x+dot_size, dot_y+dot_size)], 
                        fill=color)
     
+    @antialiased
     def _add_realistic_crescent_and_star(self, draw, x, y, color):
         """Add a realistic crescent moon and star"""
         # Outer circle (full moon)
@@ -1036,6 +1122,7 @@ class TemplateDesigner:
             
             draw.polygon(glow_points, outline=(color[0], color[1], color[2], 100-i*30), width=1)
     
+    @antialiased
     def _add_detailed_mosque(self, draw, x, y, color):
         """Add a detailed mosque silhouette"""
         # Base width and height
@@ -1155,6 +1242,7 @@ class TemplateDesigner:
                     fill=(200, 180, 50)
                 )
     
+    @layered
     def _add_decorative_arch(self, draw, text, y_position, color):
         """Add a decorative arch with text"""
         center_x = self.width // 2
@@ -1189,10 +1277,7 @@ class TemplateDesigner:
             )
         
         # Add text below the arch
-        try:
-            font = ImageFont.truetype("arial.ttf", 28)
-        except:
-            font = ImageFont.load_default()
+        font = get_font("arial.ttf", 28)
         
         # Get text size for centering
         text_width, text_height = 100, 20  # Default fallback size
@@ -1215,6 +1300,7 @@ class TemplateDesigner:
             text, fill=color, font=font
         )
     
+    @layered
     def _add_eid_text_area(self, draw, opacity=70):
         """Add a text area for Eid cards with Islamic style borders"""
         text_box_height = 120
@@ -1243,6 +1329,7 @@ class TemplateDesigner:
                         fill=(200, 180, 50, pattern_opacity)
                     )
     
+    @motif(lambda size: size * 3)
     def _add_lantern(self, draw, x, y, size, color):
         """Add a decorative Ramadan lantern"""
         # Lantern body
@@ -1304,11 +1391,12 @@ class TemplateDesigner:
                 fill=(255, 255, 200, opacity), outline=(255, 255, 150, opacity)
             )
     
+    @template("puja", "diwali", cost=15, assets=("arial.ttf",))
     def _create_diwali_template(self):
         """Create a professionally designed Diwali template"""
         # Create a rich gradient background from deep purple to dark red
         img = self._create_gradient_background((75, 0, 130), (150, 0, 50))
-        draw = ImageDraw.Draw(img)
+        draw = self._draw(img)
         
         # Add subtle mandala pattern to background
         self._add_mandala_pattern(draw, self.width//2, self.height//2, 200, (255, 255, 255, 20))
@@ -1367,6 +1455,7 @@ class TemplateDesigner:
         
         return img
     
+    @layered
     def _add_mandala_pattern(self, draw, center_x, center_y, size, color):
         """Add a mandala-like pattern"""
         num_circles = 4
@@ -1399,6 +1488,7 @@ class TemplateDesigner:
                     y2 = center_y + radius * math.sin(next_angle)
                     draw.line([(x1, y1), (x2, y2)], fill=color, width=1)
     
+    @layered
     def _add_rangoli_border(self, draw, rect, color):
         """Add a traditional rangoli pattern border"""
         x1, y1 = rect[0]
@@ -1434,6 +1524,7 @@ class TemplateDesigner:
             # Right edge element
             self._draw_small_flower(draw, x2, y, 5, color)
     
+    @motif(lambda size: size * 4 / 3)
     def _draw_small_flower(self, draw, x, y, size, color):
         """Draw a small stylized flower"""
         # Central dot
@@ -1454,6 +1545,7 @@ class TemplateDesigner:
                 fill=color
             )
     
+    @motif(lambda size: size * 1.5)
     def _add_realistic_diya(self, draw, x, y, size, color):
         """Add a realistic diya (oil lamp)"""
         # Diya base - clay lamp shape
@@ -1545,15 +1637,13 @@ class TemplateDesigner:
                     fill=(255, 200, 0, opacity), outline=(255, 200, 0, opacity//2)
                 )
     
+    @layered
     def _add_decorative_title(self, draw, text, y_position, color):
         """Add decorative title with ornate styling"""
         center_x = self.width // 2
         
         # Try to use a decorative font
-        try:
-            font = ImageFont.truetype("arial.ttf", 36)
-        except:
-            font = ImageFont.load_default()
+        font = get_font("arial.ttf", 36)
         
         # Get text size for centering
         text_width, text_height = 200, 40  # Default fallback size
@@ -1638,6 +1728,7 @@ class TemplateDesigner:
                 fill=color
             )
     
+    @antialiased
     def _add_lotus_design(self, draw, x, y, size, color):
         """Add a lotus flower design"""
         # Center circle
@@ -1702,6 +1793,7 @@ class TemplateDesigner:
                 fill=color
             )
     
+    @layered
     def _add_diwali_text_area(self, draw, opacity=80):
         """Add a text area with Diwali-themed decorations"""
         text_box_height = 120
@@ -1728,6 +1820,7 @@ class TemplateDesigner:
         ]:
             self._draw_small_flower(draw, corner_x, corner_y, corner_size//2, (255, 215, 0))
     
+    @layered
     def _add_small_rangoli(self, draw, x, y, size, color):
         """Add a small rangoli design at the specified position"""
         # Center dot
@@ -1762,8 +1855,8 @@ class TemplateDesigner:
     def _create_fireworks_newyear(self):
         """Create a New Year template with fireworks"""
         # Create dark blue background
-        img = Image.new('RGB', (self.width, self.height), color=(25, 25, 112))
-        draw = ImageDraw.Draw(img)
+        img = self._new_image((25, 25, 112))
+        draw = self._draw(img)
         
         # Add city skyline silhouette
         self._add_city_skyline(draw)
@@ -1779,6 +1872,7 @@ class TemplateDesigner:
         
         return img
     
+    @layered
     def _add_city_skyline(self, draw):
         """Add a city skyline silhouette"""
         # Base coordinates
@@ -1790,7 +1884,7 @@ class TemplateDesigner:
         
         for i in range(building_count):
             x = i * building_width
-            height = random.randint(30, 100)
+            height = self.rng.randint(30, 100)
             
             # Draw building
             draw.rectangle(
@@ -1802,30 +1896,31 @@ class TemplateDesigner:
             window_size = 5
             for wy in range(base_y - height + 10, base_y - 10, 15):
                 for wx in range(x + 5, x + building_width - 5, 15):
-                    if random.random() > 0.3:  # Some windows are lit
+                    if self.rng.random() > 0.3:  # Some windows are lit
                         draw.rectangle(
                             [(wx, wy), (wx + window_size, wy + window_size)],
                             fill=(255, 255, 200)
                         )
     
+    @layered
     def _add_fireworks(self, draw, count):
         """Add fireworks to the template"""
         for _ in range(count):
             # Random position for firework
-            x = random.randint(50, self.width - 50)
-            y = random.randint(50, self.height // 2)
+            x = self.rng.randint(50, self.width - 50)
+            y = self.rng.randint(50, self.height // 2)
             
             # Random color
-            r = random.randint(150, 255)
-            g = random.randint(150, 255)
-            b = random.randint(150, 255)
+            r = self.rng.randint(150, 255)
+            g = self.rng.randint(150, 255)
+            b = self.rng.randint(150, 255)
             color = (r, g, b, 200)
             
             # Random size
-            size = random.randint(30, 80)
+            size = self.rng.randint(30, 80)
             
             # Draw firework rays
-            ray_count = random.randint(20, 40)
+            ray_count = self.rng.randint(20, 40)
             for i in range(ray_count):
                 angle = i * 2 * math.pi / ray_count
                 end_x = x + size * math.cos(angle)
@@ -1845,6 +1940,7 @@ class TemplateDesigner:
                         fill=(r, g, b, alpha)
                     )
     
+    @motif(lambda size: size)
     def _draw_star(self, draw, x, y, size, color):
         """Draw a star shape"""
         points = []
@@ -1863,6 +1959,7 @@ class TemplateDesigner:
         
         draw.polygon(points, fill=color)
     
+    @layered
     def _add_elegant_cake(self, draw, gold_color):
         """Add an elegant birthday cake"""
         # Base coordinates
@@ -1949,6 +2046,7 @@ class TemplateDesigner:
                     outline=(255, 200, 0, 150 - radius * 20), width=1
                 )
     
+    @layered
     def _add_text_area_with_shadow(self, draw, opacity=80):
         """Add a semi-transparent text area with shadow effect"""
         text_box_height = 120
@@ -1980,6 +2078,7 @@ class TemplateDesigner:
             outline=(220, 220, 220, 150), width=1
         )
     
+    @layered
     def _add_modern_balloons(self, draw, count):
         """Add modern, glossy balloons"""
         balloon_colors = [
@@ -1992,12 +2091,12 @@ class TemplateDesigner:
         ]
         
         for _ in range(count):
-            x = random.randint(50, self.width-50)
-            y = random.randint(100, self.height//2)
-            size = random.randint(30, 50)
+            x = self.rng.randint(50, self.width-50)
+            y = self.rng.randint(100, self.height//2)
+            size = self.rng.randint(30, 50)
             
             # Select color
-            color = random.choice(balloon_colors)
+            color = self.rng.choice(balloon_colors)
             
             # Draw balloon body
             draw.ellipse(
@@ -2016,8 +2115,8 @@ class TemplateDesigner:
             
             # Draw string with slight curve
             string_points = []
-            string_length = random.randint(100, 200)
-            curve_amplitude = random.randint(5, 15) * (1 if random.random() > 0.5 else -1)
+            string_length = self.rng.randint(100, 200)
+            curve_amplitude = self.rng.randint(5, 15) * (1 if self.rng.random() > 0.5 else -1)
             
             for i in range(string_length):
                 t = i / string_length
@@ -2036,6 +2135,7 @@ class TemplateDesigner:
                 fill=(255, 255, 255)
             )
     
+    @layered
     def _add_gift_box(self, draw, x, y):
         """Add a colorful gift box"""
         # Box dimensions
@@ -2108,6 +2208,7 @@ class TemplateDesigner:
                 fill=(255, 255, 255, opacity)
             )
     
+    @layered
     def _add_ribbon_banner(self, draw, text, y_position, text_color, angle=0):
         """Add a ribbon banner with text"""
         banner_width = self.width - 100
@@ -2152,10 +2253,7 @@ class TemplateDesigner:
         draw.polygon(right_tail, fill=banner_color2)
         
         # Add text to banner
-        try:
-            font = ImageFont.truetype("arial.ttf", 28)
-        except:
-            font = ImageFont.load_default()
+        font = get_font("arial.ttf", 28)
         
         # Get text size for centering
         text_width, text_height = 100, 20  # Default fallback size
@@ -2184,6 +2282,7 @@ class TemplateDesigner:
             text, fill=text_color, font=font
         )
     
+    @layered
     def _add_text_area_with_border(self, draw, opacity=80):
         """Add a text area with decorative border"""
         text_box_height = 120
@@ -2245,11 +2344,12 @@ class TemplateDesigner:
                     fill=(255, 100, 150)
                 )
 
+    @template("newyear", "fireworks", cost=65, assets=("arial.ttf",))
     def _create_fireworks_newyear(self):
         """Create a New Year template with realistic fireworks against a night sky"""
         # Create dark blue to black gradient for night sky
         img = self._create_gradient_background((0, 10, 30), (0, 0, 10))
-        draw = ImageDraw.Draw(img)
+        draw = self._draw(img)
         
         # Add stars to the night sky
         self._add_twinkling_stars(draw, 100)
@@ -2277,7 +2377,7 @@ class TemplateDesigner:
         
         for i, (x, y) in enumerate(firework_positions):
             color = firework_colors[i % len(firework_colors)]
-            size = random.randint(50, 100)
+            size = self.rng.randint(50, 100)
             self._draw_realistic_firework(draw, x, y, size, color)
         
         # Add "Happy New Year" banner
@@ -2295,15 +2395,16 @@ class TemplateDesigner:
         
         return img
 
+    @layered
     def _add_twinkling_stars(self, draw, count):
         """Add twinkling stars to the night sky"""
         for _ in range(count):
-            x = random.randint(0, self.width)
-            y = random.randint(0, self.height // 2)  # Stars only in top half
-            size = random.randint(1, 3)
+            x = self.rng.randint(0, self.width)
+            y = self.rng.randint(0, self.height // 2)  # Stars only in top half
+            size = self.rng.randint(1, 3)
             
             # Randomize brightness
-            brightness = random.randint(150, 255)
+            brightness = self.rng.randint(150, 255)
             
             # Draw the star
             draw.ellipse(
@@ -2312,13 +2413,14 @@ class TemplateDesigner:
             )
             
             # Add glow to some stars
-            if random.random() < 0.2:  # 20% of stars get a glow
+            if self.rng.random() < 0.2:  # 20% of stars get a glow
                 glow_size = size + 2
                 draw.ellipse(
                     [(x - glow_size, y - glow_size), (x + glow_size, y + glow_size)],
                     fill=(brightness, brightness, brightness, 50)
                 )
     
+    @layered
     def _add_modern_city_skyline(self, draw):
         """Add a modern city skyline silhouette"""
         # Base coordinates
@@ -2341,9 +2443,9 @@ class TemplateDesigner:
             height_factor = 0.5 + center_factor * 0.5
             
             # Calculate building width and height
-            width = random.randint(building_width_range[0], building_width_range[1])
+            width = self.rng.randint(building_width_range[0], building_width_range[1])
             max_height = building_min_height + (building_max_height - building_min_height) * height_factor
-            height = random.randint(building_min_height, int(max_height))
+            height = self.rng.randint(building_min_height, int(max_height))
             
             # Store building
             buildings.append((x, width, height))
@@ -2374,7 +2476,7 @@ class TemplateDesigner:
             for row in range(windows_per_column):
                 for col in range(windows_per_row):
                     # Only some windows are lit
-                    if random.random() < 0.6:  # 60% of windows are lit
+                    if self.rng.random() < 0.6:  # 60% of windows are lit
                         window_color = (255, 255, 200)  # Warm light
                     else:
                         window_color = (0, 0, 0)  # Dark window
@@ -2389,7 +2491,7 @@ class TemplateDesigner:
                     )
             
             # Add different roof shapes for variety
-            roof_type = random.choice(["flat", "pointed", "antenna"])
+            roof_type = self.rng.choice(["flat", "pointed", "antenna"])
             
             if roof_type == "pointed":
                 # Pointed roof
@@ -2402,7 +2504,7 @@ class TemplateDesigner:
             elif roof_type == "antenna":
                 # Building with antenna
                 antenna_width = 1
-                antenna_height = random.randint(5, 15)
+                antenna_height = self.rng.randint(5, 15)
                 
                 draw.rectangle(
                     [(x + width//2 - antenna_width, base_y - height - antenna_height),
@@ -2410,10 +2512,11 @@ class TemplateDesigner:
                     fill=(0, 0, 0)
                 )
     
+    @layered
     def _draw_realistic_firework(self, draw, x, y, size, color):
         """Draw a realistic firework explosion"""
         # Create rays with gradient effect
-        ray_count = random.randint(20, 40)
+        ray_count = self.rng.randint(20, 40)
         
         # Draw outer glow
         for radius in range(3):
@@ -2428,7 +2531,7 @@ class TemplateDesigner:
         # Draw the main explosion rays
         for i in range(ray_count):
             angle = i * 2 * math.pi / ray_count
-            ray_length = random.uniform(0.7, 1.0) * size
+            ray_length = self.rng.uniform(0.7, 1.0) * size
             
             end_x = x + ray_length * math.cos(angle)
             end_y = y + ray_length * math.sin(angle)
@@ -2453,11 +2556,11 @@ class TemplateDesigner:
                     )
         
         # Add secondary smaller explosions for some fireworks
-        if random.random() < 0.5:  # 50% chance
-            secondary_count = random.randint(3, 8)
+        if self.rng.random() < 0.5:  # 50% chance
+            secondary_count = self.rng.randint(3, 8)
             for _ in range(secondary_count):
-                angle = random.uniform(0, 2 * math.pi)
-                distance = random.uniform(0.5, 0.8) * size
+                angle = self.rng.uniform(0, 2 * math.pi)
+                distance = self.rng.uniform(0.5, 0.8) * size
                 
                 sec_x = x + distance * math.cos(angle)
                 sec_y = y + distance * math.sin(angle)
@@ -2468,7 +2571,7 @@ class TemplateDesigner:
                 
                 for i in range(sec_ray_count):
                     sec_angle = i * 2 * math.pi / sec_ray_count
-                    sec_ray_length = random.uniform(0.7, 1.0) * sec_size
+                    sec_ray_length = self.rng.uniform(0.7, 1.0) * sec_size
                     
                     sec_end_x = sec_x + sec_ray_length * math.cos(sec_angle)
                     sec_end_y = sec_y + sec_ray_length * math.sin(sec_angle)
@@ -2480,16 +2583,14 @@ class TemplateDesigner:
                         width=1
                     )
     
+    @layered
     def _add_new_year_banner(self, draw):
         """Add a 'Happy New Year' banner"""
         banner_y = self.height // 5
         banner_text = "Happy New Year"
         
         # Try to use a decorative font
-        try:
-            font = ImageFont.truetype("arial.ttf", 36)
-        except:
-            font = ImageFont.load_default()
+        font = get_font("arial.ttf", 36)
         
         # Get text size for centering
         text_width, text_height = 300, 40  # Default fallback size
@@ -2532,8 +2633,8 @@ class TemplateDesigner:
         sparkle_count = 15
         for _ in range(sparkle_count):
             # Position around the text
-            sparkle_x = center_x - text_width//2 - 20 + random.randint(0, text_width + 40)
-            sparkle_y = banner_y - text_height//2 - 20 + random.randint(0, text_height + 40)
+            sparkle_x = center_x - text_width//2 - 20 + self.rng.randint(0, text_width + 40)
+            sparkle_y = banner_y - text_height//2 - 20 + self.rng.randint(0, text_height + 40)
             
             # Skip positions that would overlap with the text
             if (center_x - text_width//2 <= sparkle_x <= center_x + text_width//2 and
@@ -2541,7 +2642,7 @@ class TemplateDesigner:
                 continue
             
             # Draw a small star/sparkle
-            self._draw_sparkle(draw, sparkle_x, sparkle_y, random.randint(3, 7))
+            self._draw_sparkle(draw, sparkle_x, sparkle_y, self.rng.randint(3, 7))
     
     def _draw_sparkle(self, draw, x, y, size):
         """Draw a decorative sparkle/star"""
@@ -2552,8 +2653,13 @@ class TemplateDesigner:
             (200, 255, 255),  # Pale cyan
             (255, 255, 255)   # White
         ]
-        color = random.choice(colors)
+        color = self.rng.choice(colors)
         
+        self._draw_sparkle_rays(draw, x, y, size, color)
+    
+    @motif(lambda size: size)
+    def _draw_sparkle_rays(self, draw, x, y, size, color):
+        """Draw the rays of a sparkle in one color"""
         # Draw main rays
         for i in range(4):
             angle = i * math.pi / 4
@@ -2573,6 +2679,7 @@ class TemplateDesigner:
         # Add center dot
         draw.ellipse([(x-1, y-1), (x+1, y+1)], fill=color)
     
+    @layered
     def _add_new_year_text_area(self, draw, opacity=70):
         """Add a text area with reflective styling"""
         text_box_height = 120
@@ -2615,16 +2722,14 @@ class TemplateDesigner:
                     fill=(255, 255, 255, highlight_opacity)
                 )
     
+    @layered
     def _add_year_text(self, draw, year_text):
         """Add large year text (e.g., '2024')"""
         # Position at the bottom section
         year_y = self.height * 3 // 4
         
         # Try to use a bold font
-        try:
-            font = ImageFont.truetype("arial.ttf", 72)
-        except:
-            font = ImageFont.load_default()
+        font = get_font("arial.ttf", 72)
         
         # Get text size for centering
         text_width, text_height = 150, 70  # Default fallback size
@@ -0,0 +1,107 @@
+from utils.font_service import font_service
+
+# Display names of the template categories, keyed by their directory name
+CATEGORY_LABELS = {
+    "birthday": "Birthday",
+    "valentine": "Valentine",
+    "eid": "Eid",
+    "puja": "Puja",
+    "newyear": "New Year",
+}
+
+# Area of the reference card that cost estimates are given for
+REFERENCE_AREA = 600 * 400
+
+def category_key(category):
+    """Turn a category name such as "New Year" into its key ("newyear")"""
+    return category.lower().replace(" ", "")
+
+class TemplateSpec:
+    """Metadata about one template renderer
+
+    method is the name of the TemplateDesigner method that draws it. cost
+    is a rough render time in milliseconds for the 600x400 reference card,
+    sizes lists the (width, height) sizes it supports (None means any) and
+    assets lists files it loads, such as fonts.
+    """
+
+    def __init__(self, category, style, method, cost=10, sizes=None, assets=()):
+        self.category = category
+        self.style = style
+        self.method = method
+        self.cost = cost
+        self.sizes = sizes
+        self.assets = tuple(assets)
+
+    @property
+    def key(self):
+        return (self.category, self.style)
+
+    def supports(self, size):
+        """Return True if the renderer can draw at this pixel size"""
+        return self.sizes is None or tuple(size) in self.sizes
+
+    def estimate(self, size):
+        """Estimate the render time in milliseconds at a pixel size"""
+        width, height = size
+        return self.cost * width * height / REFERENCE_AREA
+
+    def missing_assets(self):
+        """Return the assets that cannot be loaded on this machine, even through a stand-in font"""
+        return [asset for asset in self.assets if font_service.resolve(asset) is None]
+
+    def __repr__(self):
+        return f"TemplateSpec({self.category!r}, {self.style!r}, {self.method!r})"
+
+class TemplateRegistry:
+    """Renderers that exist, keyed by (category, style)"""
+
+    def __init__(self):
+        self._specs = {}
+
+    def register(self, category, style, method, cost=10, sizes=None, assets=()):
+        """Register the designer method that renders (category, style)"""
+        spec = TemplateSpec(category_key(category), style, method, cost, sizes, assets)
+        self._specs[spec.key] = spec
+        return spec
+
+    def get(self, category, style):
+        """Return the spec for (category, style), or None if nothing renders it"""
+        return self._specs.get((category_key(category), style))
+
+    def categories(self):
+        """List the categories that have at least one renderer"""
+        categories = []
+        for category, _ in self._specs:
+            if category not in categories:
+                categories.append(category)
+        return categories
+
+    def styles(self, category):
+        """List the registered styles of a category"""
+        category = category_key(category)
+        return [style for cat, style in self._specs if cat == category]
+
+    def specs(self, categories=None):
+        """List every spec, optionally only for some categories"""
+        if categories:
+            categories = [category_key(category) for category in categories]
+        return [spec for spec in self._specs.values()
+                if not categories or spec.category in categories]
+
+    def __contains__(self, key):
+        category, style = key
+        return (category_key(category), style) in self._specs
+
+    def __len__(self):
+        return len(self._specs)
+
+# Shared registry filled in by the designer's @template decorators
+template_registry = TemplateRegistry()
+
+def template(category, style, cost=10, sizes=None, assets=()):
+    """Decorator that registers a designer method as a template renderer"""
+    def decorator(method):
+        template_registry.register(category, style, method.__name__, cost, sizes, assets)
+        return method
+    return decorator
@@ -0,0 +1,148 @@
+from PIL import Image, ImageChops, ImageEnhance, ImageFilter
+import random
+# Make numpy optional
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+TEXTURE_KINDS = ("noise", "grain", "paper")
+
+# Textures are built as square tiles that repeat seamlessly
+TILE_SIZE = 256
+
+# Number of different tiles kept per texture kind
+ATLAS_VARIANTS = 4
+
+def _wrap_blur(tile, radius):
+    """Blur a tile as if it repeated forever, so its edges still line up"""
+    width, height = tile.size
+    repeated = Image.new(tile.mode, (width * 3, height * 3))
+    for x in range(3):
+        for y in range(3):
+            repeated.paste(tile, (x * width, y * height))
+    repeated = repeated.filter(ImageFilter.GaussianBlur(radius))
+    return repeated.crop((width, height, width * 2, height * 2))
+
+def _wrap_upscale(tile, size):
+    """Smoothly enlarge a small tile to size while keeping it tileable"""
+    width, height = tile.size
+    factor = size // width
+    repeated = Image.new(tile.mode, (width * 3, height * 3))
+    for x in range(3):
+        for y in range(3):
+            repeated.paste(tile, (x * width, y * height))
+    repeated = repeated.resize((width * 3 * factor, height * 3 * factor), Image.BICUBIC)
+    return repeated.crop((size, size, size * 2, size * 2))
+
+def _random_tile(rng, size, low, high):
+    """Return an L tile of uniform random values between low and high"""
+    tile = Image.frombytes("L", (size, size), rng.randbytes(size * size))
+    return tile.point(lambda v: low + v * (high - low + 1) // 256)
+
+def _noise_tile(rng, size):
+    """Bright speckles on every second pixel, softened by a blur"""
+    if NUMPY_AVAILABLE:
+        gen = np.random.default_rng(rng.getrandbits(64))
+        values = np.zeros((size, size), dtype=np.uint8)
+        values[::2, ::2] = gen.integers(200, 256, (size // 2, size // 2), dtype=np.uint8)
+        tile = Image.fromarray(values, "L")
+    else:
+        # Enlarge half-size speckles and keep only the top-left pixel of each 2x2 cell
+        speckles = _random_tile(rng, size // 2, 200, 255).resize((size, size), Image.NEAREST)
+        grid = Image.frombytes("L", (size, size), (b"\xff\x00" * (size // 2) + b"\x00" * size) * (size // 2))
+        tile = ImageChops.multiply(speckles, grid)
+    return _wrap_blur(tile, 1)
+
+def _grain_tile(rng, size):
+    """Film grain centred on mid grey"""
+    if NUMPY_AVAILABLE:
+        gen = np.random.default_rng(rng.getrandbits(64))
+        values = np.clip(gen.normal(128, 40, (size, size)), 0, 255).astype(np.uint8)
+        tile = Image.fromarray(values, "L")
+    else:
+        tile = _random_tile(rng, size, 60, 196)
+    return _wrap_blur(tile, 0.6)
+
+def _paper_tile(rng, size):
+    """Light paper with soft blotches and a fine fibre grain"""
+    blotches = _wrap_upscale(_random_tile(rng, size // 32, 0, 255), size)
+    if NUMPY_AVAILABLE:
+        gen = np.random.default_rng(rng.getrandbits(64))
+        fibres = gen.normal(0, 6, (size, size)).astype(np.float32)
+        values = 222 + np.asarray(blotches, dtype=np.float32) * (20 / 255) + fibres
+        tile = Image.fromarray(np.clip(values, 0, 255).astype(np.uint8), "L")
+    else:
+        fibres = _random_tile(rng, size, 0, 20)
+        tile = ImageChops.add(blotches.point(lambda v: 212 + v * 20 // 255), fibres)
+    return _wrap_blur(tile, 0.5)
+
+_TILE_BUILDERS = {
+    "noise": _noise_tile,
+    "grain": _grain_tile,
+    "paper": _paper_tile,
+}
+
+class TextureAtlas:
+    """Lazily built set of tileable texture tiles shared by every render
+
+    Each texture kind has a few precomputed variants. A render picks a
+    variant and an offset from its own random source, so textured
+    templates stay reproducible while the tiles are only built once.
+    """
+
+    def __init__(self, tile_size=TILE_SIZE, variants=ATLAS_VARIANTS):
+        self.tile_size = tile_size
+        self.variants = variants
+        self._tiles = {}
+
+    def tile(self, kind, variant):
+        """Return one tile, building it the first time it is asked for"""
+        if kind not in TEXTURE_KINDS:
+            raise ValueError(f"Unknown texture kind: {kind}")
+
+        key = (kind, variant)
+        if key not in self._tiles:
+            # Tiles depend only on kind and variant, never on the render's seed
+            rng = random.Random(f"{kind}:{variant}:{self.tile_size}")
+            self._tiles[key] = _TILE_BUILDERS[kind](rng, self.tile_size)
+        return self._tiles[key]
+
+    def texture(self, kind, width, height, rng=None):
+        """Cover width x height with a repeated tile chosen by rng"""
+        rng = rng or random.Random()
+        tile = self.tile(kind, rng.randrange(self.variants))
+        offset_x = rng.randrange(self.tile_size)
+        offset_y = rng.randrange(self.tile_size)
+
+        if NUMPY_AVAILABLE:
+            values = np.roll(np.asarray(tile), (offset_y, offset_x), axis=(0, 1))
+            reps = (-(-height // self.tile_size), -(-width // self.tile_size))
+            return Image.fromarray(np.tile(values, reps)[:height, :width], "L")
+
+        tile = ImageChops.offset(tile, offset_x, offset_y)
+        texture = Image.new("L", (width, height))
+        for x in range(0, width, self.tile_size):
+            for y in range(0, height, self.tile_size):
+                texture.paste(tile, (x, y))
+        return texture
+
+    def clear(self):
+        """Drop every built tile"""
+        self._tiles.clear()
+
+# Shared atlas so tiles are reused across renders
+texture_atlas = TextureAtlas()
+
+def create_texture(kind, width, height, rng=None):
+    """Create a grayscale texture image of the given size"""
+    return texture_atlas.texture(kind, width, height, rng)
+
+def apply_texture(img, kind="noise", amount=0.1, saturation=1.0, rng=None):
+    """Blend a texture into an RGB image and optionally reduce its saturation"""
+    texture = create_texture(kind, img.width, img.height, rng)
+    img = Image.blend(img, texture.convert(img.mode), amount)
+    if saturation != 1.0:
+        img = ImageEnhance.Color(img).enhance(saturation)
+    return img
@@ -0,0 +1,194 @@
+from collections import OrderedDict
+from PIL import Image, ImageTk
+import hashlib
+import os
+import tempfile
+import threading
+
+# Where generated thumbnails are kept between runs, under the project root
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+THUMBNAIL_DIR = os.path.join(PROJECT_ROOT, "cache", "thumbnails")
+
+# Size of the template previews in the gallery
+THUMBNAIL_SIZE = (300, 200)
+
+# Number of ready PhotoImages kept in memory
+DEFAULT_MAX_PHOTOS = 256
+
+# Size budget for the thumbnails on disk
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+class ThumbnailCache:
+    """Persistent store of template thumbnails
+
+    Thumbnails are keyed by the source file's path, modification time and
+    size plus the thumbnail size, so editing a template makes a new one.
+    They are decoded at reduced scale with Image.draft where the format
+    allows it. Ready PhotoImages are also kept in an in-memory LRU.
+    get_image() is called from the decode workers, so the files on disk
+    and their byte count are changed under a lock; the PhotoImages are
+    only touched on the Tk thread.
+    """
+
+    def __init__(self, cache_dir=THUMBNAIL_DIR, max_photos=DEFAULT_MAX_PHOTOS, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_photos = max_photos
+        self.max_bytes = max_bytes
+        self._photos = OrderedDict()
+        self._total_bytes = None
+        self._lock = threading.RLock()  # Guards the files on disk and _total_bytes
+
+    def key(self, path, size=THUMBNAIL_SIZE):
+        """Build the cache key for a thumbnail of path"""
+        stat = os.stat(path)
+        return self.key_for(path, stat.st_mtime_ns, stat.st_size, size)
+
+    def key_for(self, path, mtime_ns, nbytes, size=THUMBNAIL_SIZE):
+        """Build the cache key for a given version of path"""
+        payload = f"{os.path.abspath(path)}|{mtime_ns}|{nbytes}|{size[0]}x{size[1]}"
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key):
+        """Return the file path for a cache key"""
+        return os.path.join(self.cache_dir, key[:2], key + ".jpg")
+
+    def make_thumbnail(self, path, size=THUMBNAIL_SIZE):
+        """Decode path at reduced scale and shrink it to fit size"""
+        with Image.open(path) as img:
+            # Let the JPEG decoder skip detail we would throw away anyway
+            img.draft("RGB", size)
+            img = img.convert("RGB")
+        img.thumbnail(size, Image.LANCZOS)
+        return img
+
+    def get_image(self, path, size=THUMBNAIL_SIZE):
+        """Return the thumbnail of path as a PIL image, creating it on a miss"""
+        key = self.key(path, size)
+        thumb_path = self.path_for(key)
+        try:
+            img = Image.open(thumb_path)
+            img.load()
+            return img
+        except (OSError, ValueError):
+            pass
+
+        img = self.make_thumbnail(path, size)
+        self._store(thumb_path, img)
+        return img
+
+    def ready_photo(self, path, size=THUMBNAIL_SIZE):
+        """Return the PhotoImage of a thumbnail if one is already in memory"""
+        key = self.key(path, size)
+        photo = self._photos.get(key)
+        if photo is not None:
+            self._photos.move_to_end(key)
+        return photo
+
+    def make_photo(self, path, img, size=THUMBNAIL_SIZE):
+        """Turn a thumbnail image into a PhotoImage and remember it (Tk thread only)"""
+        photo = ImageTk.PhotoImage(img)
+        self._photos[self.key(path, size)] = photo
+        while len(self._photos) > self.max_photos:
+            self._photos.popitem(last=False)
+        return photo
+
+    def release_photo(self, path, size=THUMBNAIL_SIZE):
+        """Drop the in-memory PhotoImage of a thumbnail; the copy on disk stays"""
+        try:
+            self._photos.pop(self.key(path, size), None)
+        except OSError:
+            pass
+
+    def get_photo(self, path, size=THUMBNAIL_SIZE):
+        """Return a Tk PhotoImage of the thumbnail, reusing ready ones"""
+        photo = self.ready_photo(path, size)
+        if photo is None:
+            photo = self.make_photo(path, self.get_image(path, size), size)
+        return photo
+
+    def discard(self, path, mtime_ns, nbytes, size=THUMBNAIL_SIZE):
+        """Forget the thumbnail of an old version of path, e.g. after it was edited"""
+        key = self.key_for(path, mtime_ns, nbytes, size)
+        self._photos.pop(key, None)
+        thumb_path = self.path_for(key)
+        with self._lock:
+            try:
+                nbytes = os.path.getsize(thumb_path)
+                os.remove(thumb_path)
+            except OSError:
+                return
+            if self._total_bytes is not None:
+                self._total_bytes -= nbytes
+
+    def _store(self, thumb_path, img):
+        """Write a thumbnail atomically and keep the store within its budget"""
+        os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(thumb_path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                img.save(f, format="JPEG", quality=90)
+            with self._lock:
+                # Another worker may have stored the same thumbnail meanwhile
+                previous = os.path.getsize(thumb_path) if os.path.exists(thumb_path) else 0
+                os.replace(tmp_path, thumb_path)
+                if self._total_bytes is not None:
+                    self._total_bytes += os.path.getsize(thumb_path) - previous
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def _entries(self):
+        """List (mtime, size, path) for every stored thumbnail"""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+
+        for bucket in os.scandir(self.cache_dir):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith(".jpg"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def total_bytes(self):
+        """Return the current size of the store on disk"""
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._entries())
+            return self._total_bytes
+
+    def evict(self):
+        """Delete the oldest thumbnails until the store fits its budget"""
+        with self._lock:
+            if self.total_bytes() <= self.max_bytes:
+                return
+
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+            self._total_bytes = total
+
+    def clear(self):
+        """Remove every stored thumbnail and forget the ready PhotoImages"""
+        with self._lock:
+            for _, _, path in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._total_bytes = 0
+        self._photos.clear()
+
+# Shared cache used by the views
+thumbnail_cache = ThumbnailCache()
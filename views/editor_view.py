@@ -1,43 +1,65 @@
 import tkinter as tk
-from tkinter import ttk, colorchooser, filedialog, messagebox
-from PIL import Image, ImageTk, ImageDraw, ImageFont
+from tkinter import ttk, colorchooser, filedialog, messagebox, simpledialog
+from PIL import Image, ImageTk
 import os
 import uuid
 from utils.ai_utils import get_ai_greeting, enhance_image_with_ai, get_text_suggestions
+from utils.card_export import DEFAULT_EXPORT_DPI, CardScene
+from utils.catalogue import catalogue
+from utils.history import History
+from utils.image_pyramid import image_pyramid
+from utils.scene_graph import SceneGraph
 
 class DraggableObject:
-    """Class to handle draggable objects on the canvas"""
-    def __init__(self, canvas, item, type="text"):
+    """Class to handle dragging the scene graph's objects on the canvas
+    
+    One set of bindings on a canvas tag covers every object carrying it,
+    and the scene graph is kept in step as objects are moved.
+    """
+    def __init__(self, canvas, scene_graph, tag="node", on_moved=None):
         self.canvas = canvas
-        self.item = item
-        self.type = type  # "text" or "image"
+        self.scene_graph = scene_graph
+        self.on_moved = on_moved  # Called with the node after a drag moved it
+        self.node = None
+        self.moved = False
         
         # Bind events
-        self.canvas.tag_bind(item, "<ButtonPress-1>", self.on_press)
-        self.canvas.tag_bind(item, "<B1-Motion>", self.on_drag)
-        self.canvas.tag_bind(item, "<ButtonRelease-1>", self.on_release)
+        self.canvas.tag_bind(tag, "<ButtonPress-1>", self.on_press)
+        self.canvas.tag_bind(tag, "<B1-Motion>", self.on_drag)
+        self.canvas.tag_bind(tag, "<ButtonRelease-1>", self.on_release)
         
         self.start_x = 0
         self.start_y = 0
     
     def on_press(self, event):
         """Handle mouse press"""
+        items = self.canvas.find_withtag("current")
+        self.node = self.scene_graph.node_for_item(items[0]) if items else None
+        self.moved = False
         self.start_x = event.x
         self.start_y = event.y
-        # Raise the item to the top
-        self.canvas.tag_raise(self.item)
+        if self.node is not None:
+            # Raise the item to the top
+            self.scene_graph.raise_node(self.node.id)
+            self.canvas.tag_raise(self.node.item)
     
     def on_drag(self, event):
         """Handle mouse drag"""
+        if self.node is None:
+            return
         dx = event.x - self.start_x
         dy = event.y - self.start_y
-        self.canvas.move(self.item, dx, dy)
+        self.canvas.move(self.node.item, dx, dy)
+        self.scene_graph.move(self.node.id, dx, dy, redraw=False)
+        self.moved = self.moved or bool(dx or dy)
         self.start_x = event.x
         self.start_y = event.y
     
     def on_release(self, event):
         """Handle mouse release"""
-        pass  # Could add snapping or other functionality here
+        if self.node is not None and self.moved and self.on_moved:
+            self.on_moved(self.node)
+        self.node = None  # Could add snapping or other functionality here
 
 class EditorView(ttk.Frame):
     def __init__(self, parent, controller):
@@ -45,14 +67,9 @@ class EditorView(ttk.Frame):
         self.controller = controller
         self.configure(style="TFrame")
         
-        # Store draggable objects
-        self.draggable_objects = []
-        
-        # Store text objects with their properties
-        self.text_objects = []
-        
-        # Store image objects
-        self.image_objects = []
+        # Text and images on the card, and their undo history
+        self.scene_graph = SceneGraph()
+        self.history = History(self.scene_graph)
         
         # Keep references to images to prevent garbage collection
         self.image_references = []
@@ -60,6 +77,13 @@ class EditorView(ttk.Frame):
         # Current selected object
         self.selected_object = None
         
+        # Template image being decoded in the background
+        self.template_request = None
+        
+        # Template on the canvas and where it sits, as (left, top, width, height)
+        self.template_path = None
+        self.template_box = None
+        
         # Create the layout
         self.create_layout()
     
@@ -74,6 +98,12 @@ class EditorView(ttk.Frame):
                                command=lambda: self.controller.show_frame("gallery"))
         back_button.pack(side="left", padx=20)
         
+        # Undo and redo buttons
+        self.redo_button = ttk.Button(toolbar, text="Redo", command=self.redo, state="disabled")
+        self.redo_button.pack(side="right", padx=(5, 20))
+        self.undo_button = ttk.Button(toolbar, text="Undo", command=self.undo, state="disabled")
+        self.undo_button.pack(side="right")
+        
         # Title
         title_label = ttk.Label(toolbar, text="Card Editor", 
                               font=("Arial", 18, "bold"), style="TLabel")
@@ -169,6 +199,15 @@ class EditorView(ttk.Frame):
         
         # Canvas click event to deselect objects
         self.canvas.bind("<Button-1>", self.canvas_click)
+        
+        # Let every object on the card be dragged
+        self.dragger = DraggableObject(self.canvas, self.scene_graph,
+                                       on_moved=lambda node: self.record("Move"))
+        
+        # Keyboard shortcuts for undo and redo
+        self.controller.bind("<Control-z>", self.undo, add="+")
+        self.controller.bind("<Control-y>", self.redo, add="+")
+        self.controller.bind("<Control-Z>", self.redo, add="+")
     
     def update_view(self):
         """Update the view when shown"""
@@ -179,27 +218,44 @@ class EditorView(ttk.Frame):
         """Load the selected template into the canvas"""
         # Clear canvas
         self.canvas.delete("all")
-        self.draggable_objects = []
-        self.text_objects = []
-        self.image_objects = []
+        self.scene_graph.clear()
+        self.history.reset()
+        self.update_history_buttons()
+        self.selected_object = None
         self.image_references = []
-        
+        self.template_path = template_path
+        self.template_box = None
+        
+        # Resize to fit canvas if needed
+        canvas_width = self.canvas.winfo_width() or 600
+        canvas_height = self.canvas.winfo_height() or 400
+        
+        # Decode and resize in the background, replacing any template still loading
+        decode_service = self.controller.decode_service
+        if self.template_request is not None:
+            decode_service.cancel(self.template_request)
+        
+        def on_error(error):
+            self.template_request = None
+            messagebox.showerror("Error", f"Failed to load template: {str(error)}")
+        
+        # Start new text in a colour that reads well on this template
+        entry = catalogue.get(template_path)
+        if entry and entry.get("text_color"):
+            self.color_var.set(entry["text_color"])
+            self.color_preview.config(bg=entry["text_color"])
+        
+        # Always decode the template's own file; a near duplicate may differ in detail
+        self.template_request = decode_service.submit(
+            self, lambda: image_pyramid.get_image(template_path, (canvas_width, canvas_height), upscale=True),
+            lambda img: self.show_template(img, canvas_width, canvas_height),
+            on_error
+        )
+    
+    def show_template(self, img, canvas_width, canvas_height):
+        """Place a decoded template image on the canvas"""
+        self.template_request = None
         try:
-            # Load the template image
-            img = Image.open(template_path)
-            
-            # Resize to fit canvas if needed
-            canvas_width = self.canvas.winfo_width() or 600
-            canvas_height = self.canvas.winfo_height() or 400
-            
-            # Resize image to fit canvas while maintaining aspect ratio
-            img_width, img_height = img.size
-            ratio = min(canvas_width/img_width, canvas_height/img_height)
-            new_width = int(img_width * ratio)
-            new_height = int(img_height * ratio)
-            
-            img = img.resize((new_width, new_height), Image.LANCZOS)
-            
             # Convert to PhotoImage and keep a reference
             self.template_image = ImageTk.PhotoImage(img)
             self.image_references.append(self.template_image)
@@ -211,8 +267,14 @@ class EditorView(ttk.Frame):
                 tags="template"
             )
             
-            # Store original image for export
-            self.original_template = img
+            # Keep the template behind anything added while it was loading
+            self.canvas.tag_lower(self.template_id)
+            
+            # Remember where the template sits so the card can be re-rendered at full size
+            self.template_box = (
+                canvas_width/2 - img.width/2, canvas_height/2 - img.height/2,
+                img.width, img.height
+            )
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load template: {str(e)}")
     
@@ -235,31 +297,16 @@ class EditorView(ttk.Frame):
         def add_text_to_canvas():
             text = text_var.get()
             if text:
-                # Create text on canvas
-                text_id = self.canvas.create_text(
-                    300, 200,  # Center of canvas
-                    text=text,
-                    font=(self.font_var.get(), self.size_var.get()),
-                    fill=self.color_var.get(),
-                    tags=f"text_{len(self.text_objects)}"
+                # Create text in the center of the canvas
+                node = self.scene_graph.add_text(
+                    text, 300, 200,
+                    self.font_var.get(), self.size_var.get(), self.color_var.get()
                 )
-                
-                # Make text draggable
-                drag_obj = DraggableObject(self.canvas, text_id, "text")
-                self.draggable_objects.append(drag_obj)
-                
-                # Store text object with properties
-                text_obj = {
-                    "id": text_id,
-                    "text": text,
-                    "font": self.font_var.get(),
-                    "size": self.size_var.get(),
-                    "color": self.color_var.get()
-                }
-                self.text_objects.append(text_obj)
+                self.sync_canvas()
+                self.record("Add text")
                 
                 # Select the new text
-                self.select_object(text_id, "text")
+                self.select_object(node)
             
             text_dialog.destroy()
         
@@ -362,33 +409,17 @@ class EditorView(ttk.Frame):
         def add_ai_text_to_canvas():
             greeting = preview_text.get(1.0, tk.END).strip()
             if greeting:
-                # Create text on canvas
-                text_id = self.canvas.create_text(
-                    300, 200,  # Center of canvas
-                    text=greeting,
-                    font=(self.font_var.get(), self.size_var.get()),
-                    fill=self.color_var.get(),
-                    width=400,  # Wrap text at 400 pixels
-                    justify=tk.CENTER,
-                    tags=f"text_{len(self.text_objects)}"
+                # Create text in the center of the canvas, wrapped at 400 pixels
+                node = self.scene_graph.add_text(
+                    greeting, 300, 200,
+                    self.font_var.get(), self.size_var.get(), self.color_var.get(),
+                    wrap_width=400
                 )
-                
-                # Make text draggable
-                drag_obj = DraggableObject(self.canvas, text_id, "text")
-                self.draggable_objects.append(drag_obj)
-                
-                # Store text object with properties
-                text_obj = {
-                    "id": text_id,
-                    "text": greeting,
-                    "font": self.font_var.get(),
-                    "size": self.size_var.get(),
-                    "color": self.color_var.get()
-                }
-                self.text_objects.append(text_obj)
+                self.sync_canvas()
+                self.record("Add AI text")
                 
                 # Select the new text
-                self.select_object(text_id, "text")
+                self.select_object(node)
                 
                 ai_dialog.destroy()
         
@@ -397,19 +428,9 @@ class EditorView(ttk.Frame):
     
     def edit_text(self):
         """Edit the selected text"""
-        if not self.selected_object or self.selected_object["type"] != "text":
-            return
-        
-        # Find the text object
-        text_id = self.selected_object["id"]
-        text_obj = None
-        for obj in self.text_objects:
-            if obj["id"] == text_id:
-                text_obj = obj
-                break
-        
-        if not text_obj:
+        if not self.selected_object or self.selected_object.kind != "text":
             return
+        text_node = self.selected_object
         
         # Create a dialog to edit text
         text_dialog = tk.Toplevel(self)
@@ -424,7 +445,7 @@ class EditorView(ttk.Frame):
         text_frame = ttk.Frame(text_dialog)
         text_frame.pack(fill="x", pady=5)
         
-        text_var = tk.StringVar(value=text_obj["text"])
+        text_var = tk.StringVar(value=text_node.text)
         text_entry = ttk.Entry(text_frame, textvariable=text_var, width=40)
         text_entry.pack(fill="x", padx=5)
         text_entry.focus_set()
@@ -469,11 +490,10 @@ class EditorView(ttk.Frame):
         def update_text():
             new_text = text_var.get()
             if new_text:
-                # Update canvas text
-                self.canvas.itemconfig(text_id, text=new_text)
-                
-                # Update stored text
-                text_obj["text"] = new_text
+                # Update the text and redraw it
+                self.scene_graph.update(text_node.id, text=new_text)
+                self.sync_canvas()
+                self.record("Edit text")
             
             text_dialog.destroy()
         
@@ -513,52 +533,29 @@ class EditorView(ttk.Frame):
                 new_width = int(img_width * ratio)
                 new_height = int(img_height * ratio)
                 img = img.resize((new_width, new_height), Image.LANCZOS)
+            else:
+                # The scene graph gets an image of its own, not the open file
+                img = img.copy()
             
-            # Convert to PhotoImage
-            photo = ImageTk.PhotoImage(img)
-            self.image_references.append(photo)  # Keep reference
-            
-            # Create image on canvas
-            img_id = self.canvas.create_image(
-                300, 200,  # Center of canvas
-                image=photo,
-                tags=f"image_{len(self.image_objects)}"
-            )
-            
-            # Make image draggable
-            drag_obj = DraggableObject(self.canvas, img_id, "image")
-            self.draggable_objects.append(drag_obj)
-            
-            # Store image object
-            img_obj = {
-                "id": img_id,
-                "image": photo,
-                "original": img,
-                "path": file_path
-            }
-            self.image_objects.append(img_obj)
+            # Create image in the center of the canvas; exports re-read the file at full resolution
+            node = self.scene_graph.add_image(img, 300, 200, source=file_path, path=file_path)
+            self.sync_canvas()
+            self.record("Add image")
             
             # Select the new image
-            self.select_object(img_id, "image")
+            self.select_object(node)
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load image: {str(e)}")
     
     def enhance_selected_image(self):
         """Enhance the selected image using AI"""
-        if not self.selected_object or self.selected_object["type"] != "image":
+        if not self.selected_object or self.selected_object.kind != "image":
             messagebox.showinfo("Info", "Please select an image to enhance")
             return
+        img_node = self.selected_object
         
-        # Find the image object
-        img_id = self.selected_object["id"]
-        img_obj = None
-        for obj in self.image_objects:
-            if obj["id"] == img_id:
-                img_obj = obj
-                break
-        
-        if not img_obj or not img_obj["path"]:
+        if not img_node.path:
             messagebox.showinfo("Info", "Cannot enhance this image")
             return
         
@@ -568,7 +565,9 @@ class EditorView(ttk.Frame):
             self.update()
             
             # Enhance the image
-            enhanced_img = enhance_image_with_ai(img_obj["path"])
+            # The graph keeps its images unchanged, so it gets a copy of the helper's result
+            enhanced_img = enhance_image_with_ai(img_node.path).copy()
+            source = enhanced_img
             
             # Resize if needed
             max_size = 300
@@ -579,16 +578,11 @@ class EditorView(ttk.Frame):
                 new_height = int(img_height * ratio)
                 enhanced_img = enhanced_img.resize((new_width, new_height), Image.LANCZOS)
             
-            # Convert to PhotoImage
-            photo = ImageTk.PhotoImage(enhanced_img)
-            self.image_references.append(photo)  # Keep reference
-            
-            # Update canvas image
-            self.canvas.itemconfig(img_id, image=photo)
-            
-            # Update stored image
-            img_obj["image"] = photo
-            img_obj["original"] = enhanced_img
+            # Update the image and redraw it
+            # The image it replaces stays in the history, so this can be undone
+            self.scene_graph.update(img_node.id, image=enhanced_img, source=source)
+            self.sync_canvas()
+            self.record("Enhance image")
             
             # Reset cursor
             self.config(cursor="")
@@ -610,32 +604,16 @@ class EditorView(ttk.Frame):
     
     def update_text_properties(self, event=None):
         """Update the properties of the selected text"""
-        if not self.selected_object or self.selected_object["type"] != "text":
+        if not self.selected_object or self.selected_object.kind != "text":
             return
         
-        # Find the text object
-        text_id = self.selected_object["id"]
-        text_obj = None
-        for obj in self.text_objects:
-            if obj["id"] == text_id:
-                text_obj = obj
-                break
-        
-        if not text_obj:
-            return
-        
-        # Update font properties
-        font = self.font_var.get()
-        size = self.size_var.get()
-        color = self.color_var.get()
-        
-        # Update canvas text
-        self.canvas.itemconfig(text_id, font=(font, size), fill=color)
-        
-        # Update stored properties
-        text_obj["font"] = font
-        text_obj["size"] = size
-        text_obj["color"] = color
+        # Update font properties and redraw the text
+        self.scene_graph.update(
+            self.selected_object.id,
+            font=self.font_var.get(), size=self.size_var.get(), color=self.color_var.get()
+        )
+        self.sync_canvas()
+        self.record("Change text style")
     
     def canvas_click(self, event):
         """Handle canvas click to select/deselect objects"""
@@ -647,25 +625,24 @@ class EditorView(ttk.Frame):
         
         # If clicked on an object, select it
         if items:
-            # Get the topmost item (excluding the template)
+            # Get the topmost object (the template and highlight aren't part of the scene)
             for item in reversed(items):
-                tags = self.canvas.gettags(item)
-                if "template" not in tags:
-                    # Determine if it's a text or image
-                    item_type = "text" if any("text_" in tag for tag in tags) else "image"
-                    self.select_object(item, item_type)
+                node = self.scene_graph.node_for_item(item)
+                if node is not None:
+                    self.select_object(node)
                     break
     
-    def select_object(self, item_id, item_type):
+    def select_object(self, node):
         """Select an object on the canvas"""
         # Deselect current object
         self.deselect_current_object()
         
         # Store selected object
-        self.selected_object = {"id": item_id, "type": item_type}
+        self.selected_object = node
+        item_id = node.item
         
         # Highlight the selected object
-        if item_type == "text":
+        if node.kind == "text":
             # Create a bounding box around the text
             bbox = self.canvas.bbox(item_id)
             if bbox:
@@ -688,13 +665,10 @@ class EditorView(ttk.Frame):
                 self.enable_text_properties()
                 
                 # Set current text properties
-                for obj in self.text_objects:
-                    if obj["id"] == item_id:
-                        self.font_var.set(obj["font"])
-                        self.size_var.set(obj["size"])
-                        self.color_var.set(obj["color"])
-                        self.color_preview.config(bg=obj["color"])
-                        break
+                self.font_var.set(node.font)
+                self.size_var.set(node.size)
+                self.color_var.set(node.color)
+                self.color_preview.config(bg=node.color)
         else:
             # Create a bounding box around the image
             bbox = self.canvas.bbox(item_id)
@@ -735,8 +709,104 @@ class EditorView(ttk.Frame):
             except:
                 pass
     
+    def record(self, label):
+        """Add the current state of the card to the undo history"""
+        if self.history.commit(label):
+            self.update_history_buttons()
+    
+    def undo(self, event=None):
+        """Undo the last change to the card"""
+        if event is not None and self.controller.current_frame is not self:
+            return
+        # Anything changed but not yet recorded becomes the step that gets undone
+        if self.history.undo() is not None:
+            self.show_history_state()
+    
+    def redo(self, event=None):
+        """Redo the last undone change"""
+        if event is not None and self.controller.current_frame is not self:
+            return
+        if self.history.redo() is not None:
+            self.show_history_state()
+    
+    def show_history_state(self):
+        """Redraw the card after undo or redo"""
+        self.deselect_current_object()
+        self.sync_canvas()
+        
+        # Restore the stacking order as well
+        for node in self.scene_graph.ordered():
+            self.canvas.tag_raise(node.item)
+        self.update_history_buttons()
+    
+    def update_history_buttons(self):
+        """Enable the undo and redo buttons when there is something to undo or redo"""
+        self.undo_button.config(state="normal" if self.history.can_undo() else "disabled")
+        self.redo_button.config(state="normal" if self.history.can_redo() else "disabled")
+    
+    def sync_canvas(self):
+        """Redraw the objects that changed in the scene graph since the last sync"""
+        for item in self.scene_graph.take_removed():
+            self.canvas.delete(item)
+        
+        for node in self.scene_graph.take_dirty():
+            if node.kind == "text":
+                options = {
+                    "text": node.text,
+                    "font": (node.font, node.size),
+                    "fill": node.color,
+                    "width": node.wrap_width or 0,
+                    "justify": tk.CENTER,
+                }
+                if node.item is None:
+                    item = self.canvas.create_text(node.x, node.y, tags="node", **options)
+                    self.scene_graph.bind_item(node, item)
+                else:
+                    self.canvas.coords(node.item, node.x, node.y)
+                    self.canvas.itemconfig(node.item, **options)
+            else:
+                if node.photo is None:
+                    img = node.image
+                    if img.size != node.display_size:
+                        img = img.resize(node.display_size, Image.LANCZOS)
+                    node.photo = ImageTk.PhotoImage(img)  # Keep reference on the node
+                if node.item is None:
+                    item = self.canvas.create_image(node.x, node.y, image=node.photo, tags="node")
+                    self.scene_graph.bind_item(node, item)
+                else:
+                    self.canvas.coords(node.item, node.x, node.y)
+                    self.canvas.itemconfig(node.item, image=node.photo)
+    
+    def build_scene(self):
+        """Describe the card on the canvas independently of the canvas size"""
+        left, top, width, height = self.template_box
+        scene = CardScene(self.template_path)
+        
+        # Tk font sizes are in points; this is how many canvas pixels make a point
+        pixels_per_point = float(self.tk.call("tk", "scaling"))
+        
+        # Objects go in bottom to top, as they are stacked on the canvas
+        for node in self.scene_graph.ordered():
+            x, y = (node.x - left) / width, (node.y - top) / height
+            if node.kind == "text":
+                scene.add_text(
+                    node.text, x, y, node.font,
+                    node.size * pixels_per_point / height,
+                    node.color,
+                    node.wrap_width / width if node.wrap_width else None
+                )
+            else:
+                shown_width, shown_height = node.display_size
+                scene.add_image(node.source, x, y, shown_width / width, shown_height / height)
+        
+        return scene
+    
     def export_card(self):
-        """Export the greeting card as an image"""
+        """Export the greeting card as an image at print resolution"""
+        if self.template_box is None:
+            messagebox.showerror("Error", "No template loaded")
+            return
+        
         # Ask for save location
         file_path = filedialog.asksaveasfilename(
             title="Save Greeting Card",
@@ -747,85 +817,20 @@ class EditorView(ttk.Frame):
         if not file_path:
             return
         
+        dpi = simpledialog.askinteger(
+            "Export Resolution", "Print resolution (DPI):",
+            initialvalue=DEFAULT_EXPORT_DPI, minvalue=72, maxvalue=1200, parent=self
+        )
+        if not dpi:
+            return
+        
         try:
-            # Create a new image from the template
-            if hasattr(self, 'original_template'):
-                # Use the original template image
-                card_img = self.original_template.copy()
-                
-                # Get canvas dimensions
-                canvas_width = self.canvas.winfo_width()
-                canvas_height = self.canvas.winfo_height()
-                
-                # Calculate scaling factors
-                img_width, img_height = card_img.size
-                scale_x = img_width / canvas_width
-                scale_y = img_height / canvas_height
-                
-                # Create a drawing context
-                draw = ImageDraw.Draw(card_img)
-                
-                # Add text elements
-                for text_obj in self.text_objects:
-                    # Get text position on canvas
-                    bbox = self.canvas.bbox(text_obj["id"])
-                    if bbox:
-                        # Calculate center position
-                        cx = (bbox[0] + bbox[2]) / 2
-                        cy = (bbox[1] + bbox[3]) / 2
-                        
-                        # Scale to image coordinates
-                        img_x = cx * scale_x
-                        img_y = cy * scale_y
-                        
-                        # Load font
-                        try:
-                            font = ImageFont.truetype(text_obj["font"], text_obj["size"])
-                        except:
-                            # Fallback to default font
-                            font = ImageFont.load_default()
-                        
-                        # Draw text
-                        draw.text(
-                            (img_x, img_y),
-                            text_obj["text"],
-                            fill=text_obj["color"],
-                            font=font,
-                            anchor="mm"  # Center alignment
-                        )
-                
-                # Add image elements
-                for img_obj in self.image_objects:
-                    # Get image position on canvas
-                    bbox = self.canvas.bbox(img_obj["id"])
-                    if bbox:
-                        # Calculate center position
-                        cx = (bbox[0] + bbox[2]) / 2
-                        cy = (bbox[1] + bbox[3]) / 2
-                        
-                        # Scale to image coordinates
-                        img_x = cx * scale_x
-                        img_y = cy * scale_y
-                        
-                        # Get original image
-                        user_img = img_obj["original"]
-                        
-                        # Calculate paste position
-                        paste_x = int(img_x - user_img.width / 2)
-                        paste_y = int(img_y - user_img.height / 2)
-                        
-                        # Paste the image
-                        if user_img.mode == 'RGBA':
-                            # Handle transparent images
-                            card_img.paste(user_img, (paste_x, paste_y), user_img)
-                        else:
-                            card_img.paste(user_img, (paste_x, paste_y))
-                
-                # Save the image
-                card_img.save(file_path)
-                
-                messagebox.showinfo("Success", f"Card saved successfully to {file_path}")
-            else:
-                messagebox.showerror("Error", "No template loaded")
+            # Snapshot the card and re-render it from the full resolution sources in the background
+            self.controller.export_queue.submit(
+                self.build_scene(), file_path, dpi,
+                on_done=lambda job: messagebox.showinfo(
+                    "Success", f"Card saved successfully to {job.path} ({job.size[0]}x{job.size[1]})"),
+                on_error=lambda job: messagebox.showerror("Error", f"Failed to export card: {job.message}")
+            )
         except Exception as e:
             messagebox.showerror("Error", f"Failed to export card: {str(e)}")
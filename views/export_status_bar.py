@@ -0,0 +1,51 @@
+from tkinter import ttk
+
+class ExportStatusBar(ttk.Frame):
+    """Strip along the bottom of the window showing background exports
+    
+    Shows the export in progress with a progress bar, how many more are
+    queued, and a button to cancel it. Hidden while nothing is exporting.
+    """
+    
+    def __init__(self, parent, export_queue, below=None):
+        super().__init__(parent, padding=(10, 4))
+        self.export_queue = export_queue
+        self.below = below  # Widget the bar is packed under when it appears
+        self.current_job = None
+        
+        self.status_label = ttk.Label(self, text="")
+        self.status_label.pack(side="left")
+        
+        self.cancel_btn = ttk.Button(self, text="Cancel", command=self.cancel_current)
+        self.cancel_btn.pack(side="right")
+        
+        self.progress = ttk.Progressbar(self, mode="determinate", maximum=100, length=200)
+        self.progress.pack(side="right", padx=10)
+        
+        export_queue.add_listener(self.on_job_changed)
+    
+    def on_job_changed(self, job):
+        """Refresh the bar for the oldest unfinished export"""
+        active = self.export_queue.active()
+        if not active:
+            self.current_job = None
+            self.pack_forget()
+            return
+        
+        self.current_job = active[0]
+        text = f"{self.current_job.message} {self.current_job.label}"
+        if len(active) > 1:
+            text += f"  ({len(active) - 1} more queued)"
+        self.status_label.config(text=text)
+        self.progress.config(value=self.current_job.progress * 100)
+        
+        if not self.winfo_manager():
+            if self.below is not None:
+                self.pack(side="bottom", fill="x", before=self.below)
+            else:
+                self.pack(side="bottom", fill="x")
+    
+    def cancel_current(self):
+        """Cancel the export being shown"""
+        if self.current_job is not None:
+            self.export_queue.cancel(self.current_job.id)
@@ -1,8 +1,191 @@
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk, ImageDraw, ImageFont
+from PIL import Image, ImageTk, ImageDraw
 import os
 import random
+from utils.catalogue import DISPLAY_NAMES, TEMPLATES_DIR, catalogue, category_label, describe, style_label
+from utils.font_service import get_font, text_size
+from utils.palette import from_hex
+from utils.render_cache import render_cache, source_version
+from utils.search_index import search_index
+from utils.template_registry import category_key
+from utils.thumbnail_cache import THUMBNAIL_SIZE, thumbnail_cache
+
+# Templates the gallery reads from the search index at a time
+PAGE_SIZE = 12
+
+# Pages kept in memory either side of the ones in view
+KEEP_PAGES = 1
+
+class VirtualGrid:
+    """Scrollable grid that only creates widgets for the rows in view
+
+    Cards are made with make_card(canvas) and shown as canvas windows.
+    When a card scrolls out of view it is hidden and later refilled with
+    fill_card(card, item) for another item, so the number of widgets
+    stays the same however long the list is.
+    """
+    def __init__(self, canvas, make_card, fill_card, cell_width, cell_height, columns=2, overscan=1,
+                 on_range=None):
+        self.canvas = canvas
+        self.make_card = make_card
+        self.fill_card = fill_card
+        self.on_range = on_range  # Called with the (start, end) item range after each refresh
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.columns = columns
+        self.overscan = overscan  # Extra rows built above and below the viewport
+        
+        self.items = []
+        self.visible = {}  # item index -> (card, window id, item shown)
+        self.free = []     # hidden (card, window id) pairs ready for reuse
+        self.empty_text = None
+        
+        self.canvas.bind("<Configure>", lambda e: self.refresh())
+    
+    def set_items(self, items, empty_message="Nothing to show", keep_position=False):
+        """Show a new list of items, reusing the existing cards
+        
+        Cards whose slot still shows the same item are left alone, so only
+        the slots that changed are refilled. keep_position leaves the view
+        scrolled where it is, for when the list was only updated rather
+        than replaced. items can be any sequence, including one that
+        loads its items lazily.
+        """
+        self.items = items
+        
+        # Hide cards past the end of the new list; refresh() refills the rest
+        for index in list(self.visible):
+            if index >= len(self.items):
+                self.release(index)
+        
+        if self.empty_text is not None:
+            self.canvas.delete(self.empty_text)
+            self.empty_text = None
+        if not self.items:
+            self.empty_text = self.canvas.create_text(
+                self.cell_width * self.columns // 2, 50,
+                text=empty_message, font=("Arial", 14), anchor="n"
+            )
+        
+        rows = -(-len(self.items) // self.columns)
+        self.canvas.configure(scrollregion=(0, 0, self.cell_width * self.columns, max(rows * self.cell_height, 1)))
+        if not keep_position:
+            self.canvas.yview_moveto(0)
+        self.refresh()
+    
+    def visible_range(self):
+        """Return the (start, end) item indices that should have a card"""
+        top = self.canvas.canvasy(0)
+        bottom = top + max(self.canvas.winfo_height(), self.cell_height)
+        
+        first_row = max(0, int(top // self.cell_height) - self.overscan)
+        last_row = int(bottom // self.cell_height) + self.overscan
+        start = first_row * self.columns
+        end = min(len(self.items), (last_row + 1) * self.columns)
+        return start, end
+    
+    def refresh(self):
+        """Bring the cards in line with the current scroll position"""
+        start, end = self.visible_range()
+        
+        # Recycle cards that scrolled out of view
+        for index in list(self.visible):
+            if not start <= index < end:
+                self.release(index)
+        
+        # Fill cards for rows that scrolled in or whose item changed
+        for index in range(start, end):
+            item = self.items[index]
+            if index in self.visible:
+                card, window, shown = self.visible[index]
+                if shown is not item:
+                    self.fill_card(card, item)
+                    self.visible[index] = (card, window, item)
+                continue
+            
+            if self.free:
+                card, window = self.free.pop()
+            else:
+                card = self.make_card(self.canvas)
+                window = self.canvas.create_window(0, 0, window=card, anchor="nw")
+            
+            row, col = divmod(index, self.columns)
+            self.canvas.coords(window, col * self.cell_width, row * self.cell_height)
+            self.canvas.itemconfigure(window, state="normal")
+            self.fill_card(card, item)
+            self.visible[index] = (card, window, item)
+        
+        if self.on_range:
+            self.on_range(start, end)
+    
+    def release(self, index):
+        """Hide the card showing an item and keep it for reuse"""
+        card, window, _ = self.visible.pop(index)
+        self.canvas.itemconfigure(window, state="hidden")
+        self.free.append((card, window))
+
+class PagedResults:
+    """Search results that the gallery reads a page at a time
+    
+    Only the matching catalogue paths are held for the whole result.
+    Entries are looked up a page at a time as the grid reaches them, the
+    page after the ones in view is handed to prefetch() so its thumbnails
+    are decoded ahead of time, and pages that have scrolled far away are
+    handed to release() and forgotten. Memory stays flat however many
+    templates match.
+    """
+    def __init__(self, index, relpaths, page_size=PAGE_SIZE, prefetch=None, release=None):
+        self.index = index
+        self.relpaths = relpaths
+        self.page_size = page_size
+        self.prefetch = prefetch  # prefetch(entries) -> request ids
+        self.release = release    # release(entries, request ids, drop_photos)
+        self.pages = {}     # page number -> entries
+        self.requests = {}  # page number -> prefetch request ids
+    
+    def __len__(self):
+        return len(self.relpaths)
+    
+    def __getitem__(self, index):
+        number, offset = divmod(index, self.page_size)
+        return self.page(number)[offset]
+    
+    def page(self, number):
+        """Return the entries of one page, looking them up if needed"""
+        entries = self.pages.get(number)
+        if entries is None:
+            start = number * self.page_size
+            entries = [self.index.entry(relpath) for relpath in self.relpaths[start:start + self.page_size]]
+            self.pages[number] = entries
+        return entries
+    
+    def viewing(self, start, end):
+        """Prefetch the page after the item range in view and drop pages far from it"""
+        if not self.relpaths:
+            return
+        first = start // self.page_size
+        last = max(start, end - 1) // self.page_size
+        
+        ahead = last + 1
+        if ahead * self.page_size < len(self.relpaths) and ahead not in self.requests and self.prefetch:
+            self.requests[ahead] = self.prefetch(self.page(ahead))
+        
+        for number in list(self.pages):
+            if not first - KEEP_PAGES <= number <= last + KEEP_PAGES:
+                self.drop(number)
+    
+    def drop(self, number, drop_photos=True):
+        """Forget one page, cancelling its prefetch"""
+        entries = self.pages.pop(number, [])
+        request_ids = self.requests.pop(number, [])
+        if self.release:
+            self.release(entries, request_ids, drop_photos)
+    
+    def close(self):
+        """Stop prefetching; the thumbnails stay for whatever is shown next"""
+        for number in list(self.pages):
+            self.drop(number, drop_photos=False)
 
 class GalleryView(ttk.Frame):
     def __init__(self, parent, controller):
@@ -24,76 +207,57 @@ class GalleryView(ttk.Frame):
                                    font=("Arial", 18, "bold"), style="TLabel")
         self.title_label.pack(pady=10)
         
-        # Create scrollable frame for templates
+        # Search box and facet filters above the grid
+        filter_frame = ttk.Frame(self)
+        filter_frame.pack(fill="x", padx=20)
+        
+        ttk.Label(filter_frame, text="Search:", style="TLabel").pack(side="left", padx=10)
+        self.search_var = tk.StringVar()
+        ttk.Entry(filter_frame, textvariable=self.search_var, width=18).pack(side="left", padx=5)
+        self.search_var.trace_add("write", lambda *args: self.apply_filters())
+        
+        self.style_var = tk.StringVar(value="All Styles")
+        self.style_combo = ttk.Combobox(filter_frame, textvariable=self.style_var, 
+                                       values=["All Styles"], width=15, state="readonly")
+        self.style_combo.pack(side="left", padx=5)
+        
+        self.color_var = tk.StringVar(value="All Colours")
+        self.color_combo = ttk.Combobox(filter_frame, textvariable=self.color_var, 
+                                       values=["All Colours"], width=12, state="readonly")
+        self.color_combo.pack(side="left", padx=5)
+        
+        self.aspect_var = tk.StringVar(value="All Shapes")
+        self.aspect_combo = ttk.Combobox(filter_frame, textvariable=self.aspect_var, 
+                                        values=["All Shapes"], width=12, state="readonly")
+        self.aspect_combo.pack(side="left", padx=5)
+        
+        for combo in (self.style_combo, self.color_combo, self.aspect_combo):
+            combo.bind("<<ComboboxSelected>>", lambda e: self.apply_filters())
+        
+        # Scrollable canvas that the virtual grid places its cards on
         self.canvas = tk.Canvas(self, bg="#f5f5f5", highlightthickness=0)
         scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.canvas.yview)
         
-        self.template_frame = ttk.Frame(self.canvas, style="TFrame")
-        self.template_frame.bind("<Configure>", 
-                               lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
+        # Update the visible cards whenever the view scrolls
+        def on_scroll(first, last):
+            scrollbar.set(first, last)
+            self.template_grid.refresh()
         
-        self.canvas.create_window((0, 0), window=self.template_frame, anchor="nw")
-        self.canvas.configure(yscrollcommand=scrollbar.set)
+        self.canvas.configure(yscrollcommand=on_scroll)
         
         self.canvas.pack(side="left", fill="both", expand=True, padx=20, pady=20)
         scrollbar.pack(side="right", fill="y")
         
-        # Placeholder for template images
-        self.template_images = []  # Keep references to prevent garbage collection
-        
-        # Sample templates for each category with more options and better organization
-        self.templates = {
-            "Birthday": [
-                {"path": "templates/birthday/elegant_1.jpg", "name": "Elegant Birthday", "style": "Elegant"},
-                {"path": "templates/birthday/elegant_2.jpg", "name": "Golden Celebration", "style": "Elegant"},
-                {"path": "templates/birthday/fun_1.jpg", "name": "Party Balloons", "style": "Fun"},
-                {"path": "templates/birthday/fun_2.jpg", "name": "Confetti Explosion", "style": "Fun"},
-                {"path": "templates/birthday/kids_1.jpg", "name": "Kids Birthday", "style": "Kids"},
-                {"path": "templates/birthday/kids_2.jpg", "name": "Cartoon Cake", "style": "Kids"},
-                {"path": "templates/birthday/minimal_1.jpg", "name": "Minimal White", "style": "Minimal"},
-                {"path": "templates/birthday/minimal_2.jpg", "name": "Simple Elegance", "style": "Minimal"}
-            ],
-            "Valentine": [
-                {"path": "templates/valentine/romantic_1.jpg", "name": "Red Roses", "style": "Romantic"},
-                {"path": "templates/valentine/romantic_2.jpg", "name": "Heart Bokeh", "style": "Romantic"},
-                {"path": "templates/valentine/cute_1.jpg", "name": "Cute Hearts", "style": "Cute"},
-                {"path": "templates/valentine/cute_2.jpg", "name": "Love Birds", "style": "Cute"},
-                {"path": "templates/valentine/modern_1.jpg", "name": "Modern Love", "style": "Modern"},
-                {"path": "templates/valentine/modern_2.jpg", "name": "Geometric Hearts", "style": "Modern"},
-                {"path": "templates/valentine/vintage_1.jpg", "name": "Vintage Romance", "style": "Vintage"},
-                {"path": "templates/valentine/vintage_2.jpg", "name": "Classic Love Letter", "style": "Vintage"}
-            ],
-            "Eid": [
-                {"path": "templates/eid/traditional_1.jpg", "name": "Traditional Lanterns", "style": "Traditional"},
-                {"path": "templates/eid/traditional_2.jpg", "name": "Mosque Silhouette", "style": "Traditional"},
-                {"path": "templates/eid/modern_1.jpg", "name": "Modern Geometric", "style": "Modern"},
-                {"path": "templates/eid/modern_2.jpg", "name": "Minimalist Moon", "style": "Modern"},
-                {"path": "templates/eid/festive_1.jpg", "name": "Festive Lights", "style": "Festive"},
-                {"path": "templates/eid/festive_2.jpg", "name": "Celebration Gold", "style": "Festive"},
-                {"path": "templates/eid/cultural_1.jpg", "name": "Cultural Patterns", "style": "Cultural"},
-                {"path": "templates/eid/cultural_2.jpg", "name": "Heritage Design", "style": "Cultural"}
-            ],
-            "Puja": [
-                {"path": "templates/puja/diwali_1.jpg", "name": "Diwali Lamps", "style": "Diwali"},
-                {"path": "templates/puja/diwali_2.jpg", "name": "Rangoli Design", "style": "Diwali"},
-                {"path": "templates/puja/durga_1.jpg", "name": "Durga Puja", "style": "Durga"},
-                {"path": "templates/puja/durga_2.jpg", "name": "Goddess Durga", "style": "Durga"},
-                {"path": "templates/puja/ganesh_1.jpg", "name": "Ganesh Chaturthi", "style": "Ganesh"},
-                {"path": "templates/puja/ganesh_2.jpg", "name": "Lord Ganesha", "style": "Ganesh"},
-                {"path": "templates/puja/navratri_1.jpg", "name": "Navratri Colors", "style": "Navratri"},
-                {"path": "templates/puja/navratri_2.jpg", "name": "Garba Celebration", "style": "Navratri"}
-            ],
-            "New Year": [
-                {"path": "templates/newyear/fireworks_1.jpg", "name": "Midnight Fireworks", "style": "Fireworks"},
-                {"path": "templates/newyear/fireworks_2.jpg", "name": "Celebration Sky", "style": "Fireworks"},
-                {"path": "templates/newyear/elegant_1.jpg", "name": "Elegant Countdown", "style": "Elegant"},
-                {"path": "templates/newyear/elegant_2.jpg", "name": "Golden New Year", "style": "Elegant"},
-                {"path": "templates/newyear/party_1.jpg", "name": "Party Confetti", "style": "Party"},
-                {"path": "templates/newyear/party_2.jpg", "name": "Champagne Toast", "style": "Party"},
-                {"path": "templates/newyear/minimal_1.jpg", "name": "Minimal Calendar", "style": "Minimal"},
-                {"path": "templates/newyear/minimal_2.jpg", "name": "Clean Slate", "style": "Minimal"}
-            ]
-        }
+        # Only the rows in view get card widgets, and cards are reused while scrolling
+        # Matches of the current search, read from the index a page at a time
+        self.results = None
+        
+        self.template_grid = VirtualGrid(self.canvas, self.create_template_card, self.fill_template_card,
+                                         cell_width=390, cell_height=360, columns=2,
+                                         on_range=self.on_grid_range)
+        
+        # Grey image shown while a card's thumbnail is decoded
+        self.placeholder_photo = None
         
         # For demo purposes, we'll create placeholder images
         self.create_placeholder_templates()
@@ -105,135 +269,208 @@ class GalleryView(ttk.Frame):
             self.display_templates(self.controller.current_category)
     
     def display_templates(self, category):
-        """Display templates for the selected category with style filtering"""
-        # Clear previous templates
-        for widget in self.template_frame.winfo_children():
-            widget.destroy()
-        
-        self.template_images = []  # Clear image references
-        
-        # Get templates for the category
-        templates = self.templates.get(category, [])
-        
-        # Create style filter at the top
-        filter_frame = ttk.Frame(self.template_frame)
-        filter_frame.pack(fill="x", pady=10)
-        
-        ttk.Label(filter_frame, text="Filter by style:", style="TLabel").pack(side="left", padx=10)
-        
-        # Get unique styles for this category
-        styles = sorted(list(set(t["style"] for t in templates)))
-        styles.insert(0, "All Styles")  # Add "All" option
-        
-        # Style variable
-        self.style_var = tk.StringVar(value="All Styles")
-        style_combo = ttk.Combobox(filter_frame, textvariable=self.style_var, 
-                                  values=styles, width=15, state="readonly")
-        style_combo.pack(side="left", padx=5)
-        style_combo.bind("<<ComboboxSelected>>", 
-                        lambda e: self.filter_templates_by_style(category))
-        
-        # Create a grid of templates
-        self.templates_container = ttk.Frame(self.template_frame)
-        self.templates_container.pack(fill="both", expand=True)
-        
-        # Display all templates initially
-        self.show_filtered_templates(templates)
+        """Display templates for the selected category with every filter cleared"""
+        self.search_var.set("")
+        self.style_var.set("All Styles")
+        self.color_var.set("All Colours")
+        self.aspect_var.set("All Shapes")
+        self.update_filter_options(category)
+        self.apply_filters()
     
-    def filter_templates_by_style(self, category):
-        """Filter templates by the selected style"""
-        selected_style = self.style_var.get()
-        templates = self.templates.get(category, [])
-        
-        if selected_style == "All Styles":
-            filtered_templates = templates
-        else:
-            filtered_templates = [t for t in templates if t["style"] == selected_style]
-        
-        # Clear and redisplay templates
-        for widget in self.templates_container.winfo_children():
-            widget.destroy()
+    def update_filter_options(self, category):
+        """Offer the styles, colours and shapes found in a category"""
+        key = category_key(category)
+        options = (
+            (self.style_combo, self.style_var, "All Styles", "style"),
+            (self.color_combo, self.color_var, "All Colours", "color"),
+            (self.aspect_combo, self.aspect_var, "All Shapes", "aspect"),
+        )
+        for combo, var, all_label, facet in options:
+            values = [style_label(value) for value in search_index.values(facet, category=key)]
+            combo.configure(values=[all_label] + values)
+            # Keep the current selection if it still exists
+            if var.get() not in values:
+                var.set(all_label)
+    
+    def apply_filters(self, keep_position=False):
+        """Show the templates of the current category that match the search and filters"""
+        category = self.controller.current_category
+        if not category:
+            return
+        
+        def selected(var, all_label):
+            value = var.get()
+            return None if value == all_label else value.lower().replace(" ", "_")
+        
+        relpaths = search_index.search_paths(
+            self.search_var.get(),
+            category=category_key(category),
+            style=selected(self.style_var, "All Styles"),
+            color=selected(self.color_var, "All Colours"),
+            aspect=selected(self.aspect_var, "All Shapes"),
+        )
         
-        self.show_filtered_templates(filtered_templates)
+        # Stream the matches to the grid a page at a time
+        if self.results is not None:
+            self.results.close()
+        self.results = PagedResults(search_index, relpaths,
+                                    prefetch=self.prefetch_thumbnails, release=self.release_thumbnails)
+        self.show_filtered_templates(self.results, keep_position)
+    
+    def on_grid_range(self, start, end):
+        """Let the current results prefetch and evict pages as the grid scrolls"""
+        if self.results is not None:
+            self.results.viewing(start, end)
     
-    def show_filtered_templates(self, templates):
-        """Display the filtered templates in a grid"""
-        self.template_images = []  # Clear image references
-        
-        # Create a grid of templates
-        row, col = 0, 0
-        for template in templates:
-            self.create_template_card(self.templates_container, template, row, col)
-            col += 1
-            if col > 1:  # 2 columns
-                col = 0
-                row += 1
-        
-        # If no templates match the filter
-        if not templates:
-            no_results = ttk.Label(self.templates_container, 
-                                 text="No templates match the selected filter",
-                                 font=("Arial", 14), style="TLabel")
-            no_results.pack(pady=50)
+    def prefetch_thumbnails(self, templates):
+        """Decode the thumbnails of templates about to scroll into view; return the request ids"""
+        decode_service = self.controller.decode_service
+        request_ids = []
+        for asset in set(template.get("preview", template["path"]) for template in templates):
+            try:
+                if thumbnail_cache.ready_photo(asset, THUMBNAIL_SIZE) is not None:
+                    continue
+            except OSError:
+                continue
+            request_ids.append(decode_service.submit(
+                self, lambda path=asset: thumbnail_cache.get_image(path, THUMBNAIL_SIZE),
+                lambda img, path=asset: thumbnail_cache.make_photo(path, img, THUMBNAIL_SIZE)
+            ))
+        return request_ids
     
-    def create_template_card(self, parent, template, row, col):
-        """Create a card for each template with style label"""
+    def release_thumbnails(self, templates, request_ids, drop_photos=True):
+        """Cancel the prefetches of a page and free its thumbnails"""
+        for request_id in request_ids:
+            self.controller.decode_service.cancel(request_id)
+        if drop_photos:
+            for template in templates:
+                thumbnail_cache.release_photo(template.get("preview", template["path"]), THUMBNAIL_SIZE)
+    
+    def show_filtered_templates(self, templates, keep_position=False):
+        """Display the filtered templates in the virtual grid"""
+        self.template_grid.set_items(templates, "No templates match the selected filter", keep_position)
+    
+    def on_catalogue_changed(self, changed):
+        """Show templates that were added, edited or removed while the gallery is open"""
+        category = self.controller.current_category
+        if self.controller.current_frame is not self or not category:
+            return  # update_view() reads the catalogue when the gallery is next shown
+        if not any(describe(relpath)[0] == category_key(category) for relpath in changed):
+            return
+        
+        # New styles or colours may have appeared
+        self.update_filter_options(category)
+        self.apply_filters(keep_position=True)
+    
+    def create_template_card(self, parent):
+        """Create an empty template card; fill_template_card puts a template in it"""
         # Create a frame for the template
         card = tk.Frame(parent, bg="white", bd=1, relief="solid", 
                       padx=10, pady=10, width=350, height=320)
-        card.grid(row=row, column=col, padx=20, pady=20, sticky="nsew")
-        card.grid_propagate(False)  # Maintain fixed size
+        card.pack_propagate(False)  # Maintain fixed size
+        card.template = None
+        card.request = None  # Pending thumbnail decode
         
-        # Make the card clickable
-        card.bind("<Button-1>", lambda e, t=template["path"]: self.controller.select_template(t))
-        
-        try:
-            # Try to open the image
-            img = Image.open(template["path"])
-            img = img.resize((300, 200), Image.LANCZOS)
-            photo = ImageTk.PhotoImage(img)
-            self.template_images.append(photo)  # Keep a reference
-            
-            img_label = tk.Label(card, image=photo, bg="white")
-            img_label.image = photo
-            img_label.pack(pady=5)
-        except Exception as e:
-            # If image can't be loaded, show placeholder
-            placeholder = tk.Label(card, text="Template Preview", bg="#e0e0e0", 
-                                 width=40, height=10)
-            placeholder.pack(pady=5)
+        card.img_label = tk.Label(card, bg="white")
+        card.img_label.pack(pady=5)
         
         # Template name
-        name_label = tk.Label(card, text=template["name"], font=("Arial", 12, "bold"), bg="white")
-        name_label.pack(pady=2)
+        card.name_label = tk.Label(card, font=("Arial", 12, "bold"), bg="white")
+        card.name_label.pack(pady=2)
         
         # Style label
-        style_label = tk.Label(card, text=f"Style: {template['style']}", 
-                             font=("Arial", 10), bg="white", fg="#666666")
-        style_label.pack(pady=2)
+        card.style_label = tk.Label(card, font=("Arial", 10), bg="white", fg="#666666")
+        card.style_label.pack(pady=2)
         
         # Select button
-        select_btn = ttk.Button(card, text="Select Template", 
-                              command=lambda t=template["path"]: self.controller.select_template(t))
-        select_btn.pack(pady=5)
+        card.select_btn = ttk.Button(card, text="Select Template")
+        card.select_btn.pack(pady=5)
+        
+        # Make the card clickable
+        select = lambda e: card.template and self.controller.select_template(card.template["path"])
+        card.bind("<Button-1>", select)
+        card.img_label.bind("<Button-1>", select)
+        
+        return card
+    
+    def fill_template_card(self, card, template):
+        """Show a template in a (possibly recycled) card"""
+        card.template = template
+        card.name_label.config(text=template["name"])
+        card.style_label.config(text=f"Style: {style_label(template['style'])}")
+        card.select_btn.config(command=lambda t=template["path"]: self.controller.select_template(t))
+        
+        # The card's previous thumbnail is no longer wanted
+        decode_service = self.controller.decode_service
+        if card.request is not None:
+            decode_service.cancel(card.request)
+            card.request = None
+        
+        # Copies of the same picture share one thumbnail, made from their preview file
+        asset = template.get("preview", template["path"])
+        
+        # Use a thumbnail that is already in memory straight away
+        try:
+            photo = thumbnail_cache.ready_photo(asset, THUMBNAIL_SIZE)
+        except OSError:
+            photo = None
+        if photo is not None:
+            self.set_card_image(card, photo)
+            return
+        
+        # Otherwise show a placeholder and decode the thumbnail in the background
+        if self.placeholder_photo is None:
+            self.placeholder_photo = ImageTk.PhotoImage(Image.new("RGB", THUMBNAIL_SIZE, (224, 224, 224)))
+        self.set_card_image(card, self.placeholder_photo)
+        
+        def on_loaded(img, card=card, path=asset):
+            card.request = None
+            self.set_card_image(card, thumbnail_cache.make_photo(path, img, THUMBNAIL_SIZE))
+        
+        def on_error(error, card=card):
+            # Leave the placeholder if the image can't be loaded
+            card.request = None
+        
+        card.request = decode_service.submit(
+            self, lambda path=asset: thumbnail_cache.get_image(path, THUMBNAIL_SIZE),
+            on_loaded, on_error
+        )
+    
+    def set_card_image(self, card, photo):
+        """Show a thumbnail in a card"""
+        card.img_label.config(image=photo)
+        card.img_label.image = photo  # Keep a reference
     
     def create_placeholder_templates(self):
         """Create aesthetically pleasing placeholder template images for demo purposes"""
-        # Create directories for each category
-        for category, templates in self.templates.items():
-            for template in templates:
-                template_dir = os.path.dirname(template["path"])
-                os.makedirs(template_dir, exist_ok=True)
-                
-                if not os.path.exists(template["path"]):
-                    # Create a styled image based on category and style
-                    img = self.create_styled_template(category, template["style"], template["name"])
-                    img.save(template["path"])
+        for relpath in DISPLAY_NAMES:
+            path = os.path.join(TEMPLATES_DIR, *relpath.split("/"))
+            if os.path.exists(path):
+                continue
+            
+            category, style, name = describe(relpath)
+            category, style = category_label(category), style_label(style)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            
+            # Create a styled image based on category and style,
+            # reusing an earlier render from this version of the view
+            img = render_cache.get_or_render(
+                category, style, (600, 400),
+                lambda c=category, s=style, n=name: self.create_styled_template(c, s, n, seed=n),
+                seed=name, version=source_version(__file__)
+            )
+            img.save(path)
+        
+        # Pick up the new files and anything added since the last run
+        catalogue.refresh()
     
-    def create_styled_template(self, category, style, name):
+    def create_styled_template(self, category, style, name, seed=None):
         """Create a styled template image based on category and style"""
         width, height = 600, 400
         
+        # Seeded random source so the same template always looks the same
+        rng = random.Random(seed)
+        
         # Base colors for different categories
         base_colors = {
             "Birthday": {
@@ -296,25 +533,25 @@ class GalleryView(ttk.Frame):
         elif style in ["Fun", "Party"]:
             # Add confetti or dots
             for _ in range(100):
-                x = random.randint(0, width)
-                y = random.randint(0, height)
-                size = random.randint(5, 15)
-                r = random.randint(150, 255)
-                g = random.randint(150, 255)
-                b = random.randint(150, 255)
+                x = rng.randint(0, width)
+                y = rng.randint(0, height)
+                size = rng.randint(5, 15)
+                r = rng.randint(150, 255)
+                g = rng.randint(150, 255)
+                b = rng.randint(150, 255)
                 draw.ellipse([(x, y), (x+size, y+size)], fill=(r, g, b))
         
         elif style in ["Modern", "Minimal"]:
             # Add geometric elements
             for _ in range(5):
-                x = random.randint(0, width)
-                y = random.randint(0, height)
-                size = random.randint(50, 150)
-                opacity = random.randint(30, 100)
+                x = rng.randint(0, width)
+                y = rng.randint(0, height)
+                size = rng.randint(50, 150)
+                opacity = rng.randint(30, 100)
                 shape_color = (255, 255, 255, opacity)
                 
                 # Randomly choose between rectangle, circle, or line
-                shape_type = random.choice(["rect", "circle", "line"])
+                shape_type = rng.choice(["rect", "circle", "line"])
                 if shape_type == "rect":
                     draw.rectangle([(x, y), (x+size, y+size)], fill=shape_color)
                 elif shape_type == "circle":
@@ -331,26 +568,11 @@ class GalleryView(ttk.Frame):
         )
         
         # Add template name as watermark
-        try:
-            font = ImageFont.truetype("arial.ttf", 16)
-        except:
-            font = ImageFont.load_default()
+        font = get_font("arial.ttf", 16)
         
         watermark_text = f"{category} - {style}"
         # Get text size
-        text_width, text_height = 100, 20  # Default fallback size
-        try:
-            # For newer Pillow versions
-            if hasattr(draw, 'textbbox'):
-                bbox = draw.textbbox((0, 0), watermark_text, font=font)
-                text_width = bbox[2] - bbox[0]
-                text_height = bbox[3] - bbox[1]
-            # For older Pillow versions
-            elif hasattr(draw, 'textsize'):
-                text_width, text_height = draw.textsize(watermark_text, font=font)
-        except Exception:
-            # Keep the fallback values if any error occurs
-            pass
+        text_width, text_height = text_size(watermark_text, font)
         
         position = (width - text_width - 10, height - text_height - 10)
         draw.text(position, watermark_text, fill=(255, 255, 255, 128), font=font)
@@ -358,7 +580,16 @@ class GalleryView(ttk.Frame):
         return img
     
     def get_color_for_category(self, category):
-        """Get a color for each category"""
+        """Get a color for each category, the most common main colour of its templates"""
+        counts = {}
+        for entry in catalogue.find(category):
+            if entry.get("palette"):
+                color = entry["palette"][0][0]
+                counts[color] = counts.get(color, 0) + 1
+        if counts:
+            return from_hex(max(counts, key=counts.get))
+        
+        # Fixed colours for categories without catalogued templates
         colors = {
             "Birthday": (255, 215, 0),  # Gold
             "Valentine": (255, 105, 180),  # Hot Pink
@@ -1,11 +1,16 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from PIL import Image, ImageTk, ImageDraw, ImageFont
+from PIL import Image, ImageTk, ImageDraw
 import os
 import random
 import re
 import uuid
 from utils.ai_utils import get_ai_greeting, enhance_image_with_ai
+from utils.card_export import DEFAULT_EXPORT_DPI, CardScene
+from utils.catalogue import TEMPLATES_DIR, catalogue
+from utils.font_service import font_service, get_font
+from utils.image_pyramid import image_pyramid
+from utils.render_cache import render_cache
 
 class PromptGeneratorView(ttk.Frame):
     """View for generating cards from text prompts and images"""
@@ -18,6 +23,7 @@ class PromptGeneratorView(ttk.Frame):
         # Store uploaded image path
         self.uploaded_image_path = None
         self.uploaded_image_preview = None
+        self.uploaded_image_full = None
         
         # Create the layout
         self.create_layout()
@@ -153,27 +159,29 @@ class PromptGeneratorView(ttk.Frame):
             filename = os.path.basename(file_path)
             self.image_label.config(text=f"Selected: {filename}")
             
-            # Show preview
-            img = Image.open(file_path)
-            
-            # Resize for preview
-            img.thumbnail((150, 150))
-            
-            # Convert to PhotoImage
-            photo = ImageTk.PhotoImage(img)
-            
-            # Create or update preview label
-            if hasattr(self, 'image_preview_label'):
-                self.image_preview_label.config(image=photo)
-                self.image_preview_label.image = photo
-            else:
-                self.image_preview_label = tk.Label(self.preview_frame, image=photo)
-                self.image_preview_label.image = photo
-                self.image_preview_label.pack(pady=10)
+            # Decode and resize the preview in the background
+            self.controller.decode_service.submit_image(
+                self, file_path, (150, 150), self.show_image_preview,
+                lambda error: messagebox.showerror("Error", f"Failed to load image: {str(error)}")
+            )
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load image: {str(e)}")
     
+    def show_image_preview(self, img):
+        """Show the decoded preview of the uploaded image"""
+        # Convert to PhotoImage
+        photo = ImageTk.PhotoImage(img)
+        
+        # Create or update preview label
+        if hasattr(self, 'image_preview_label'):
+            self.image_preview_label.config(image=photo)
+            self.image_preview_label.image = photo
+        else:
+            self.image_preview_label = tk.Label(self.preview_frame, image=photo)
+            self.image_preview_label.image = photo
+            self.image_preview_label.pack(pady=10)
+    
     def generate_card(self):
         """Generate a card based on the prompt and image"""
         # Get the prompt text
@@ -293,24 +301,16 @@ class PromptGeneratorView(ttk.Frame):
         category_dir = category.lower().replace(" ", "")
         
         # Look for templates in the specific style
-        style_dir = os.path.join("templates", category_dir, style)
-        templates = []
-        
-        if os.path.exists(style_dir):
-            templates = [os.path.join(style_dir, f) for f in os.listdir(style_dir) 
-                       if f.endswith(('.jpg', '.jpeg', '.png'))]
+        templates = [entry["path"] for entry in catalogue.find(category_dir, style)]
         
-        # If no templates in style dir, look in category dir
+        # If there are none in that style, use any in the category
         if not templates:
-            category_path = os.path.join("templates", category_dir)
-            if os.path.exists(category_path):
-                templates = [os.path.join(category_path, f) for f in os.listdir(category_path) 
-                           if f.endswith(('.jpg', '.jpeg', '.png'))]
+            templates = [entry["path"] for entry in catalogue.find(category_dir)]
         
         # If still no templates, use a default template
         if not templates:
             # Create a default template path
-            template_path = os.path.join("templates", category_dir, f"{style}_1.jpg")
+            template_path = os.path.join(TEMPLATES_DIR, category_dir, f"{style}_1.jpg")
             
             # Ensure the directory exists
             os.makedirs(os.path.dirname(template_path), exist_ok=True)
@@ -318,24 +318,24 @@ class PromptGeneratorView(ttk.Frame):
             # Create a default template if it doesn't exist
             if not os.path.exists(template_path):
                 from utils.template_designer import TemplateDesigner
-                designer = TemplateDesigner()
                 
-                # Create template based on category and style
-                if category == "Birthday":
-                    img = designer.create_birthday_template(style)
-                elif category == "Valentine":
-                    img = designer.create_valentine_template(style)
-                elif category == "Eid":
-                    img = designer.create_eid_template(style)
-                elif category == "Puja":
-                    img = designer.create_puja_template(style)
-                elif category == "New Year":
-                    img = designer.create_newyear_template(style)
-                else:
-                    img = designer._create_default_template(category)
+                # Variant 1 always uses seed 1 so it can be cached and reproduced
+                seed = 1
+                designer = TemplateDesigner(seed=seed)
                 
-                # Save the template
+                def render():
+                    # Styles without a registered renderer get the default template
+                    return designer.render(category, style)
+                
+                # Reuse an earlier render of the same template if there is one
+                img = render_cache.get_or_render(
+                    category, style, (designer.pixel_width, designer.pixel_height), render,
+                    seed=seed, supersample=designer.supersample
+                )
+                
+                # Save the template and add it to the catalogue
                 img.save(template_path)
+                catalogue.refresh()
             
             return template_path
         
@@ -345,30 +345,33 @@ class PromptGeneratorView(ttk.Frame):
     def generate_preview(self, template_path, category, style, recipient, sender):
         """Generate a preview of the card"""
         try:
-            # Load the template
-            img = Image.open(template_path)
-            
             # Resize to fit preview
             preview_width = 400
             preview_height = 300
             
-            # Resize image to fit preview while maintaining aspect ratio
-            img_width, img_height = img.size
-            ratio = min(preview_width/img_width, preview_height/img_height)
-            new_width = int(img_width * ratio)
-            new_height = int(img_height * ratio)
+            # Load the template from the nearest level of its pyramid,
+            # fitted to the preview while maintaining aspect ratio
+            img = image_pyramid.get_image(template_path, (preview_width, preview_height), upscale=True)
+            img_width, img_height = image_pyramid.full_size(template_path)
+            new_width, new_height = img.size
             
-            img = img.resize((new_width, new_height), Image.LANCZOS)
+            # Text colour picked for this template when it was catalogued
+            entry = catalogue.get(template_path)
+            self.text_color = entry.get("text_color", "#000000") if entry else "#000000"
             
             # Store original size for export
             self.original_width = img_width
             self.original_height = img_height
             
+            # The same card described independently of the preview size, for download
+            self.card_scene = CardScene(template_path)
+            
             # If there's an uploaded image, add it to the card
             if self.uploaded_image_path:
                 try:
                     # Load and enhance the uploaded image
                     user_img = enhance_image_with_ai(self.uploaded_image_path)
+                    enhanced_img = user_img
                     
                     # Resize to fit on the card (max 40% of card width)
                     max_width = int(new_width * 0.4)
@@ -390,9 +393,15 @@ class PromptGeneratorView(ttk.Frame):
                         img.paste(user_img, (paste_x, paste_y), user_img)
                     else:
                         img.paste(user_img, (paste_x, paste_y))
+                    self.card_scene.add_image(
+                        enhanced_img,
+                        (paste_x + user_img.width / 2) / new_width, (paste_y + user_img.height / 2) / new_height,
+                        user_img.width / new_width, user_img.height / new_height
+                    )
                     
                     # Store for later use
                     self.uploaded_image_preview = user_img
+                    self.uploaded_image_full = enhanced_img
                     
                 except Exception as e:
                     print(f"Error adding image to card: {str(e)}")
@@ -403,16 +412,14 @@ class PromptGeneratorView(ttk.Frame):
             
             # Store the generated text
             self.generated_text = greeting
+            self.card_scene.add_text(greeting, 0.5, 0.5, "arial.ttf", 14 / new_height, self.text_color, 0.7)
             
             # Create a copy for drawing text
             img_with_text = img.copy()
             draw = ImageDraw.Draw(img_with_text)
             
             # Add text to image
-            try:
-                font = ImageFont.truetype("arial.ttf", 14)
-            except:
-                font = ImageFont.load_default()
+            font = get_font("arial.ttf", 14)
             
             # Calculate text position and wrap
             text_width = new_width * 0.7
@@ -427,18 +434,7 @@ class PromptGeneratorView(ttk.Frame):
             for word in words:
                 test_line = current_line + word + " "
                 # Get text size
-                text_size = None
-                try:
-                    # For newer Pillow versions
-                    if hasattr(draw, 'textbbox'):
-                        bbox = draw.textbbox((0, 0), test_line, font=font)
-                        text_size = (bbox[2] - bbox[0], bbox[3] - bbox[1])
-                    # For older Pillow versions
-                    elif hasattr(draw, 'textsize'):
-                        text_size = draw.textsize(test_line, font=font)
-                except Exception:
-                    # Fallback
-                    text_size = (len(test_line) * 7, 15)  # Rough estimate
+                text_size = font_service.text_size(test_line, font)
                 
                 if text_size and text_size[0] <= text_width:
                     current_line = test_line
@@ -453,22 +449,11 @@ class PromptGeneratorView(ttk.Frame):
             y_offset = text_y - (len(lines) * 20) / 2
             for line in lines:
                 # Get text size for centering
-                text_size = None
-                try:
-                    # For newer Pillow versions
-                    if hasattr(draw, 'textbbox'):
-                        bbox = draw.textbbox((0, 0), line, font=font)
-                        text_size = (bbox[2] - bbox[0], bbox[3] - bbox[1])
-                    # For older Pillow versions
-                    elif hasattr(draw, 'textsize'):
-                        text_size = draw.textsize(line, font=font)
-                except Exception:
-                    # Fallback
-                    text_size = (len(line) * 7, 15)  # Rough estimate
+                text_size = font_service.text_size(line, font)
                 
                 x_position = text_x - text_size[0] / 2 if text_size else text_x
                 
-                draw.text((x_position, y_offset), line, fill="black", font=font)
+                draw.text((x_position, y_offset), line, fill=self.text_color, font=font)
                 y_offset += 20
             
             # Store the final image for export
@@ -501,7 +486,7 @@ class PromptGeneratorView(ttk.Frame):
     
     def download_card(self):
         """Download the generated card as an image file"""
-        if not hasattr(self, 'final_card_image'):
+        if not hasattr(self, 'card_scene'):
             messagebox.showinfo("Info", "Please generate a card first")
             return
         
@@ -516,9 +501,12 @@ class PromptGeneratorView(ttk.Frame):
             return
         
         try:
-            # Save the image
-            self.final_card_image.save(file_path)
-            messagebox.showinfo("Success", f"Card saved successfully to {file_path}")
+            # Render at print resolution and save in the background
+            self.controller.export_queue.submit(
+                self.card_scene, file_path, DEFAULT_EXPORT_DPI,
+                on_done=lambda job: messagebox.showinfo("Success", f"Card saved successfully to {job.path}"),
+                on_error=lambda job: messagebox.showerror("Error", f"Failed to save card: {job.message}")
+            )
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save card: {str(e)}")
     
@@ -551,63 +539,31 @@ class PromptGeneratorView(ttk.Frame):
             
             # Add the generated text to the card
             if hasattr(self, 'generated_text'):
-                # Create text on canvas
-                text_id = editor.canvas.create_text(
-                    300, 200,  # Center of canvas
-                    text=self.generated_text,
-                    font=("Arial", 14),
-                    fill="#000000",
-                    width=400,  # Wrap text at 400 pixels
-                    justify=tk.CENTER,
-                    tags=f"text_{len(editor.text_objects)}"
+                # Create text in the center of the canvas, wrapped at 400 pixels
+                editor.scene_graph.add_text(
+                    self.generated_text, 300, 200, "Arial", 14,
+                    getattr(self, "text_color", "#000000"), wrap_width=400
                 )
-                
-                # Make text draggable
-                drag_obj = editor.DraggableObject(editor.canvas, text_id, "text")
-                editor.draggable_objects.append(drag_obj)
-                
-                # Store text object with properties
-                text_obj = {
-                    "id": text_id,
-                    "text": self.generated_text,
-                    "font": "Arial",
-                    "size": 14,
-                    "color": "#000000"
-                }
-                editor.text_objects.append(text_obj)
             
             # Add the uploaded image to the card if available
             if hasattr(self, 'uploaded_image_path') and self.uploaded_image_path:
                 try:
-                    # Use the enhanced image if available
-                    if hasattr(self, 'uploaded_image_preview'):
-                        img = self.uploaded_image_preview
+                    # Use the enhanced image if available. The scene graph gets
+                    # copies, since this view and the card preview keep the originals
+                    if self.uploaded_image_preview is not None:
+                        img = self.uploaded_image_preview.copy()
+                        full = self.uploaded_image_full
+                        source = full.copy() if full is not None else img
                     else:
-                        img = Image.open(self.uploaded_image_path)
+                        img = Image.open(self.uploaded_image_path).copy()
+                        source = self.uploaded_image_path
                     
-                    # Convert to PhotoImage
-                    photo = ImageTk.PhotoImage(img)
-                    editor.image_references.append(photo)  # Keep reference
-                    
-                    # Create image on canvas
-                    img_id = editor.canvas.create_image(
-                        450, 150,  # Top right area
-                        image=photo,
-                        tags=f"image_{len(editor.image_objects)}"
-                    )
-                    
-                    # Make image draggable
-                    drag_obj = editor.DraggableObject(editor.canvas, img_id, "image")
-                    editor.draggable_objects.append(drag_obj)
-                    
-                    # Store image object
-                    img_obj = {
-                        "id": img_id,
-                        "image": photo,
-                        "original": img,
-                        "path": self.uploaded_image_path
-                    }
-                    editor.image_objects.append(img_obj)
+                    # Create image in the top right area
+                    editor.scene_graph.add_image(img, 450, 150, source=source, path=self.uploaded_image_path)
                     
                 except Exception as e:
                     print(f"Error adding image to editor: {str(e)}")
+            
+            # Draw the new objects
+            editor.sync_canvas()
+            editor.record("Add generated content")